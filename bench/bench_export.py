@@ -0,0 +1,53 @@
+"""
+출력 이미지 형식별 인코딩 벤치마크
+
+합성 PDF 페이지를 목표 DPI로 렌더링한 뒤, 형식·설정별 인코딩 시간과 결과 크기를 표로 출력합니다.
+(렌더링 시간은 빼고 인코딩만 측정)
+
+    python -m bench.bench_export --pages 20 --dpi 144 288
+"""
+import argparse
+import time
+
+import fitz  # PyMuPDF 라이브러리
+
+from bench.bench_render import make_pdf
+from core.export import DEFAULT_EXPORT, ExportOptions, dpi_to_zoom, encode_pixmap
+
+# 첫 번째(기본 PNG)를 기준으로 크기 비율을 표시
+CASES = [
+    ("PNG (기본, 압축 6)", DEFAULT_EXPORT),
+    ("PNG (압축 1)", ExportOptions("PNG", 90, 1, False)),
+    ("PNG (압축 9)", ExportOptions("PNG", 90, 9, False)),
+    ("WebP 무손실", ExportOptions("WebP", 90, 6, True)),
+    ("WebP 품질 80", ExportOptions("WebP", 80, 6, False)),
+    ("JPEG 품질 85", ExportOptions("JPEG", 85, 6, False)),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--pages", type=int, default=20)
+    parser.add_argument("--dpi", type=int, nargs="+", default=[144, 288])
+    args = parser.parse_args()
+
+    pdf_bytes = make_pdf(args.pages)
+    with fitz.open(stream=pdf_bytes, filetype="pdf") as doc:
+        for dpi in args.dpi:
+            matrix = fitz.Matrix(dpi_to_zoom(dpi), dpi_to_zoom(dpi))
+            pixmaps = [page.get_pixmap(matrix=matrix) for page in doc]
+            print(f"{args.pages} pages, {dpi} DPI ({pixmaps[0].width}x{pixmaps[0].height})")
+            print(f"{'format':<20} {'ms/page':>9} {'KB/page':>9} {'size':>7}")
+            baseline = None
+            for label, options in CASES:
+                start = time.perf_counter()
+                size = sum(len(encode_pixmap(pix, options)) for pix in pixmaps)
+                elapsed = time.perf_counter() - start
+                baseline = baseline or size
+                print(f"{label:<20} {elapsed / len(pixmaps) * 1000:>9.1f} {size / len(pixmaps) / 1024:>9.1f} "
+                      f"{size / baseline:>6.2f}x")
+            print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+관계도 그래프 생성 벤치마크
+
+합성 설문(행 수별)으로 기존 iterrows 방식과 벡터화된 build_graph를 비교합니다.
+
+    python -m bench.bench_relmap --rows 1000 10000 100000
+"""
+import argparse
+import random
+import time
+
+import networkx as nx
+import pandas as pd
+
+from core.relmap import RELATION_COLORS, build_graph
+
+RELATION_COLUMNS = ["친한 친구", "함께 공부하고 싶은 친구", "도움을 준 친구"]
+
+
+def make_survey(rows, seed=0):
+    """학생 rows명이 관계 열마다 1~3명씩 지목하는 합성 설문 DataFrame"""
+    rng = random.Random(seed)
+    names = [f"학생{i:06d}" for i in range(rows)]
+    data = {"이름": names}
+    for col in RELATION_COLUMNS:
+        data[col] = [
+            ", ".join(rng.sample(names, rng.randint(1, 3))) if rng.random() > 0.05 else None
+            for _ in range(rows)
+        ]
+    return pd.DataFrame(data)
+
+
+def legacy_build_graph(df, name_column, relation_columns, directed=False, node_size=15,
+                       name_font_size=12, font_color="white", edge_width=1.0):
+    """pages/02_관계도.py에 있던 기존 방식 (비교 기준)"""
+    G = nx.DiGraph() if directed else nx.Graph()
+
+    all_students = set()
+    for _, row in df.iterrows():
+        if pd.notna(row[name_column]):
+            all_students.add(str(row[name_column]).strip())
+        for rel_col in relation_columns:
+            if pd.notna(row[rel_col]):
+                targets = [t.strip() for t in str(row[rel_col]).split(',') if t.strip()]
+                for target in targets:
+                    all_students.add(target)
+
+    for student in all_students:
+        G.add_node(student, title=student, size=node_size,
+                   font={'size': name_font_size, 'color': font_color})
+
+    for idx, rel_col in enumerate(relation_columns):
+        current_color = RELATION_COLORS[idx % len(RELATION_COLORS)]
+        for _, row in df.iterrows():
+            source = str(row[name_column]).strip()
+            if pd.notna(row[rel_col]):
+                targets = [t.strip() for t in str(row[rel_col]).split(',') if t.strip()]
+                for target in targets:
+                    if source != target and source in all_students and target in all_students:
+                        if G.has_edge(source, target):
+                            G[source][target]['value'] = G[source][target].get('value', 0) + edge_width
+                            G[source][target]['title'] += f", {rel_col}"
+                        else:
+                            G.add_edge(source, target, title=rel_col, color=current_color, value=edge_width)
+    return G
+
+
+def same_graph(a, b):
+    if set(a.nodes) != set(b.nodes) or a.number_of_edges() != b.number_of_edges():
+        return False
+    for u, v, attrs in a.edges(data=True):
+        if not b.has_edge(u, v):
+            return False
+        other = b[u][v]
+        if (attrs["title"], attrs["color"]) != (other["title"], other["color"]):
+            return False
+        if abs(attrs["value"] - other["count"]) > 1e-9:
+            return False
+    return True
+
+
+def timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--directed", action="store_true")
+    parser.add_argument("--skip-legacy-above", type=int, default=100000,
+                        help="이 행 수보다 큰 설문은 기존 방식 측정을 건너뜀")
+    args = parser.parse_args()
+
+    print(f"{'rows':>8} {'legacy s':>10} {'new s':>8} {'speedup':>8} {'edges':>9} same")
+    for rows in args.rows:
+        df = make_survey(rows)
+        new, new_time = timed(build_graph, df, "이름", RELATION_COLUMNS, args.directed)
+        if rows > args.skip_legacy_above:
+            print(f"{rows:>8} {'-':>10} {new_time:>8.3f} {'-':>8} {new.number_of_edges():>9} -")
+            continue
+        legacy, legacy_time = timed(legacy_build_graph, df, "이름", RELATION_COLUMNS, args.directed)
+        print(f"{rows:>8} {legacy_time:>10.3f} {new_time:>8.3f} {legacy_time / new_time:>7.1f}x "
+              f"{new.number_of_edges():>9} {same_graph(legacy, new)}")
+
+
+if __name__ == "__main__":
+    main()
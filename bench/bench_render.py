@@ -0,0 +1,52 @@
+"""
+병렬 페이지 렌더링 벤치마크
+
+합성 PDF(기본 300페이지)를 만들어 작업자 수별 초당 렌더링 페이지 수를 출력합니다.
+
+    python -m bench.bench_render --pages 300 --workers 1 2 4 8
+"""
+import argparse
+import time
+
+import fitz  # PyMuPDF 라이브러리
+
+from core.render import DEFAULT_WORKERS, render_pages
+
+
+def make_pdf(num_pages):
+    """텍스트와 도형이 섞인 합성 PDF를 만들어 바이트로 돌려줍니다."""
+    doc = fitz.open()
+    for i in range(num_pages):
+        page = doc.new_page()
+        page.insert_text((72, 72), f"{i + 1}. 합성 문항 페이지 {i + 1}", fontsize=16)
+        for row in range(30):
+            page.insert_text((72, 110 + row * 22), "Lorem ipsum dolor sit amet " * 3, fontsize=10)
+        page.draw_rect(fitz.Rect(50, 95, 545, 780), color=(0, 0, 0))
+        page.draw_circle((300, 420), 80 + i % 40, color=(1, 0, 0))
+    data = doc.tobytes(no_new_id=True)  # 문서 ID를 새로 만들지 않아 항상 같은 바이트
+    doc.close()
+    return data
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--pages", type=int, default=300)
+    parser.add_argument("--zoom", type=float, default=2.0)
+    parser.add_argument("--workers", type=int, nargs="+",
+                        default=sorted({1, 2, 4, DEFAULT_WORKERS}))
+    args = parser.parse_args()
+
+    pdf_bytes = make_pdf(args.pages)
+    print(f"{args.pages} pages, zoom {args.zoom}")
+    print(f"{'workers':>8} {'seconds':>9} {'pages/s':>9} {'speedup':>8}")
+    baseline = None
+    for workers in args.workers:
+        start = time.perf_counter()
+        count = sum(1 for _ in render_pages(pdf_bytes, zoom=args.zoom, workers=workers))
+        elapsed = time.perf_counter() - start
+        baseline = baseline or elapsed
+        print(f"{workers:>8} {elapsed:>9.2f} {count / elapsed:>9.1f} {baseline / elapsed:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
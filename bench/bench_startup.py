@@ -0,0 +1,113 @@
+"""
+페이지 첫 실행(콜드 스타트) 벤치마크
+
+페이지마다 새 파이썬 프로세스에서 페이지 스크립트의 import 문만 먼저 실행한 시간, 그 뒤 Streamlit AppTest로
+처음 그리는 시간, 한 번 더 그리는 시간(다시 실행)을 재고, 업로드 전 첫 화면에서 불러온 무거운 라이브러리를 표시합니다.
+이때 백그라운드 미리 불러오기(core.resources.warm_up)는 끕니다.
+첫 화면에서 무거운 라이브러리(HEAVY_MODULES)를 불러온 페이지가 있으면 결과를 모두 기록한 뒤 0이 아닌 코드로 끝납니다.
+switch는 다른 새 프로세스에서 main.py를 먼저 그리고 미리 불러오기가 끝난 뒤 이 페이지로 옮겨 처음 그린 시간
+(import 포함)입니다.
+
+    python -m bench.bench_startup --repeat 5
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PAGES = ["main.py", "pages/00_pdf캡쳐.py", "pages/01_앞뒷면 병합.py", "pages/02_관계도.py", "pages/03_사진비율.py"]
+# 첫 화면에서 불러오지 않아도 되는 라이브러리
+HEAVY_MODULES = ["fitz", "pymupdf", "pypdf", "pandas", "pyarrow", "networkx", "scipy", "pyvis"]
+
+# 새 프로세스에서 실행할 측정 코드 (streamlit 자체를 불러오는 시간은 모든 페이지에 같으므로 따로 잼)
+_CHILD = """
+import ast, json, sys, time
+sys.path.insert(0, {root!r})
+t = time.perf_counter()
+import streamlit
+from streamlit.testing.v1 import AppTest
+streamlit_s = time.perf_counter() - t
+
+if {switch}:
+    import threading
+    AppTest.from_file({main!r}, default_timeout=120).run()
+    for thread in threading.enumerate():
+        if thread.name == "resources.warm_up":
+            thread.join()
+
+with open({path!r}, encoding="utf-8") as f:
+    tree = ast.parse(f.read())
+imports = ast.Module([node for node in tree.body if isinstance(node, (ast.Import, ast.ImportFrom))], [])
+t = time.perf_counter()
+exec(compile(imports, {path!r}, "exec"), {{}})
+import_s = time.perf_counter() - t
+
+app = AppTest.from_file({path!r}, default_timeout=120)
+t = time.perf_counter()
+app.run()
+render_s = time.perf_counter() - t
+t = time.perf_counter()
+app.run()
+rerun_s = time.perf_counter() - t
+print(json.dumps({{
+    "streamlit_s": streamlit_s, "import_s": import_s, "render_s": render_s, "rerun_s": rerun_s,
+    "errors": [e.value for e in app.exception],
+    "heavy": [name for name in {heavy!r} if name in sys.modules],
+}}))
+"""
+
+
+def measure(page, switch=False):
+    """새 프로세스에서 페이지 하나를 한 번 재서 결과 딕셔너리를 돌려줍니다."""
+    code = _CHILD.format(root=ROOT, path=os.path.join(ROOT, page), main=os.path.join(ROOT, PAGES[0]),
+                         heavy=HEAVY_MODULES, switch=switch)
+    env = dict(os.environ, PYTHONWARNINGS="ignore", RESOURCE_WARM_UP="1" if switch else "0",
+               RESOURCE_WARM_UP_DELAY="0")
+    out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, env=env, capture_output=True, text=True,
+                         check=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--pages", nargs="+", default=PAGES)
+    parser.add_argument("-o", "--output", help="결과 JSON 파일")
+    args = parser.parse_args()
+
+    print(f"median of {args.repeat} fresh processes (ms)")
+    print(f"{'page':<22} {'streamlit':>9} {'imports':>8} {'render':>8} {'cold':>8} {'rerun':>7} {'switch':>7}"
+          "  heavy modules")
+    results = {}
+    eager = {}
+    for page in args.pages:
+        runs = [measure(page) for _ in range(args.repeat)]
+        heavy = [name for name in HEAVY_MODULES if any(name in run["heavy"] for run in runs)]
+        if heavy:
+            eager[page] = heavy
+        row = {key: round(statistics.median(run[f"{key}_s"] for run in runs) * 1000, 1)
+               for key in ("streamlit", "import", "render", "rerun")}
+        row["cold"] = row["import"] + row["render"]
+        row["switch"] = None
+        if page != PAGES[0]:
+            switches = [measure(page, switch=True) for _ in range(args.repeat)]
+            row["switch"] = round(statistics.median(run["import_s"] + run["render_s"] for run in switches) * 1000, 1)
+        results[page] = {**{f"{key}_ms": value for key, value in row.items()}, "heavy": heavy}
+        switch = f"{row['switch']:.0f}" if row["switch"] is not None else "-"
+        errors = runs[-1]["errors"]
+        print(f"{os.path.basename(page):<22} {row['streamlit']:>9.0f} {row['import']:>8.0f} {row['render']:>8.0f} "
+              f"{row['cold']:>8.0f} {row['rerun']:>7.0f} {switch:>7}  {', '.join(heavy)}"
+              + (f"  (오류: {errors})" if errors else ""))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+    if eager:
+        sys.exit("첫 화면에서 무거운 라이브러리를 불러온 페이지: "
+                 + "; ".join(f"{page} ({', '.join(heavy)})" for page, heavy in eager.items()))
+
+
+if __name__ == "__main__":
+    main()
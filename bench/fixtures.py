@@ -0,0 +1,167 @@
+"""
+벤치마크용 합성 입력 파일
+
+이름에 크기가 들어간 입력 파일(예: scan-200.pdf, survey-10000.csv)을 항상 같은 내용으로 만들어
+폴더에 저장해 두고 다시 씁니다. (PyMuPDF·Pillow 버전이 같으면 어디서 만들어도 바이트가 같음)
+
+    python -m bench.fixtures text-300.pdf scan-200.pdf photo-6000x4000.jpg
+"""
+import argparse
+import hashlib
+import io
+import os
+import random
+import re
+import tempfile
+
+import fitz  # PyMuPDF 라이브러리
+from PIL import Image, ImageDraw
+
+from bench.bench_relmap import make_survey
+from bench.bench_render import make_pdf
+
+# 만든 입력 파일을 보관할 폴더
+FIXTURE_DIR = os.environ.get("BENCH_FIXTURE_DIR") or os.path.join(tempfile.gettempdir(), "pdfbench-fixtures")
+
+SCAN_DPI = 150  # 스캔 PDF 페이지 이미지 해상도 (A4 1240x1754)
+
+
+def scan_pdf(num_pages, seed=0):
+    """
+    페이지마다 JPEG 스캔 이미지 한 장이 페이지 전체를 덮는 PDF (홀수 쪽은 회색조, 짝수 쪽은 컬러)
+    글자 줄을 흉내 낸 어두운 막대와 옅은 얼룩을 그려 실제 스캔과 비슷한 크기로 압축되게 합니다.
+    """
+    rng = random.Random(seed)
+    width, height = round(595 * SCAN_DPI / 72), round(842 * SCAN_DPI / 72)
+    doc = fitz.open()
+    for i in range(num_pages):
+        mode = "L" if i % 2 == 0 else "RGB"
+        image = Image.new(mode, (width, height), 245 if mode == "L" else (245, 243, 236))
+        draw = ImageDraw.Draw(image)
+        for _ in range(40):
+            x, y, r = rng.randrange(width), rng.randrange(height), rng.randrange(20, 120)
+            shade = rng.randrange(225, 240)
+            draw.ellipse((x - r, y - r, x + r, y + r), fill=shade if mode == "L" else (shade, shade, shade - 8))
+        y = 150
+        while y < height - 150:
+            x = 120
+            while x < width - 160:
+                word = rng.randrange(30, 140)
+                ink = rng.randrange(20, 70)
+                draw.rectangle((x, y, x + word, y + 18), fill=ink if mode == "L" else (ink, ink, ink + 20))
+                x += word + rng.randrange(12, 30)
+            y += rng.choice((36, 36, 36, 72))
+        buf = io.BytesIO()
+        image.save(buf, format="JPEG", quality=75)
+        page = doc.new_page()
+        page.insert_image(page.rect, stream=buf.getvalue())
+    data = doc.tobytes(no_new_id=True)
+    doc.close()
+    return data
+
+
+def duplex_pdf(num_sheets, side):
+    """
+    양면 스캔 한쪽 면: side가 "front"면 1, 3, 5쪽… 정순, "back"이면 …6, 4, 2쪽 역순
+    (아래쪽 가운데에 쪽 번호를 찍어 병합 순서 판단에 쓰임)
+    """
+    numbers = [2 * i + (1 if side == "front" else 2) for i in range(num_sheets)]
+    if side == "back":
+        numbers.reverse()
+    doc = fitz.open()
+    for number in numbers:
+        page = doc.new_page()
+        page.insert_text((72, 100), f"Sheet content {number} " * 3, fontsize=20)
+        for row in range(25):
+            page.insert_text((72, 140 + row * 24), "Lorem ipsum dolor sit amet " * 3, fontsize=10)
+        page.insert_text((290, 820), str(number), fontsize=10)
+    data = doc.tobytes(no_new_id=True)
+    doc.close()
+    return data
+
+
+def survey_csv(rows):
+    """관계 열 3개에 "이름1, 이름2" 형식으로 지목이 들어 있는 설문 CSV (UTF-8 BOM)"""
+    return make_survey(rows).to_csv(index=False).encode("utf-8-sig")
+
+
+def photo(width, height, fmt, seed=0):
+    """그라데이션 위에 도형과 잡음을 그린 사진 크기 이미지 (JPEG 품질 90 또는 PNG)"""
+    rng = random.Random(seed)
+    image = Image.merge("RGB", [
+        Image.linear_gradient("L").resize((width, height)),
+        Image.linear_gradient("L").rotate(90).resize((width, height)),
+        Image.new("L", (width, height), 128),
+    ])
+    draw = ImageDraw.Draw(image)
+    for _ in range(200):
+        x, y = rng.randrange(width), rng.randrange(height)
+        r = rng.randrange(10, max(11, min(width, height) // 8))
+        draw.ellipse((x - r, y - r, x + r, y + r),
+                     fill=(rng.randrange(256), rng.randrange(256), rng.randrange(256)))
+    # 센서 잡음처럼 픽셀마다 다른 값을 조금 섞어 실제 사진과 비슷한 크기로 압축되게 함
+    noise = Image.frombytes("L", (width, height), rng.randbytes(width * height))
+    image = Image.blend(image, Image.merge("RGB", [noise] * 3), 0.06)
+    buf = io.BytesIO()
+    if fmt == "jpg":
+        image.save(buf, format="JPEG", quality=90)
+    else:
+        image.save(buf, format="PNG")
+    return buf.getvalue()
+
+
+# 입력 파일 이름 형식 → 만드는 함수
+_BUILDERS = [
+    (re.compile(r"text-(\d+)\.pdf"), lambda m: make_pdf(int(m[1]))),
+    (re.compile(r"scan-(\d+)\.pdf"), lambda m: scan_pdf(int(m[1]))),
+    (re.compile(r"duplex-(front|back)-(\d+)\.pdf"), lambda m: duplex_pdf(int(m[2]), m[1])),
+    (re.compile(r"survey-(\d+)\.csv"), lambda m: survey_csv(int(m[1]))),
+    (re.compile(r"photo-(\d+)x(\d+)\.(jpg|png)"), lambda m: photo(int(m[1]), int(m[2]), m[3])),
+]
+
+
+def build(name):
+    """입력 파일 이름에 맞는 내용을 새로 만들어 돌려줍니다."""
+    for pattern, builder in _BUILDERS:
+        match = pattern.fullmatch(name)
+        if match:
+            return builder(match)
+    raise ValueError(f"알 수 없는 입력 파일 이름입니다: {name}")
+
+
+def fixture_path(name, fixture_dir=FIXTURE_DIR):
+    """입력 파일 경로를 돌려줍니다. 아직 없으면 만들어 저장합니다."""
+    path = os.path.join(fixture_dir, name)
+    if not os.path.exists(path):
+        os.makedirs(fixture_dir, exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(build(name))
+        os.replace(tmp_path, path)
+    return path
+
+
+def load(name, fixture_dir=FIXTURE_DIR):
+    with open(fixture_path(name, fixture_dir), "rb") as f:
+        return f.read()
+
+
+def describe(name, fixture_dir=FIXTURE_DIR):
+    """결과 파일에 남길 입력 파일 정보: 크기와 내용 해시 (기준 결과와 같은 입력인지 확인용)"""
+    with open(fixture_path(name, fixture_dir), "rb") as f:
+        data = f.read()
+    return {"bytes": len(data), "blake2b": hashlib.blake2b(data, digest_size=16).hexdigest()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("names", nargs="+", help="만들 입력 파일 이름")
+    parser.add_argument("--dir", default=FIXTURE_DIR)
+    args = parser.parse_args()
+    for name in args.names:
+        info = describe(name, args.dir)
+        print(f"{name}: {info['bytes'] / 1024 / 1024:.1f} MB {info['blake2b']}")
+
+
+if __name__ == "__main__":
+    main()
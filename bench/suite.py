@@ -0,0 +1,497 @@
+"""
+전체 도구 성능 벤치마크 (기준 결과 저장·비교)
+
+합성 입력(bench.fixtures)으로 각 화면의 핵심 처리를 측정해 처리량, 항목(페이지·이미지)별 지연 시간 백분위,
+최대 메모리(RSS)를 JSON으로 남기고, 기준 결과와 비교해 기준치 이상 느려지거나 메모리를 더 쓴 측정을 표시합니다.
+측정마다 새 파이썬 프로세스에서 실행하므로 최대 메모리가 다른 측정과 섞이지 않습니다.
+
+    python -m bench.suite list
+    python -m bench.suite run -o baseline.json
+    python -m bench.suite run --profile quick --cases "pdf2img.*" --compare baseline.json --threshold 0.15
+    python -m bench.suite compare baseline.json current.json
+
+run --compare와 compare는 느려진 측정이 있으면 종료 코드 1을 돌려줍니다.
+"""
+import argparse
+import fnmatch
+import io
+import itertools
+import json
+import multiprocessing
+import os
+import platform
+import sys
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from importlib import metadata
+
+try:
+    import resource  # Windows에는 없음 (최대 RSS는 0으로 기록)
+except ImportError:
+    resource = None
+
+from bench import fixtures
+
+# 결과 파일 형식 버전
+RESULT_VERSION = 1
+# 느려짐으로 볼 기본 변화율 (0.10 = 10%)
+DEFAULT_THRESHOLD = 0.10
+# 이보다 작은 메모리 증가는 측정 오차로 보고 무시 (MB)
+MEMORY_SLACK_MB = 16
+# 환경 정보에 버전을 남길 패키지
+PACKAGES = ["PyMuPDF", "Pillow", "pypdf", "pandas", "numpy", "scipy", "networkx", "pyvis"]
+
+# 입력 크기 묶음: full은 기준 결과용, quick은 변경 중 빠른 확인용
+PROFILES = {
+    "full": {
+        "text_pages": 300, "scan_pages": 200, "duplex_sheets": 150,
+        "survey_rows": (1000, 10000, 100000), "html_rows": (1000, 10000),
+        "jpeg": "photo-6000x4000.jpg", "png": "photo-4000x3000.png",
+    },
+    "quick": {
+        "text_pages": 30, "scan_pages": 20, "duplex_sheets": 15,
+        "survey_rows": (1000, 10000), "html_rows": (1000,),
+        "jpeg": "photo-3000x2000.jpg", "png": "photo-2000x1500.png",
+    },
+}
+
+CROP_RECT = (50, 50, 545, 300)  # 영역 추출에 쓸 PDF 좌표 (페이지 위쪽 문항 한 개 정도)
+GALLERY_PAGES = 12  # 갤러리 한 화면의 썸네일 수
+LETTERBOX_RATIOS = ["1:1", "4:5", "9:16"]
+
+# 측정 하나: 이름, 대상 화면, 입력 파일들, 처리량 단위,
+# setup(입력 바이트들) → 측정에 넘길 상태 (시간에 넣지 않음), run(상태, tick) → 처리한 단위 수
+# run은 항목(페이지 등) 하나를 끝낼 때마다 tick()을 불러 항목별 지연 시간을 남깁니다.
+Case = namedtuple("Case", "name page fixtures unit setup run")
+
+# 캐시(내용 해시 키)를 거치지 않도록 실행마다 다른 키를 씀
+_run_ids = itertools.count()
+
+
+def _ticked(items, tick):
+    for item in items:
+        yield item
+        tick()
+
+
+def _drain_zip(entries):
+    from core.render import write_zip
+
+    spool, names = write_zip(entries)
+    spool.close()
+    return len(names)
+
+
+def _inputs(*datas):
+    return datas
+
+
+# --- main.py: 페이지 → 이미지 ZIP, 갤러리 썸네일 ---
+
+def run_pdf2img(state, tick, workers=1):
+    from core.scan import iter_page_images
+
+    (pdf_bytes,) = state
+    # 스캔 감지 결과는 워밍업 실행 뒤 캐시됨 (페이지당 1ms 안팎)
+    pages = iter_page_images(pdf_bytes, zoom=2.0, workers=workers)
+    return _drain_zip(_ticked(((f"page_{n + 1}.{ext}", data) for n, ext, data in pages), tick))
+
+
+def run_thumbnails(state, tick):
+    from core.render import render_pages
+
+    (pdf_bytes,) = state
+    return sum(1 for _ in _ticked(render_pages(pdf_bytes, zoom=0.4, page_numbers=range(GALLERY_PAGES), workers=1),
+                                  tick))
+
+
+# --- 00_pdf캡쳐.py: 영역 잘라내기, 문항 자동 감지 ---
+
+def run_crop_region(state, tick):
+    from core.render import render_pages
+
+    (pdf_bytes,) = state
+    pages = render_pages(pdf_bytes, zoom=4.0, clip=CROP_RECT, workers=1)
+    return _drain_zip(_ticked(((f"Q_page_{n + 1}.png", data) for n, data in pages), tick))
+
+
+def run_crop_scan(state, tick):
+    import fitz
+
+    from core.crop import iter_page_crops
+
+    (pdf_bytes,) = state
+    with fitz.open(stream=pdf_bytes, filetype="pdf") as doc:
+        page_regions = {n: [("Q", CROP_RECT)] for n in range(len(doc))}
+        crops = iter_page_crops(doc, page_regions, 4.0, passthrough=True)
+        return _drain_zip(_ticked(((f"Q_page_{n + 1}.png", data) for n, _, data in crops), tick))
+
+
+def run_detect(state, tick):
+    import fitz
+
+    from core.detect import detect_page_regions
+
+    (pdf_bytes,) = state
+    with fitz.open(stream=pdf_bytes, filetype="pdf") as doc:
+        for page in doc:
+            detect_page_regions(page)
+            tick()
+        return len(doc)
+
+
+# --- 01_앞뒷면 병합.py: 앞면/뒷면 끼워 넣기 ---
+
+def setup_duplex(front_bytes, back_bytes):
+    from pypdf import PdfReader
+
+    counts = [len(PdfReader(io.BytesIO(data)).pages) for data in (front_bytes, back_bytes)]
+    return front_bytes, back_bytes, counts
+
+
+def run_duplex_interleave(state, tick):
+    from core.duplex import interleave_order, write_pages
+
+    front_bytes, back_bytes, (front_count, back_count) = state
+    path = write_pages(interleave_order(front_count, back_count), (front_bytes, back_bytes))
+    os.remove(path)
+    return front_count + back_count
+
+
+def run_duplex_auto(state, tick):
+    from core.duplex import merge_duplex_auto
+
+    front_bytes, back_bytes, (front_count, back_count) = state
+    path, _ = merge_duplex_auto(front_bytes, back_bytes)
+    os.remove(path)
+    return front_count + back_count
+
+
+# --- 02_관계도.py: 설문 읽기 + 그래프 생성, 서버 배치, pyvis HTML ---
+
+SURVEY_NAME = "이름"
+
+
+def run_relmap_graph(state, tick):
+    from bench.bench_relmap import RELATION_COLUMNS
+    from core.relmap import survey_graph
+    from core.survey import load_survey, survey_header
+
+    (data,) = state
+    digest = f"bench-{next(_run_ids)}"
+    header = survey_header(digest, data, "survey.csv")
+    df = load_survey(digest, data, header, SURVEY_NAME, RELATION_COLUMNS)
+    survey_graph(digest, df, SURVEY_NAME, RELATION_COLUMNS)
+    return len(df)
+
+
+def setup_graph(data):
+    import pandas as pd
+
+    from bench.bench_relmap import RELATION_COLUMNS
+    from core.relmap import build_graph
+
+    return build_graph(pd.read_csv(io.BytesIO(data), encoding="utf-8-sig"), SURVEY_NAME, RELATION_COLUMNS)
+
+
+def run_relmap_layout(G, tick):
+    from core import relmap
+
+    # compute_layout은 그래프별로 캐시하므로 캐시를 거치지 않는 내부 함수로 매번 계산
+    relmap._compute_layout(G, "fast")
+    return G.number_of_nodes()
+
+
+def setup_graph_positions(data):
+    from core import relmap
+
+    G = setup_graph(data)
+    return G, relmap._compute_layout(G, "fast")
+
+
+def run_relmap_html(state, tick):
+    from core import relmap
+
+    # graph_html은 그래프별로 본문을 캐시하므로 pyvis 내보내기 부분만 매번 실행
+    G, positions = state
+    relmap._network_html(G, positions, G.is_directed())
+    return G.number_of_nodes()
+
+
+# --- 03_사진비율.py: 디코딩 + 비율별 레터박스 + 인코딩 ---
+
+def run_letterbox(state, tick):
+    from core.letterbox import letterbox_entries
+
+    (data,) = state
+    return len(letterbox_entries("photo", data, LETTERBOX_RATIOS, "#000000"))
+
+
+def make_cases(profile):
+    """프로필 크기로 측정 목록을 만듭니다."""
+    from core.render import DEFAULT_WORKERS
+
+    sizes = PROFILES[profile]
+    text = f"text-{sizes['text_pages']}.pdf"
+    scan = f"scan-{sizes['scan_pages']}.pdf"
+    duplex = (f"duplex-front-{sizes['duplex_sheets']}.pdf", f"duplex-back-{sizes['duplex_sheets']}.pdf")
+
+    cases = [
+        Case("pdf2img.text", "main.py", (text,), "pages", _inputs, run_pdf2img),
+        Case("pdf2img.text.parallel", "main.py", (text,), "pages", _inputs,
+             lambda state, tick: run_pdf2img(state, tick, workers=DEFAULT_WORKERS)),
+        Case("pdf2img.scan", "main.py", (scan,), "pages", _inputs, run_pdf2img),
+        Case("pdf2img.thumbnails", "main.py", (text,), "pages", _inputs, run_thumbnails),
+        Case("crop.region", "00_pdf캡쳐.py", (text,), "pages", _inputs, run_crop_region),
+        Case("crop.scan", "00_pdf캡쳐.py", (scan,), "pages", _inputs, run_crop_scan),
+        Case("crop.detect", "00_pdf캡쳐.py", (text,), "pages", _inputs, run_detect),
+        Case("duplex.interleave", "01_앞뒷면 병합.py", duplex, "pages", setup_duplex, run_duplex_interleave),
+        Case("duplex.auto", "01_앞뒷면 병합.py", duplex, "pages", setup_duplex, run_duplex_auto),
+    ]
+    for rows in sizes["survey_rows"]:
+        cases.append(Case(f"relmap.graph.{rows}", "02_관계도.py", (f"survey-{rows}.csv",), "rows", _inputs,
+                          run_relmap_graph))
+    for rows in sizes["html_rows"]:
+        survey = (f"survey-{rows}.csv",)
+        cases.append(Case(f"relmap.layout.{rows}", "02_관계도.py", survey, "nodes", setup_graph, run_relmap_layout))
+        cases.append(Case(f"relmap.html.{rows}", "02_관계도.py", survey, "nodes", setup_graph_positions,
+                          run_relmap_html))
+    for photo in (sizes["jpeg"], sizes["png"]):
+        cases.append(Case(f"letterbox.{photo.rsplit('.', 1)[-1]}", "03_사진비율.py", (photo,), "images", _inputs,
+                          run_letterbox))
+    return cases
+
+
+def _peak_rss_mb(who="self"):
+    """
+    최대 RSS (MB). Linux에서 ru_maxrss는 fork·exec를 거쳐도 부모 값을 물려받으므로
+    이 프로세스 자신의 최대치는 /proc/self/status의 VmHWM으로 읽습니다.
+    """
+    if who == "self" and os.path.exists("/proc/self/status"):
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    if resource is None:
+        return 0.0
+    peak = resource.getrusage(resource.RUSAGE_SELF if who == "self" else resource.RUSAGE_CHILDREN).ru_maxrss
+    # Linux는 KB, macOS는 바이트 단위
+    return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+def percentile(values, q):
+    """정렬된 값들의 q(0~100) 백분위 (선형 보간)"""
+    if not values:
+        return 0.0
+    pos = (len(values) - 1) * q / 100
+    low = int(pos)
+    high = min(low + 1, len(values) - 1)
+    return values[low] + (values[high] - values[low]) * (pos - low)
+
+
+def run_case(name, profile, fixture_dir, repeat, warmup):
+    """
+    (새 프로세스에서 실행) 측정 하나를 warmup번 돌린 뒤 repeat번 재서 결과 딕셔너리를 돌려줍니다.
+    """
+    case = next(case for case in make_cases(profile) if case.name == name)
+    state = case.setup(*(fixtures.load(fixture, fixture_dir) for fixture in case.fixtures))
+    setup_rss = _peak_rss_mb()
+
+    for _ in range(warmup):
+        case.run(state, lambda: None)
+
+    totals, latencies, units = [], [], 0
+    for _ in range(repeat):
+        marks = [time.perf_counter()]
+        units = case.run(state, lambda: marks.append(time.perf_counter()))
+        end = time.perf_counter()
+        totals.append(end - marks[0])
+        # tick이 없는 측정은 실행 한 번을 항목 하나로 봄
+        if len(marks) > 1:
+            latencies.extend(b - a for a, b in zip(marks, marks[1:]))
+        else:
+            latencies.append(end - marks[0])
+
+    totals.sort()
+    latencies.sort()
+    median = percentile(totals, 50)
+    return {
+        "page": case.page,
+        "fixtures": list(case.fixtures),
+        "unit": case.unit,
+        "units": units,
+        "repeat": repeat,
+        "total_s": {"median": round(median, 6), "min": round(totals[0], 6), "max": round(totals[-1], 6)},
+        "throughput": round(units / median, 3) if median else None,
+        "latency_ms": {
+            "items": len(latencies),
+            **{f"p{q}": round(percentile(latencies, q) * 1000, 3) for q in (50, 95, 99)},
+            "max": round(latencies[-1] * 1000, 3),
+        },
+        "setup_rss_mb": round(setup_rss, 1),
+        "peak_rss_mb": round(_peak_rss_mb(), 1),
+        "child_peak_rss_mb": round(_peak_rss_mb("children"), 1),
+    }
+
+
+def environment():
+    versions = {}
+    for package in PACKAGES:
+        try:
+            versions[package] = metadata.version(package)
+        except metadata.PackageNotFoundError:
+            versions[package] = None
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "packages": versions,
+    }
+
+
+def run_suite(profile, patterns, repeat, warmup, fixture_dir):
+    cases = [case for case in make_cases(profile)
+             if not patterns or any(fnmatch.fnmatch(case.name, p) for p in patterns)]
+    if not cases:
+        raise SystemExit("선택된 측정이 없습니다. (python -m bench.suite list로 이름 확인)")
+
+    # 입력 파일은 먼저 만들어 두어 측정 시간·메모리에 섞이지 않게 함
+    names = sorted({fixture for case in cases for fixture in case.fixtures})
+    for name in names:
+        fixtures.fixture_path(name, fixture_dir)
+
+    result = {
+        "version": RESULT_VERSION,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "profile": profile,
+        "environment": environment(),
+        "fixtures": {name: fixtures.describe(name, fixture_dir) for name in names},
+        "cases": {},
+    }
+    # spawn: 측정마다 부모의 메모리를 물려받지 않은 새 인터프리터
+    context = multiprocessing.get_context("spawn")
+    for case in cases:
+        with ProcessPoolExecutor(1, mp_context=context) as pool:
+            record = pool.submit(run_case, case.name, profile, fixture_dir, repeat, warmup).result()
+        result["cases"][case.name] = record
+        print(format_row(case.name, record), flush=True)
+    return result
+
+
+def compare(baseline, current, threshold=DEFAULT_THRESHOLD):
+    """
+    두 결과에 모두 있는 측정마다 (이름, 시간 변화율, 메모리 변화율, 느려졌는지)를 돌려줍니다.
+    시간은 실행 시간 중앙값, 메모리는 최대 RSS로 비교합니다. (메모리는 MEMORY_SLACK_MB 이하 증가는 무시)
+    """
+    rows = []
+    for name, record in current["cases"].items():
+        base = baseline["cases"].get(name)
+        if base is None:
+            continue
+        time_change = record["total_s"]["median"] / base["total_s"]["median"] - 1
+        memory_change = record["peak_rss_mb"] / base["peak_rss_mb"] - 1 if base["peak_rss_mb"] else 0.0
+        regressed = time_change > threshold or (
+            memory_change > threshold and record["peak_rss_mb"] - base["peak_rss_mb"] > MEMORY_SLACK_MB
+        )
+        rows.append((name, time_change, memory_change, regressed))
+    return rows
+
+
+def comparison_warnings(baseline, current):
+    """비교 결과를 믿기 어려운 차이 (입력 파일·프로필·환경)"""
+    warnings = []
+    if baseline.get("profile") != current.get("profile"):
+        warnings.append(f"프로필이 다릅니다: {baseline.get('profile')} → {current.get('profile')}")
+    for name, info in current["fixtures"].items():
+        base = baseline["fixtures"].get(name)
+        if base is not None and base["blake2b"] != info["blake2b"]:
+            warnings.append(f"입력 파일 내용이 다릅니다: {name} (라이브러리 버전 차이일 수 있음)")
+    base_env, env = baseline["environment"], current["environment"]
+    if base_env["cpu_count"] != env["cpu_count"]:
+        warnings.append(f"CPU 코어 수가 다릅니다: {base_env['cpu_count']} → {env['cpu_count']}")
+    for package, version in env["packages"].items():
+        if base_env["packages"].get(package) != version:
+            warnings.append(f"{package} 버전이 다릅니다: {base_env['packages'].get(package)} → {version}")
+    return warnings
+
+
+HEADER = f"{'case':<24} {'units/s':>10} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'peak MB':>8}"
+
+
+def format_row(name, record):
+    latency = record["latency_ms"]
+    return (f"{name:<24} {record['throughput'] or 0:>10.1f} {latency['p50']:>9.2f} {latency['p95']:>9.2f} "
+            f"{latency['p99']:>9.2f} {record['peak_rss_mb']:>8.1f}")
+
+
+def print_comparison(baseline, current, threshold):
+    """비교 표를 출력하고 느려진 측정이 있으면 True를 돌려줍니다."""
+    for warning in comparison_warnings(baseline, current):
+        print(f"주의: {warning}")
+    rows = compare(baseline, current, threshold)
+    print(f"\n{'case':<24} {'time':>8} {'memory':>8}  (기준치 {threshold:.0%})")
+    for name, time_change, memory_change, regressed in rows:
+        print(f"{name:<24} {time_change:>+8.1%} {memory_change:>+8.1%}  {'REGRESSION' if regressed else 'ok'}")
+    missing = sorted(set(baseline["cases"]) - set(current["cases"]))
+    if missing:
+        print(f"이번에 측정하지 않은 기준 항목: {', '.join(missing)}")
+    regressions = [name for name, _, _, regressed in rows if regressed]
+    if regressions:
+        print(f"\n느려진 측정 {len(regressions)}개: {', '.join(regressions)}")
+    return bool(regressions)
+
+
+def load_result(path):
+    with open(path, encoding="utf-8") as f:
+        result = json.load(f)
+    if result.get("version") != RESULT_VERSION:
+        raise SystemExit(f"{path}: 결과 파일 형식 버전이 다릅니다. ({result.get('version')})")
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    list_parser = commands.add_parser("list", help="측정 목록")
+    list_parser.add_argument("--profile", choices=PROFILES, default="full")
+
+    run_parser = commands.add_parser("run", help="측정하고 결과를 JSON으로 저장")
+    run_parser.add_argument("-o", "--output", help="결과 JSON 파일 (없으면 표만 출력)")
+    run_parser.add_argument("--profile", choices=PROFILES, default="full")
+    run_parser.add_argument("--cases", nargs="+", metavar="PATTERN", help="측정 이름 패턴 (예: 'pdf2img.*')")
+    run_parser.add_argument("--repeat", type=int, default=3)
+    run_parser.add_argument("--warmup", type=int, default=1)
+    run_parser.add_argument("--fixtures", default=fixtures.FIXTURE_DIR, help="입력 파일 폴더")
+    run_parser.add_argument("--compare", metavar="BASELINE", help="이 기준 결과와 비교")
+    run_parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+
+    compare_parser = commands.add_parser("compare", help="두 결과 JSON 비교")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+
+    args = parser.parse_args(argv)
+    if args.command == "list":
+        for case in make_cases(args.profile):
+            print(f"{case.name:<24} {case.page:<16} {case.unit:<7} {', '.join(case.fixtures)}")
+        return
+
+    if args.command == "compare":
+        sys.exit(1 if print_comparison(load_result(args.baseline), load_result(args.current), args.threshold) else 0)
+
+    baseline = load_result(args.compare) if args.compare else None
+    print(f"profile {args.profile}, repeat {args.repeat}, warmup {args.warmup}")
+    print(HEADER)
+    result = run_suite(args.profile, args.cases, args.repeat, args.warmup, args.fixtures)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+        print(f"\n결과를 {args.output}에 저장했습니다.")
+    if baseline is not None and print_comparison(baseline, result, args.threshold):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
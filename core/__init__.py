@@ -0,0 +1 @@
+# 여러 페이지(Streamlit 스크립트)에서 함께 쓰는 처리 엔진 모음
@@ -0,0 +1,100 @@
+import networkx as nx
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+from core.cache import LRUCache
+from core.metrics import stage
+from core.relmap import graph_hash
+
+# 노드가 이보다 많으면 매개 중심성은 표본 노드로 근사 계산
+BETWEENNESS_SAMPLE_NODES = 500
+BETWEENNESS_SAMPLES = 100
+
+# 그래프 구조별 분석 결과 (최근 16개까지 보관)
+_analyses = LRUCache(max_entries=16)
+
+
+def adjacency_matrix(G):
+    """(노드 이름 목록, 지목 여부를 담은 CSR 희소 행렬) — 행이 지목한 학생, 열이 지목받은 학생"""
+    nodes = sorted(G.nodes)
+    A = nx.to_scipy_sparse_array(G, nodelist=nodes, weight=None, format="csr").astype(np.float64)
+    return nodes, A
+
+
+def pagerank(A, alpha=0.85, tol=1e-10, max_iter=200):
+    """희소 행렬 거듭제곱법 PageRank (지목을 하지 않은 학생의 점수는 모두에게 고르게 나눔)"""
+    n = A.shape[0]
+    out_degree = np.asarray(A.sum(axis=1)).ravel()
+    inverse = np.divide(1.0, out_degree, out=np.zeros(n), where=out_degree > 0)
+    transition_t = (sp.diags(inverse) @ A).T.tocsr()
+    dangling = out_degree == 0
+
+    rank = np.full(n, 1.0 / n)
+    for _ in range(max_iter):
+        previous = rank
+        rank = alpha * (transition_t @ previous + previous[dangling].sum() / n) + (1 - alpha) / n
+        if np.abs(rank - previous).sum() < n * tol:
+            break
+    return rank
+
+
+def _analyze(G):
+    nodes, A = adjacency_matrix(G)
+    n = len(nodes)
+    out_degree = np.asarray(A.sum(axis=1)).ravel().astype(int)
+    in_degree = np.asarray(A.sum(axis=0)).ravel().astype(int)
+
+    # 서로 지목한 쌍: A와 A의 전치가 모두 1인 칸 (위쪽 삼각만 사용해 중복 제거)
+    mutual = sp.triu(A.multiply(A.T), k=1).tocoo()
+    mutual_pairs = pd.DataFrame({
+        "학생 A": [nodes[i] for i in mutual.row],
+        "학생 B": [nodes[j] for j in mutual.col],
+    })
+    mutual_count = np.bincount(np.concatenate([mutual.row, mutual.col]), minlength=n)
+
+    # 방향 없는 그래프는 인접 행렬에서 직접 만듦 (to_undirected 뷰는 이웃을 집합으로 합쳐
+    # 순회 순서가 프로세스마다 달라지고, 그에 따라 커뮤니티 결과도 달라짐)
+    linked = sp.triu(A + A.T, k=1).tocoo()
+    undirected = nx.Graph()
+    undirected.add_nodes_from(range(n))
+    undirected.add_edges_from(zip(linked.row.tolist(), linked.col.tolist()))
+    communities = nx.community.louvain_communities(undirected, seed=0) if G.number_of_edges() else [{i} for i in range(n)]
+    group_of = {nodes[i]: group for group, members in enumerate(sorted(communities, key=len, reverse=True), start=1)
+                for i in members}
+
+    if n > BETWEENNESS_SAMPLE_NODES:
+        betweenness = nx.betweenness_centrality(G, k=BETWEENNESS_SAMPLES, seed=0)
+    else:
+        betweenness = nx.betweenness_centrality(G)
+
+    table = pd.DataFrame({
+        "이름": nodes,
+        "받은 지목": in_degree,
+        "한 지목": out_degree,
+        "상호 지목": mutual_count,
+        "PageRank": pagerank(A) if n else [],
+        "매개 중심성": [betweenness[node] for node in nodes],
+        "그룹": [group_of[node] for node in nodes],
+    }).sort_values(["받은 지목", "PageRank"], ascending=False, ignore_index=True)
+
+    return {
+        "table": table,
+        "mutual_pairs": mutual_pairs,
+        "no_incoming": table.loc[table["받은 지목"] == 0, "이름"].tolist(),
+        "communities": len(communities),
+    }
+
+
+def analyze_graph(G):
+    """
+    지목 방향이 있는 관계 그래프(nx.DiGraph)를 분석합니다.
+    학생별 받은/한 지목 수, 상호 지목 수, PageRank, 매개 중심성, 그룹(Louvain 커뮤니티) 표와
+    상호 지목 쌍, 아무에게도 지목받지 못한 학생 목록을 dict로 돌려줍니다.
+    같은 구조의 그래프는 캐시된 결과를 돌려줍니다.
+    """
+    def create():
+        with stage("graph.analyze", nodes=G.number_of_nodes(), edges=G.number_of_edges()):
+            return _analyze(G)
+
+    return _analyses.get_or_create(graph_hash(G), create)
@@ -0,0 +1,163 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+# 메모리 캐시 기본 용량 (MB), 디스크 캐시 폴더는 지정했을 때만 사용
+DEFAULT_BUDGET_MB = int(os.environ.get("RENDER_CACHE_MB", "256"))
+DEFAULT_DISK_DIR = os.environ.get("RENDER_CACHE_DIR") or None
+
+
+def content_hash(data):
+    """업로드된 파일 바이트의 내용 해시 (캐시 키에 사용, 임시 파일로 옮긴 업로드는 저장할 때 계산한 해시)"""
+    digest = getattr(data, "digest", None)
+    if digest is not None:
+        return digest
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def render_key(digest, page_num, zoom, clip=None, fmt="png"):
+    """
+    (파일 해시, 페이지 번호, 확대율, 잘라낼 영역, 출력 형식)으로 캐시 키를 만듭니다.
+    """
+    if clip is not None:
+        clip = tuple(round(float(v), 3) for v in clip)
+    return (digest, page_num, float(zoom), clip, fmt)
+
+
+class LRUCache:
+    """
+    개수로 크기를 제한하는 간단한 LRU 캐시입니다. (그래프 레이아웃·분석 결과 등 파이썬 객체용)
+    """
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_create(self, key, create):
+        with self._lock:
+            if key in self._items:
+                self._items.move_to_end(key)
+                return self._items[key]
+
+        value = create()
+
+        with self._lock:
+            self._items[key] = value
+            while len(self._items) > self.max_entries:
+                self._items.popitem(last=False)
+        return value
+
+
+class RenderCache:
+    """
+    렌더링 결과(인코딩된 바이트)를 담는 LRU 캐시입니다.
+    메모리 용량을 넘으면 가장 오래 쓰지 않은 항목부터 버리고,
+    disk_dir를 지정하면 버려진 항목도 디스크에서 다시 찾아옵니다.
+    Streamlit 세션 스레드들이 함께 쓰므로 모든 접근은 잠금으로 보호합니다.
+    """
+
+    def __init__(self, budget_mb=DEFAULT_BUDGET_MB, disk_dir=DEFAULT_DISK_DIR):
+        self.budget = budget_mb * 1024 * 1024
+        self.disk_dir = disk_dir
+        self.size = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    def _disk_path(self, key):
+        name = hashlib.blake2b(repr(key).encode(), digest_size=16).hexdigest()
+        return os.path.join(self.disk_dir, name)
+
+    def __contains__(self, key):
+        # 없는 키는 곧 렌더링으로 이어지므로 여기서 누락으로 셈 (적중은 get에서 셈)
+        with self._lock:
+            if key in self._items:
+                return True
+        if self.disk_dir and os.path.exists(self._disk_path(key)):
+            return True
+        with self._lock:
+            self.misses += 1
+        return False
+
+    def get(self, key):
+        with self._lock:
+            data = self._items.get(key)
+            if data is not None:
+                self._items.move_to_end(key)
+                self.hits += 1
+                return data
+
+        if self.disk_dir:
+            try:
+                with open(self._disk_path(key), "rb") as f:
+                    data = f.read()
+            except FileNotFoundError:
+                pass
+            else:
+                with self._lock:
+                    self.disk_hits += 1
+                self._store(key, data)
+                return data
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key, data):
+        self._store(key, data)
+        if self.disk_dir:
+            path = self._disk_path(key)
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+
+    def _store(self, key, data):
+        if len(data) > self.budget:
+            return
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self.size -= len(old)
+            self._items[key] = data
+            self.size += len(data)
+            while self.size > self.budget:
+                _, evicted = self._items.popitem(last=False)
+                self.size -= len(evicted)
+                self.evictions += 1
+
+    def get_or_create(self, key, create):
+        """캐시에 없으면 create()로 만들어 저장한 뒤 돌려줍니다."""
+        data = self.get(key)
+        if data is None:
+            data = create()
+            self.put(key, data)
+        return data
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self.size = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._items),
+                "size_mb": round(self.size / (1024 * 1024), 1),
+                "budget_mb": round(self.budget / (1024 * 1024), 1),
+            }
+
+
+# 프로세스 전체에서 함께 쓰는 렌더링 캐시
+render_cache = RenderCache()
@@ -0,0 +1,340 @@
+"""
+Streamlit 없이 쓰는 명령줄 도구
+
+웹 화면과 같은 처리 엔진(core)을 사용하며, 폴더를 넘기면 안의 파일을 모두 처리하고
+결과는 만들어지는 대로 출력 폴더에 기록합니다.
+
+    python -m core pdf2img 시험지/ -o 이미지/ --dpi 144 --format WebP
+    python -m core pdf2img 스캔/ -o 이미지/ --passthrough   (스캔 페이지는 PDF에 든 이미지를 그대로 저장)
+    python -m core crop 시험지/ -o 문항/ --auto
+    python -m core crop a.pdf -o 문항/ --region Q1:50,50,750,200 --region Q2:50,220,750,400@1-3
+    python -m core duplex-merge 스캔/ -o 병합/
+    python -m core relmap 설문.csv -o 관계도/ --name-column 이름 --relation-columns "친한 친구"
+    python -m core letterbox 사진/ 사진묶음.zip -o 변환/ --ratio 1:1 --ratio 4:5 --ratio 9:16
+    python -m core --metrics 기록.jsonl pdf2img 시험지/ -o 이미지/   (단계별 시간·메모리를 JSON Lines로 기록)
+"""
+import argparse
+import os
+import shutil
+import sys
+
+from core.export import DEFAULT_EXPORT, FORMATS, ExportOptions, dpi_to_zoom, export_extension
+from core.metrics import enable_log, stage
+from core.render import DEFAULT_WORKERS, ordered_results, process_pool
+
+
+def iter_input_files(paths, extensions):
+    """
+    파일 경로는 그대로, 폴더는 안의 파일(하위 폴더 포함) 중 확장자가 맞는 것을 이름순으로 돌려줍니다.
+    """
+    for _, path in iter_named_input_files(paths, extensions):
+        yield path
+
+
+def iter_named_input_files(paths, extensions):
+    """
+    iter_input_files와 같은 순서로 (이름, 경로)를 돌려줍니다. 이름은 파일이면 파일명,
+    폴더 안의 파일이면 그 폴더 기준 상대 경로("하위폴더/파일명")라 하위 폴더끼리 파일명이 같아도 겹치지 않습니다.
+    """
+    for path in paths:
+        if not os.path.isdir(path):
+            yield os.path.basename(path), path
+            continue
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            for file_name in sorted(files):
+                if file_name.rsplit('.', 1)[-1].lower() in extensions and not file_name.startswith('.'):
+                    file_path = os.path.join(root, file_name)
+                    yield os.path.relpath(file_path, path).replace(os.sep, "/"), file_path
+
+
+def read_file(path):
+    with stage("file.read", file=path), open(path, "rb") as f:
+        return f.read()
+
+
+class LazyInputs:
+    """
+    len()으로 개수를 알 수 있고, 꺼낼 때마다 load(항목)으로 파일을 읽어 돌려주는 입력 목록입니다.
+    ordered_results가 앞서 맡기는 일을 작업자 수의 두 배로 제한하므로, 폴더 전체가 아니라
+    그만큼의 파일만 메모리에 올라옵니다.
+    """
+
+    def __init__(self, items, load):
+        self.items = items
+        self.load = load
+
+    def __len__(self):
+        return len(self.items)
+
+    def __iter__(self):
+        return (self.load(item) for item in self.items)
+
+
+def split_input_name(name):
+    """
+    입력 이름("하위폴더/파일명.pdf", iter_named_input_files 참고)을 (폴더 접두어 "하위폴더/" 또는 "", 확장자를 뺀 파일명)으로
+    나눕니다. 결과를 폴더 접두어 아래에 두면 하위 폴더끼리 파일명이 같아도 결과가 겹치지 않습니다.
+    """
+    folder, _, file_name = name.rpartition("/")
+    return (f"{folder}/" if folder else ""), file_name.rsplit('.', 1)[0]
+
+
+def write_entries(output_dir, entries):
+    """(상대 경로, 바이트)를 받는 대로 출력 폴더에 기록하고 기록한 파일 수를 돌려줍니다."""
+    count = 0
+    for name, data in entries:
+        path = os.path.join(output_dir, name)
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(data)
+        count += 1
+    return count
+
+
+def export_options(args):
+    return ExportOptions(args.format, args.quality, args.compress_level, args.lossless)
+
+
+def map_files(fn, arg_tuples, workers):
+    """
+    파일마다 fn(*인자)를 프로세스 풀 하나에서 나눠 실행하고 결과를 입력 순서대로 돌려줍니다.
+    (앞서 제출한 파일이 작업자 수의 두 배를 넘으면 먼저 받으므로 결과가 쌓이지 않음, 작업자가 1이면 차례로 실행)
+    """
+    if workers <= 1:
+        for args in arg_tuples:
+            yield fn(*args)
+        return
+    with process_pool(workers) as pool:
+        yield from ordered_results(pool, fn, arg_tuples, workers)
+
+
+def _pdf2img_file(name, path, output_dir, zoom, workers, export, passthrough):
+    from core.scan import iter_page_images
+
+    folder, base_name = split_input_name(name)
+    pages = iter_page_images(read_file(path), zoom=zoom, workers=workers, export=export, passthrough=passthrough)
+    return write_entries(output_dir, (
+        (f"{folder}{base_name}/{base_name}_page_{page_num+1}.{ext}", data) for page_num, ext, data in pages
+    ))
+
+
+def cmd_pdf2img(args):
+    export = export_options(args)
+    inputs = list(iter_named_input_files(args.inputs, {"pdf"}))
+    # 파일이 여러 개면 파일 단위로, 하나뿐이면 페이지 단위로 나눠 처리 (풀 안에서 풀을 또 만들지 않음)
+    file_workers = min(args.workers, len(inputs))
+    page_workers = args.workers if file_workers <= 1 else 1
+    counts = map_files(_pdf2img_file, (
+        (name, path, args.output, dpi_to_zoom(args.dpi), page_workers, export, args.passthrough)
+        for name, path in inputs
+    ), file_workers)
+    for (_, path), count in zip(inputs, counts):
+        print(f"{path}: {count}페이지")
+
+
+def _parse_region(spec):
+    # "이름:x0,y0,x1,y1" 또는 "이름:x0,y0,x1,y1@1-3,5"
+    from core.crop import Region, parse_page_spec
+
+    name, _, rest = spec.partition(":")
+    coords, _, pages = rest.partition("@")
+    try:
+        x0, y0, x1, y1 = (float(v) for v in coords.split(","))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"영역 형식이 올바르지 않습니다: {spec} (예: Q1:50,50,750,200@1-3)")
+    if not name or x1 <= x0 or y1 <= y0:
+        raise argparse.ArgumentTypeError(f"영역 이름이 없거나 좌표 범위가 올바르지 않습니다: {spec}")
+    return Region(name, (x0, y0, x1, y1), parse_page_spec(pages))
+
+
+def _auto_crop_file(file_name, path, zoom, export, passthrough):
+    from core.crop import crop_entry_name, iter_page_crops
+    from core.detect import detect_document_regions
+    from core.uploads import open_pdf
+
+    ext = export_extension(export)
+    with open_pdf(read_file(path)) as doc:
+        page_regions = detect_document_regions(doc)
+        return [
+            (crop_entry_name(file_name, name, page_num, ext), data)
+            for page_num, name, data in iter_page_crops(doc, page_regions, zoom, export, passthrough)
+        ]
+
+
+def cmd_crop(args):
+    from core.crop import iter_batch_crops
+
+    export = export_options(args)
+    zoom = dpi_to_zoom(args.dpi)
+    inputs = list(iter_named_input_files(args.inputs, {"pdf"}))
+    if args.auto:
+        # 문항 자동 감지: 파일 단위로 프로세스 풀에서 나눠 처리하고 끝난 순서가 아닌 입력 순서로 기록
+        entries = map_files(_auto_crop_file, ((name, path, zoom, export, args.passthrough) for name, path in inputs),
+                            min(args.workers, len(inputs)))
+        for (_, path), file_entries in zip(inputs, entries):
+            print(f"{path}: {write_entries(args.output, file_entries)}개 영역")
+        return
+
+    if not args.region:
+        raise SystemExit("--region을 하나 이상 지정하거나 --auto를 사용하세요.")
+    # 파일은 작업자에게 맡길 때 하나씩 읽음
+    files = LazyInputs(inputs, lambda item: (item[0], read_file(item[1])))
+    count = write_entries(args.output, iter_batch_crops(files, args.region, zoom, min(args.workers, len(files)),
+                                                        export, args.passthrough))
+    print(f"PDF {len(files)}개, 영역 {len(args.region)}개: {count}장")
+
+
+def cmd_duplex_merge(args):
+    from core.duplex import UNDETERMINED, merge_duplex_batch, pair_uploads
+
+    # 폴더 기준 상대 경로로 짝지으므로 하위 폴더마다 같은 파일명(예: 1반/앞면.pdf, 2반/앞면.pdf)이 있어도 됨
+    paths = dict(iter_named_input_files(args.inputs, {"pdf"}))
+    pairs, unmatched = pair_uploads(list(paths))
+    for file_name in unmatched:
+        print(f"짝을 찾지 못한 파일: {paths[file_name]}", file=sys.stderr)
+    if not pairs:
+        raise SystemExit("앞면/뒷면으로 짝지을 수 있는 파일이 없습니다.")
+
+    os.makedirs(args.output, exist_ok=True)
+    # 쌍마다 작업자에게 맡길 때 앞면·뒷면 파일을 읽음
+    jobs = LazyInputs(pairs, lambda pair: (pair[0], read_file(paths[pair[1]]), read_file(paths[pair[2]])))
+    back_order = None if args.back_order == "auto" else args.back_order
+    for name, path, report in merge_duplex_batch(jobs, skip_blank=not args.keep_blank, workers=args.workers,
+                                                 back_order=back_order):
+        target = os.path.join(args.output, f"{name}_merged.pdf")
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        shutil.move(path, target)
+        print(f"{target}: {report['output_pages']}페이지 (뒷면 순서: {report['back_order']}, "
+              f"빈 페이지 제외: {report['blank_pages_skipped']}, 여분 페이지 제거: {report['trimmed_pages']})")
+        if report["back_order"] == UNDETERMINED:
+            print(f"{target}: 뒷면 순서를 판단하지 못해 역순으로 병합했습니다. 정순이면 --back-order forward로 "
+                  "다시 병합하세요.", file=sys.stderr)
+
+
+def _relmap_file(name, path, output_dir, name_column, relation_columns, directed, layout_method, style):
+    # 설문 파일 하나로 관계도 HTML과 분석표를 기록하고 (출력할 메시지, 오류 여부)를 돌려줌
+    from core.analytics import analyze_graph
+    from core.cache import content_hash
+    from core.relmap import build_graph, graph_html
+    from core.survey import load_survey, survey_header
+
+    data = read_file(path)
+    digest = content_hash(data)
+    header = survey_header(digest, data, os.path.basename(path))
+    missing = [c for c in [name_column, *relation_columns] if c not in header.columns]
+    if missing:
+        return f"{path}: 열을 찾을 수 없습니다: {', '.join(missing)}", True
+
+    df = load_survey(digest, data, header, name_column, relation_columns)
+    G = build_graph(df, name_column, relation_columns, directed=directed)
+    folder, base_name = split_input_name(name)
+    output_dir = os.path.join(output_dir, folder)
+    os.makedirs(output_dir, exist_ok=True)
+    with open(os.path.join(output_dir, f"{base_name}_relmap.html"), "w", encoding="utf-8") as f:
+        f.write(graph_html(G, layout_method, style))
+
+    G_picks = G if directed else build_graph(df, name_column, relation_columns, directed=True)
+    analysis = analyze_graph(G_picks)
+    analysis["table"].to_csv(os.path.join(output_dir, f"{base_name}_analysis.csv"), index=False,
+                             encoding="utf-8-sig")
+    return (f"{path}: 학생 {G.number_of_nodes()}명, 관계 {G.number_of_edges()}개, "
+            f"상호 지목 {len(analysis['mutual_pairs'])}쌍"), False
+
+
+def cmd_relmap(args):
+    from core.relmap import GraphStyle
+    from core.survey import SURVEY_TYPES
+
+    layout_method = None if args.layout == "browser" else args.layout
+    style = GraphStyle(args.bg_color, args.font_color, args.node_size, args.font_size, args.edge_width)
+    os.makedirs(args.output, exist_ok=True)
+    inputs = list(iter_named_input_files(args.inputs, set(SURVEY_TYPES)))
+    # 설문 파일 단위로 프로세스 풀에서 나눠 처리
+    results = map_files(_relmap_file, (
+        (name, path, args.output, args.name_column, args.relation_columns, args.directed, layout_method, style)
+        for name, path in inputs
+    ), min(args.workers, len(inputs)))
+    for message, failed in results:
+        print(message, file=sys.stderr if failed else sys.stdout)
+
+
+def cmd_letterbox(args):
+    from core.letterbox import IMAGE_TYPES, iter_letterbox_batch, iter_upload_images
+
+    paths = iter_input_files(args.inputs, set(IMAGE_TYPES) | {"zip"})
+    uploads = ((os.path.basename(path), read_file(path)) for path in paths)
+    entries = iter_letterbox_batch(iter_upload_images(uploads), args.ratio, args.color, args.workers,
+                                   export_options(args))
+    print(f"{write_entries(args.output, entries)}개 이미지")
+
+
+def build_parser():
+    from core.letterbox import RATIOS
+
+    parser = argparse.ArgumentParser(prog="python -m core", description=__doc__.splitlines()[1])
+    parser.add_argument("--metrics", metavar="FILE", help="처리 단계별 시간·메모리 기록(JSON Lines)을 남길 파일")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    def add_command(name, handler, help, export=True, dpi=None):
+        command = commands.add_parser(name, help=help, description=help)
+        command.add_argument("inputs", nargs="+", help="처리할 파일 또는 폴더")
+        command.add_argument("-o", "--output", required=True, help="결과를 기록할 폴더")
+        command.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="작업자(프로세스) 수")
+        if dpi:
+            command.add_argument("--dpi", type=int, default=dpi, help=f"출력 해상도 (기본 {dpi})")
+        if export:
+            command.add_argument("--format", choices=list(FORMATS), default=DEFAULT_EXPORT.format)
+            command.add_argument("--quality", type=int, default=DEFAULT_EXPORT.quality, help="JPEG·WebP 품질 (1~100)")
+            command.add_argument("--compress-level", type=int, default=DEFAULT_EXPORT.compress_level,
+                                 help="PNG 압축 단계 (0~9)")
+            command.add_argument("--lossless", action="store_true", help="무손실 WebP")
+        command.set_defaults(handler=handler)
+        return command
+
+    pdf2img = add_command("pdf2img", cmd_pdf2img, "PDF 페이지를 이미지로 변환", dpi=144)
+    pdf2img.add_argument("--passthrough", action="store_true",
+                         help="스캔 이미지 한 장뿐인 페이지는 렌더링 없이 PDF에 든 이미지를 원본 그대로 저장")
+
+    crop = add_command("crop", cmd_crop, "PDF에서 질문 영역을 잘라 이미지로 저장", dpi=288)
+    crop.add_argument("--region", action="append", type=_parse_region, default=[],
+                      help="이름:x0,y0,x1,y1[@페이지] (PDF 72 DPI 좌표, 여러 번 지정 가능)")
+    crop.add_argument("--auto", action="store_true", help="문항 번호·테두리로 영역 자동 감지")
+    crop.add_argument("--passthrough", action="store_true",
+                      help="스캔 이미지 한 장뿐인 페이지는 스캔 원본 해상도로 픽셀을 그대로 잘라냄")
+
+    duplex = add_command("duplex-merge", cmd_duplex_merge, "앞면/뒷면 스캔 PDF를 파일명으로 짝지어 병합",
+                         export=False)
+    duplex.add_argument("--keep-blank", action="store_true", help="빈 페이지도 결과에 남김")
+    duplex.add_argument("--back-order", choices=["auto", "reversed", "forward"], default="auto",
+                        help="뒷면 스캔 순서 (auto: 쌍마다 판단, 판단할 수 없으면 역순으로 병합하고 알림)")
+
+    relmap = add_command("relmap", cmd_relmap, "설문 파일로 친구 관계도 HTML과 분석표(CSV) 만들기",
+                         export=False)
+    relmap.add_argument("--name-column", required=True)
+    relmap.add_argument("--relation-columns", nargs="+", required=True)
+    relmap.add_argument("--directed", action="store_true", help="화살표(지목 방향)로 표시")
+    relmap.add_argument("--layout", choices=["auto", "spring", "fast", "browser"], default="auto")
+    relmap.add_argument("--bg-color", default="#222222")
+    relmap.add_argument("--font-color", default="white")
+    relmap.add_argument("--node-size", type=int, default=15)
+    relmap.add_argument("--font-size", type=int, default=12)
+    relmap.add_argument("--edge-width", type=float, default=1.0)
+
+    letterbox = add_command("letterbox", cmd_letterbox, "사진(또는 사진 ZIP)을 여러 비율의 레터박스 이미지로 변환")
+    letterbox.add_argument("--ratio", action="append", choices=list(RATIOS), help="만들 비율 (여러 번 지정 가능)")
+    letterbox.add_argument("--color", default="#000000", help="레터박스 색상 (HEX)")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.metrics:
+        enable_log(args.metrics)
+    if args.command == "letterbox" and not args.ratio:
+        args.ratio = ["1:1"]
+    args.handler(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+from collections import namedtuple
+
+from core.export import DEFAULT_EXPORT, encode_pixmap, export_extension
+from core.metrics import stage
+from core.render import DEFAULT_WORKERS, ordered_results, process_pool
+from core.scan import scan_image, scan_region
+from core.uploads import open_pdf
+
+# 잘라낼 영역: 이름, PDF 좌표(72 DPI 기준) 사각형, 적용할 페이지(0부터, None이면 모든 페이지)
+Region = namedtuple("Region", "name rect pages")
+
+
+def parse_page_spec(spec):
+    """
+    "1-3, 5" 같은 페이지 지정 문자열을 0부터 시작하는 페이지 번호 집합으로 바꿉니다.
+    빈 문자열이면 None(모든 페이지)을 돌려줍니다.
+    """
+    spec = (spec or "").strip()
+    if not spec:
+        return None
+
+    pages = set()
+    for part in spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        if "-" in part:
+            start, end = (int(v) for v in part.split("-", 1))
+        else:
+            start = end = int(part)
+        if start < 1 or end < start:
+            raise ValueError(f"잘못된 페이지 범위입니다: {part}")
+        pages.update(range(start - 1, end))
+    return frozenset(pages)
+
+
+def regions_for_page(regions, page_num):
+    """
+    해당 페이지에 적용할 영역 목록을 돌려줍니다.
+    같은 이름의 영역이 여러 개면 페이지를 지정한 영역이 공통 영역보다 우선합니다.
+    """
+    chosen = {}
+    for region in regions:
+        if region.pages is None:
+            chosen.setdefault(region.name, region)
+        elif page_num in region.pages:
+            chosen[region.name] = region
+    return list(chosen.values())
+
+
+def iter_page_crops(doc, page_regions, zoom=4.0, export=DEFAULT_EXPORT, passthrough=False):
+    """
+    {페이지 번호: [(영역 이름, 좌표), ...]}에 따라 영역을 잘라 (페이지 번호, 영역 이름, 이미지 바이트)를 돌려줍니다.
+    페이지 내용은 한 번만 해석(display list)하고 영역마다 그 결과에서 잘라 렌더링합니다.
+    passthrough이면 스캔 이미지 한 장뿐인 페이지는 확대율 대신 스캔 원본 해상도로, 이미지 픽셀을 보간 없이
+    그대로 잘라냅니다. (scan_region 참고)
+    """
+    import fitz  # PyMuPDF 라이브러리
+
+    matrix = fitz.Matrix(zoom, zoom)
+    for page_num in sorted(page_regions):
+        if not page_regions[page_num]:
+            continue
+        page = doc.load_page(page_num)
+        scan = scan_image(page) if passthrough else None
+        with stage("page.displaylist", page=page_num):
+            display_list = page.get_displaylist()
+        for name, rect in page_regions[page_num]:
+            region = scan_region(scan, rect) if scan is not None else None
+            region_matrix, clip = region if region is not None else (matrix, fitz.Rect(rect))
+            with stage("page.pixmap", page=page_num, region=name, zoom=zoom, scan=region is not None):
+                pix = display_list.get_pixmap(matrix=region_matrix, clip=clip)
+            data = encode_pixmap(pix, export)
+            del pix
+            yield page_num, name, data
+        del display_list, page
+
+
+def iter_region_crops(doc, regions, zoom=4.0, export=DEFAULT_EXPORT, passthrough=False):
+    """
+    문서의 각 페이지에서 해당 페이지에 적용되는 모든 영역(Region)을 잘라 돌려줍니다.
+    """
+    page_regions = {
+        page_num: [(region.name, region.rect) for region in regions_for_page(regions, page_num)]
+        for page_num in range(len(doc))
+    }
+    yield from iter_page_crops(doc, page_regions, zoom, export, passthrough)
+
+
+def crop_entry_name(file_name, region_name, page_num, ext="png"):
+    # ZIP 안의 경로: 파일명/영역명/파일명_영역명_page_N.png
+    # (file_name이 "하위폴더/파일명.pdf"처럼 폴더 경로를 가지면 그 폴더 아래에 둠)
+    folder, _, file_name = file_name.rpartition("/")
+    base_name = file_name.rsplit('.', 1)[0]
+    name = f"{base_name}/{region_name}/{base_name}_{region_name}_page_{page_num+1}.{ext}"
+    return f"{folder}/{name}" if folder else name
+
+
+def _crop_file(file_name, pdf_bytes, regions, zoom, export, passthrough):
+    ext = export_extension(export)
+    with stage("pdf.open", file=file_name, size=len(pdf_bytes)):
+        doc = open_pdf(pdf_bytes)
+    with doc:
+        return [
+            (crop_entry_name(file_name, region_name, page_num, ext), data)
+            for page_num, region_name, data in iter_region_crops(doc, regions, zoom, export, passthrough)
+        ]
+
+
+def iter_batch_crops(files, regions, zoom=4.0, workers=None, export=DEFAULT_EXPORT, passthrough=False, pool=None):
+    """
+    여러 PDF(파일명, 바이트)에 여러 영역을 한 번에 적용하여 (ZIP 경로, 이미지 바이트)를 돌려줍니다.
+    각 문서는 한 번만 열고, workers가 2 이상이면 파일 단위로 프로세스 풀에서 나눠 처리합니다.
+    pool(공유 프로세스 풀)을 주면 새로 만들지 않고 그 풀에서 처리합니다.
+    """
+    workers = min(workers or DEFAULT_WORKERS, len(files))
+    if workers <= 1:
+        ext = export_extension(export)
+        for file_name, pdf_bytes in files:
+            with stage("pdf.open", file=file_name, size=len(pdf_bytes)):
+                doc = open_pdf(pdf_bytes)
+            with doc:
+                for page_num, region_name, data in iter_region_crops(doc, regions, zoom, export, passthrough):
+                    yield crop_entry_name(file_name, region_name, page_num, ext), data
+        return
+
+    with process_pool(workers, pool) as pool:
+        # 받는 쪽이 중간에 멈추면(작업 취소 등) 아직 시작하지 않은 파일은 처리하지 않음
+        for entries in ordered_results(pool, _crop_file, (
+            (file_name, pdf_bytes, regions, zoom, export, passthrough) for file_name, pdf_bytes in files
+        ), workers):
+            yield from entries
@@ -0,0 +1,133 @@
+import re
+
+from core.metrics import stage
+
+# 문항 번호로 시작하는 줄: "1.", "[2]", "03.", "문 4.", "문제 5", "6번"
+# "(1)", "1)" 형태는 보기·소문항에 주로 쓰여 문항 시작으로 보지 않음
+QUESTION_START = re.compile(r"^\s*(?:문(?:제|항)?\s*(\d{1,3})|\[(\d{1,3})\]|(\d{1,3})\s*(?:\.|번))(?!\d)")
+
+
+def _is_two_columns(blocks, page_rect):
+    # 가운데 선을 가로지르는 블록이 거의 없고, 양쪽에 모두 블록이 있으면 2단 편집으로 봄
+    mid = (page_rect.x0 + page_rect.x1) / 2
+    left = sum(1 for b in blocks if b.x1 <= mid + 5)
+    right = sum(1 for b in blocks if b.x0 >= mid - 5)
+    spanning = len(blocks) - left - right
+    return left > 0 and right > 0 and spanning <= len(blocks) * 0.1
+
+
+def _split_columns(blocks, page_rect):
+    # (단 왼쪽 x, 단 오른쪽 x, 단에 속한 블록) 목록
+    if not _is_two_columns(blocks, page_rect):
+        return [(page_rect.x0, page_rect.x1, blocks)]
+    mid = (page_rect.x0 + page_rect.x1) / 2
+    return [
+        (page_rect.x0, mid, [b for b in blocks if (b.x0 + b.x1) / 2 < mid]),
+        (mid, page_rect.x1, [b for b in blocks if (b.x0 + b.x1) / 2 >= mid]),
+    ]
+
+
+def _union(rects):
+    import fitz  # PyMuPDF 라이브러리
+
+    result = fitz.Rect(rects[0])
+    for rect in rects[1:]:
+        result |= rect
+    return result
+
+
+def _split_by_gaps(blocks, min_gap):
+    # 문항 번호가 없으면 세로 여백(공백 띠)을 기준으로 내용을 묶음
+    groups = []
+    bottom = None
+    for block in sorted(blocks, key=lambda b: b.y0):
+        if groups and block.y0 - bottom < min_gap:
+            groups[-1].append(block)
+            bottom = max(bottom, block.y1)
+        else:
+            groups.append([block])
+            bottom = block.y1
+    return groups
+
+
+def detect_page_regions(page, margin=4, min_gap=18):
+    """
+    페이지의 텍스트 블록과 벡터 도형만으로(래스터화 없이) 문항 영역을 찾아
+    (이름, fitz.Rect) 목록을 돌려줍니다.
+
+    - 문항 번호로 시작하는 블록부터 같은 단의 다음 문항 번호 직전까지를 한 문항으로 봅니다.
+    - 그 구간 안의 그림·테두리 상자도 영역에 포함합니다. (2단 편집은 단별로 처리)
+    - 문항 번호가 없는 페이지는 세로 여백을 기준으로 내용 덩어리를 나눕니다.
+    """
+    import fitz  # PyMuPDF 라이브러리
+
+    page_rect = page.rect
+    blocks = []
+    starts = {}
+    for x0, y0, x1, y1, text, _, block_type in page.get_text("blocks"):
+        if block_type == 0 and not text.strip():
+            continue
+        rect = fitz.Rect(x0, y0, x1, y1)
+        blocks.append(rect)
+        if block_type == 0:
+            match = QUESTION_START.match(text)
+            if match:
+                starts[id(rect)] = next(g for g in match.groups() if g)
+    if not blocks:
+        return []
+
+    # 그림·테두리 상자 (페이지 전체를 두르는 테두리는 제외)
+    drawings = [
+        d["rect"] for d in page.get_drawings()
+        if d["rect"].height < page_rect.height * 0.8 and not d["rect"].is_empty
+    ]
+
+    regions = []
+    for column_x0, column_x1, column in _split_columns(blocks, page_rect):
+        if not column:
+            continue
+        column.sort(key=lambda b: (b.y0, b.x0))
+        column_starts = [b for b in column if id(b) in starts]
+
+        if column_starts:
+            for i, start in enumerate(column_starts):
+                top = start.y0
+                bottom = column_starts[i + 1].y0 if i + 1 < len(column_starts) else page_rect.y1
+                band = [b for b in column if top <= b.y0 < bottom]
+                band += [
+                    d for d in drawings
+                    if top - margin <= (d.y0 + d.y1) / 2 < bottom
+                    and column_x0 <= (d.x0 + d.x1) / 2 < column_x1
+                ]
+                regions.append((f"Q{starts[id(start)]}", _union(band)))
+        else:
+            column_drawings = [d for d in drawings if column_x0 <= (d.x0 + d.x1) / 2 < column_x1]
+            for group in _split_by_gaps(column + column_drawings, min_gap):
+                regions.append((f"R{len(regions) + 1}", _union(group)))
+
+    result = []
+    seen = {}
+    for name, rect in regions:
+        rect = (rect + (-margin, -margin, margin, margin)) & page_rect
+        if rect.is_empty:
+            continue
+        # 같은 페이지에 같은 번호가 또 나오면 이름 뒤에 순번을 붙임
+        seen[name] = seen.get(name, 0) + 1
+        if seen[name] > 1:
+            name = f"{name}_{seen[name]}"
+        result.append((name, rect))
+    return result
+
+
+def detect_document_regions(doc, margin=4, min_gap=18):
+    """
+    문서 전체의 페이지별 문항 영역을 {페이지 번호: [(이름, 좌표 튜플), ...]}로 돌려줍니다.
+    """
+    with stage("detect.regions", pages=len(doc)):
+        return {
+            page_num: [
+                (name, tuple(rect))
+                for name, rect in detect_page_regions(doc.load_page(page_num), margin, min_gap)
+            ]
+            for page_num in range(len(doc))
+        }
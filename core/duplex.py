@@ -0,0 +1,374 @@
+import math
+import operator
+import os
+import re
+import statistics
+import tempfile
+import threading
+from collections import OrderedDict, namedtuple
+
+from core.cache import content_hash
+from core.metrics import stage
+from core.render import DEFAULT_WORKERS, ordered_results, process_pool
+from core.uploads import open_pdf, open_stream
+
+# 병합 결과 파일을 몇 쌍까지 보관할지 (오래 쓰지 않은 것부터 삭제)
+MERGE_CACHE_ENTRIES = int(os.environ.get("DUPLEX_CACHE_ENTRIES", "8"))
+
+# 페이지 서명용 렌더링 확대율 (A4 기준 약 60x84 픽셀)
+SIGNATURE_ZOOM = 0.1
+# 어두운 픽셀 비율이 이보다 낮으면 빈 페이지로 봄
+BLANK_INK_RATIO = 0.002
+# 회색조 값이 이보다 작으면 어두운(잉크) 픽셀
+_DARK_TABLE = bytes(1 if v < 160 else 0 for v in range(256))
+# 페이지 서명에 담는 축소 이미지 크기 (가로, 세로 칸 수)
+THUMB_GRID = (24, 32)
+# 뒷면 순서를 이미지로 판단하는 조건: 최소 장 수, 비교할 어긋난 짝 맞춤 수(순서마다 최대),
+# 역순·정순 짝 맞춤의 비침 유사도가 어긋난 짝 맞춤들보다 표준편차의 몇 배 이상 높아야 하는지
+ORDER_MIN_SHEETS = 4
+ORDER_SHIFTS = 16
+ORDER_MIN_Z = 3.0
+
+# 앞면/뒷면을 나타내는 파일명 표시 (한 글자 표시는 파일명의 마지막 단어일 때만 인정)
+FRONT_TOKENS = {"front", "f", "odd", "a", "앞", "앞면", "홀수"}
+BACK_TOKENS = {"back", "b", "even", "r", "rev", "reverse", "뒤", "뒷면", "짝수"}
+
+# 뒷면 순서: 역순, 정순, 판단 불가 (판단 불가이면 역순으로 병합)
+REVERSED, FORWARD, UNDETERMINED = "reversed", "forward", "undetermined"
+
+# 페이지 서명: 크기(pt), 회전, 어두운 픽셀 비율, 인쇄된 쪽 번호(없으면 None), 축소 회색조 이미지(THUMB_GRID 칸 평균 밝기)
+PageSignature = namedtuple("PageSignature", "width height rotation ink number thumb")
+
+_merged = OrderedDict()
+_merged_lock = threading.Lock()
+
+
+def interleave_pages(front_pages, back_pages):
+    """
+    앞면 페이지 목록과 (이미 앞면 순서에 맞춘) 뒷면 페이지 목록을 번갈아 끼워
+    (파일, 페이지 번호) 목록으로 돌려줍니다. 파일 0은 앞면, 1은 뒷면입니다.
+    한쪽 페이지가 모자라면 남은 쪽만 이어 붙입니다.
+    """
+    order = []
+    for i in range(max(len(front_pages), len(back_pages))):
+        if i < len(front_pages):
+            order.append((0, front_pages[i]))
+        if i < len(back_pages):
+            order.append((1, back_pages[i]))
+    return order
+
+
+def interleave_order(front_count, back_count):
+    """
+    앞면(정순)과 뒷면(역순) 스캔본을 번갈아 끼울 순서를 (파일, 페이지 번호) 목록으로 돌려줍니다.
+    """
+    return interleave_pages(list(range(front_count)), list(range(back_count - 1, -1, -1)))
+
+
+def _printed_page_number(page):
+    # 페이지 위/아래 가장자리에 숫자만 있는 단어가 있으면 쪽 번호로 봄
+    height = page.rect.height
+    for x0, y0, x1, y1, word, *_ in page.get_text("words"):
+        if word.isdigit() and len(word) <= 4 and (y1 < height * 0.1 or y0 > height * 0.9):
+            return int(word)
+    return None
+
+
+def _thumbnail(pix):
+    # 회색조 픽셀을 THUMB_GRID 칸으로 나눠 칸마다 평균 밝기를 구함
+    columns, rows = THUMB_GRID
+    width, height, stride, samples = pix.width, pix.height, pix.stride, pix.samples
+    cells = []
+    for row in range(rows):
+        y0 = row * height // rows
+        y1 = max((row + 1) * height // rows, y0 + 1)
+        for column in range(columns):
+            x0 = column * width // columns
+            x1 = max((column + 1) * width // columns, x0 + 1)
+            total = sum(sum(samples[y * stride + x0:y * stride + x1]) for y in range(y0, y1))
+            cells.append(total // ((y1 - y0) * (x1 - x0)))
+    return tuple(cells)
+
+
+def page_signatures(pdf_bytes):
+    """
+    각 페이지를 아주 작은 회색조 이미지로 렌더링해 페이지 서명 목록을 돌려줍니다.
+    """
+    import fitz  # PyMuPDF 라이브러리 (자동 판단에만 쓰므로 이때 불러옴)
+
+    signatures = []
+    matrix = fitz.Matrix(SIGNATURE_ZOOM, SIGNATURE_ZOOM)
+    with stage("duplex.signatures", size=len(pdf_bytes)), open_pdf(pdf_bytes) as doc:
+        for page in doc:
+            pix = page.get_pixmap(matrix=matrix, colorspace=fitz.csGRAY, alpha=False)
+            samples = pix.samples
+            ink = samples.translate(_DARK_TABLE).count(1) / max(len(samples), 1)
+            signatures.append(PageSignature(
+                round(page.rect.width), round(page.rect.height), page.rotation, ink, _printed_page_number(page),
+                _thumbnail(pix)
+            ))
+    return signatures
+
+
+def _normalized(thumbs):
+    # 한쪽 파일의 모든 페이지에 공통인 모양(여백·머리글 배치)을 빼고 길이 1로 맞춤 → 내적이 상관계수
+    mean = [sum(cells) / len(thumbs) for cells in zip(*thumbs)]
+    vectors = []
+    for thumb in thumbs:
+        centered = [v - m for v, m in zip(thumb, mean)]
+        norm = math.sqrt(sum(v * v for v in centered)) or 1.0
+        vectors.append([v / norm for v in centered])
+    return vectors
+
+
+def _flips(vector):
+    # 뒷면을 좌우(긴 변으로 넘긴 경우)·상하(짧은 변으로 넘긴 경우)로 뒤집은 두 가지
+    columns, rows = THUMB_GRID
+    grid = [vector[row * columns:(row + 1) * columns] for row in range(rows)]
+    return [v for row in grid for v in reversed(row)], [v for row in reversed(grid) for v in row]
+
+
+def _image_order_z(front, back):
+    """
+    같은 장의 뒷면에는 앞면이 뒤집혀 비치고, 용지 가장자리 그림자·구멍 자국도 뒤집힌 자리에 찍힙니다.
+    앞면과 뒤집은 뒷면의 (공통 모양을 뺀) 상관계수를 장마다 평균해, 역순·정순 짝 맞춤이
+    일부러 어긋나게 한 짝 맞춤들보다 얼마나 높은지를 (역순 z, 정순 z)로 돌려줍니다.
+    """
+    fronts = _normalized([signature.thumb for signature in front])
+    backs = [_flips(vector) for vector in _normalized([signature.thumb for signature in back])]
+    count = len(backs)
+    cache = {}
+
+    def similarity(i, j):
+        if (i, j) not in cache:
+            cache[i, j] = max(sum(map(operator.mul, fronts[i], flipped)) for flipped in backs[j])
+        return cache[i, j]
+
+    def alignment(reverse, shift):
+        pairs = range(min(len(fronts), count))
+        return sum(similarity(i, (((count - 1 - i) if reverse else i) + shift) % count) for i in pairs) / len(pairs)
+
+    shifts = range(1, count)[::max(1, (count - 1) // ORDER_SHIFTS)]
+    baseline = [alignment(reverse, shift) for reverse in (True, False) for shift in shifts]
+    mean, spread = statistics.fmean(baseline), statistics.stdev(baseline) or 1e-9
+    return (alignment(True, 0) - mean) / spread, (alignment(False, 0) - mean) / spread
+
+
+def _order_score(front, back):
+    """
+    앞면과 (한 가지 순서로 늘어놓은) 뒷면을 장마다 맞대어 (쪽 번호 점수, 용지 점수)를 돌려줍니다.
+    쪽 번호가 있다면 뒷면 = 앞면 + 1이고, 같은 장의 앞뒤는 용지 크기·회전이 같습니다.
+    """
+    number_score = shape_score = 0
+    for f, b in zip(front, back):
+        if (f.width, f.height, f.rotation) == (b.width, b.height, b.rotation):
+            shape_score += 1
+        if f.number is not None and b.number is not None:
+            number_score += 1 if b.number == f.number + 1 else -1
+    return number_score, shape_score
+
+
+def detect_back_order(front, back):
+    """
+    앞면 서명 목록과 뒷면 서명 목록(스캔된 순서 그대로)으로 뒷면이 역순(REVERSED)인지 정순(FORWARD)인지 판단합니다.
+    쪽 번호, 용지 크기·회전이 한 순서에 더 잘 맞으면 그 순서를 따르고, 구별되지 않으면(이미지만 있는 스캔 등)
+    비침 유사도가 한 순서에서만 ORDER_MIN_Z 이상 두드러질 때 그 순서를 따릅니다.
+    어느 쪽으로도 판단할 수 없으면 UNDETERMINED를 돌려줍니다. (한 장뿐이면 순서가 같으므로 REVERSED)
+    """
+    if len(back) <= 1:
+        return REVERSED
+    reversed_score = _order_score(front, back[::-1])
+    forward_score = _order_score(front, back)
+    if reversed_score != forward_score:
+        return REVERSED if reversed_score > forward_score else FORWARD
+    if min(len(front), len(back)) < ORDER_MIN_SHEETS:
+        return UNDETERMINED
+    reversed_z, forward_z = _image_order_z(front, back)
+    if reversed_z >= ORDER_MIN_Z > forward_z:
+        return REVERSED
+    if forward_z >= ORDER_MIN_Z > reversed_z:
+        return FORWARD
+    return UNDETERMINED
+
+
+def plan_duplex(front_signatures, back_signatures, skip_blank=True, back_order=None):
+    """
+    페이지 서명을 비교해 병합 순서를 정합니다.
+    - 페이지 수가 다르면 더 긴 쪽의 맨 앞/맨 뒤 빈 페이지(여분 페이지)를 먼저 잘라냅니다.
+    - back_order(REVERSED/FORWARD)를 주지 않으면 뒷면 순서를 detect_back_order로 판단합니다.
+      판단할 수 없으면 안내한 입력 형식대로 역순으로 병합하되, 처리 내용의 back_order는 UNDETERMINED로 남깁니다.
+    - skip_blank이면 빈 페이지는 결과에서 뺍니다.
+    (파일, 페이지 번호) 목록과 처리 내용을 담은 dict를 돌려줍니다.
+    """
+    def is_blank(signature):
+        return signature.ink < BLANK_INK_RATIO
+
+    front_pages = list(range(len(front_signatures)))
+    back_pages = list(range(len(back_signatures)))
+    trimmed = []
+    for pages, signatures, other in ((front_pages, front_signatures, back_pages), (back_pages, back_signatures, front_pages)):
+        while len(pages) > len(other):
+            if is_blank(signatures[pages[-1]]):
+                trimmed.append(pages.pop())
+            elif is_blank(signatures[pages[0]]):
+                trimmed.append(pages.pop(0))
+            else:
+                break
+
+    if back_order is None:
+        back_order = detect_back_order([front_signatures[i] for i in front_pages],
+                                       [back_signatures[i] for i in back_pages])
+    if back_order != FORWARD:
+        back_pages.reverse()
+
+    order = interleave_pages(front_pages, back_pages)
+    blank = []
+    if skip_blank:
+        signatures = (front_signatures, back_signatures)
+        blank = {(source, page_num) for source, page_num in order if is_blank(signatures[source][page_num])}
+        order = [item for item in order if item not in blank]
+
+    report = {
+        "front_pages": len(front_signatures),
+        "back_pages": len(back_signatures),
+        "back_order": back_order,
+        "trimmed_pages": len(trimmed),
+        "blank_pages_skipped": len(blank),
+        "output_pages": len(order),
+    }
+    return order, report
+
+
+def pair_uploads(file_names):
+    """
+    파일명으로 앞면/뒷면 파일을 짝지어 ([(공통 이름, 앞면 파일명, 뒷면 파일명)], [짝 없는 파일명])을 돌려줍니다.
+    예: "3반_앞면.pdf" ↔ "3반_뒷면.pdf", "scan-front.pdf" ↔ "scan-back.pdf"
+    "/"로 구분한 폴더 경로가 붙은 이름은 같은 폴더 안에서만 짝짓고 공통 이름 앞에 폴더 경로를 붙입니다.
+    (예: "1반/앞면.pdf" ↔ "1반/뒷면.pdf" → "1반")
+    """
+    sides = {}
+    unmatched = []
+    for file_name in file_names:
+        folder, _, base_name = file_name.rpartition("/")
+        stem = base_name.rsplit('.', 1)[0]
+        words = [w for w in re.split(r"[\s_\-.()\[\]]+", stem) if w]
+        side = None
+        for i in range(len(words) - 1, -1, -1):
+            word = words[i].lower()
+            if (word in FRONT_TOKENS or word in BACK_TOKENS) and (len(word) > 1 or i == len(words) - 1):
+                side = 0 if word in FRONT_TOKENS else 1
+                del words[i]
+                break
+            match = re.search(r"(앞면|뒷면|앞|뒤)$", word)
+            if match and len(word) > len(match.group(1)):
+                side = 0 if match.group(1).startswith("앞") else 1
+                words[i] = word[:match.start()]
+                break
+        if side is None:
+            unmatched.append(file_name)
+            continue
+        key = "_".join(words)
+        if folder:
+            key = f"{folder}/{key}" if key else folder
+        key = key or "document"
+        slot = sides.setdefault(key, [None, None])
+        if slot[side] is not None:
+            # 같은 이름·같은 면의 파일이 또 있으면 어느 쪽과 짝지을지 알 수 없으므로 짝짓지 않음
+            unmatched.append(file_name)
+            continue
+        slot[side] = file_name
+
+    pairs = []
+    for key, (front_name, back_name) in sides.items():
+        if front_name and back_name:
+            pairs.append((key, front_name, back_name))
+        else:
+            unmatched.append(front_name or back_name)
+    return pairs, unmatched
+
+
+def write_pages(order, sources):
+    """
+    (파일, 페이지 번호) 순서대로 페이지를 모아 임시 PDF 파일에 기록하고 경로를 돌려줍니다.
+    """
+    from pypdf import PdfReader, PdfWriter
+
+    with stage("pdf.open", library="pypdf", size=sum(len(data) for data in sources)):
+        readers = [PdfReader(open_stream(data)) for data in sources]
+    with stage("duplex.pages", pages=len(order)):
+        writer = PdfWriter()
+        for source, page_num in order:
+            writer.add_page(readers[source].pages[page_num])
+
+        # 두 스캔본에 똑같이 들어 있는 글꼴·이미지 등은 하나만 남기고 함께 참조
+        writer.compress_identical_objects(remove_duplicates=True, remove_unreferenced=True)
+
+    # 결과는 메모리가 아닌 임시 파일에 기록
+    fd, path = tempfile.mkstemp(prefix="duplex_", suffix=".pdf")
+    with stage("duplex.write"), os.fdopen(fd, "wb") as f:
+        writer.write(f)
+    return path
+
+
+def merge_duplex_auto(front_bytes, back_bytes, skip_blank=True, back_order=None):
+    """
+    뒷면 순서(back_order를 주지 않았을 때)와 빈/여분 페이지를 자동으로 판단해 병합하고
+    (결과 파일 경로, 처리 내용)을 돌려줍니다.
+    """
+    order, report = plan_duplex(page_signatures(front_bytes), page_signatures(back_bytes), skip_blank, back_order)
+    return write_pages(order, (front_bytes, back_bytes)), report
+
+
+def _merge_pair(name, front_bytes, back_bytes, skip_blank, back_order):
+    path, report = merge_duplex_auto(front_bytes, back_bytes, skip_blank, back_order)
+    return name, path, report
+
+
+def merge_duplex_batch(pairs, skip_blank=True, workers=None, pool=None, back_order=None):
+    """
+    여러 (이름, 앞면 바이트, 뒷면 바이트) 쌍을 프로세스 풀에서 나눠 병합하고
+    (이름, 결과 파일 경로, 처리 내용)을 입력 순서대로 돌려줍니다.
+    pool(공유 프로세스 풀)을 주면 새로 만들지 않고 그 풀에서 병합합니다.
+    back_order(REVERSED/FORWARD)를 주면 뒷면 순서를 판단하지 않고 모든 쌍에 그대로 적용합니다.
+    """
+    workers = min(workers or DEFAULT_WORKERS, len(pairs))
+    if workers <= 1:
+        for name, front_bytes, back_bytes in pairs:
+            yield _merge_pair(name, front_bytes, back_bytes, skip_blank, back_order)
+        return
+
+    with process_pool(workers, pool) as pool:
+        # 받는 쪽이 중간에 멈추면(작업 취소 등) 아직 시작하지 않은 쌍은 병합하지 않음
+        yield from ordered_results(pool, _merge_pair, (
+            (name, front_bytes, back_bytes, skip_blank, back_order) for name, front_bytes, back_bytes in pairs
+        ), workers)
+
+
+def merge_duplex(front_bytes, back_bytes):
+    """
+    앞면/뒷면 PDF를 병합한 결과 파일 경로를 돌려줍니다.
+    같은 입력(내용 해시 기준)이면 이전에 만든 파일을 그대로 돌려주므로
+    파일명만 바꾸거나 다시 내려받을 때는 병합을 다시 하지 않습니다.
+    """
+    key = (content_hash(front_bytes), content_hash(back_bytes))
+    with _merged_lock:
+        path = _merged.get(key)
+        if path is not None and os.path.exists(path):
+            _merged.move_to_end(key)
+            return path
+
+    from pypdf import PdfReader
+
+    front_count = len(PdfReader(open_stream(front_bytes)).pages)
+    back_count = len(PdfReader(open_stream(back_bytes)).pages)
+    path = write_pages(interleave_order(front_count, back_count), (front_bytes, back_bytes))
+
+    with _merged_lock:
+        _merged[key] = path
+        while len(_merged) > MERGE_CACHE_ENTRIES:
+            _, old_path = _merged.popitem(last=False)
+            try:
+                os.remove(old_path)
+            except OSError:
+                pass
+    return path
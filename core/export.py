@@ -0,0 +1,93 @@
+import io
+from collections import namedtuple
+
+from core.metrics import stage
+
+# PDF 좌표 1pt = 1/72인치이므로 확대율 1.0이 72 DPI
+PDF_DPI = 72
+
+# 출력 형식별 (확장자, MIME 타입)
+FORMATS = {
+    "PNG": ("png", "image/png"),
+    "WebP": ("webp", "image/webp"),
+    "JPEG": ("jpg", "image/jpeg"),
+}
+
+# 출력 형식, 품질(JPEG·손실 WebP, 1~100), PNG 압축 단계(0~9), WebP 무손실 여부
+ExportOptions = namedtuple("ExportOptions", "format quality compress_level lossless")
+DEFAULT_EXPORT = ExportOptions("PNG", 90, 6, False)
+
+
+def _is_default_png(options):
+    # PNG는 품질·무손실 설정과 무관하므로 압축 단계만 비교
+    return options.format == "PNG" and options.compress_level == DEFAULT_EXPORT.compress_level
+
+
+def dpi_to_zoom(dpi):
+    """목표 DPI를 PDF 렌더링 확대율로 바꿉니다. (144 DPI → 2.0)"""
+    return dpi / PDF_DPI
+
+
+def export_extension(options=DEFAULT_EXPORT):
+    return FORMATS[options.format][0]
+
+
+def export_mime(options=DEFAULT_EXPORT):
+    return FORMATS[options.format][1]
+
+
+def export_key(options=DEFAULT_EXPORT):
+    """
+    캐시 키에 넣을 출력 형식 이름. 결과 바이트에 영향을 주는 설정만 포함합니다.
+    기본 PNG는 이전 캐시 키와 같은 "png"입니다.
+    """
+    if _is_default_png(options):
+        return "png"
+    if options.format == "PNG":
+        return f"png-c{options.compress_level}"
+    if options.format == "WebP" and options.lossless:
+        return "webp-lossless"
+    return f"{export_extension(options)}-q{options.quality}"
+
+
+def encode_image(image, options=DEFAULT_EXPORT):
+    """PIL 이미지를 설정한 형식으로 인코딩해 바이트로 돌려줍니다."""
+    buf = io.BytesIO()
+    with stage("image.encode", format=options.format) as info:
+        if options.format == "JPEG":
+            # JPEG는 투명도를 지원하지 않으므로 RGB로 변환
+            if image.mode not in ("RGB", "L"):
+                image = image.convert("RGB")
+            image.save(buf, format="JPEG", quality=options.quality)
+        elif options.format == "WebP":
+            image.save(buf, format="WEBP", lossless=options.lossless, quality=options.quality)
+        else:
+            image.save(buf, format="PNG", compress_level=options.compress_level)
+        info["bytes"] = buf.tell()
+    return buf.getvalue()
+
+
+def encode_pixmap(pix, options=DEFAULT_EXPORT):
+    """
+    Pixmap을 설정한 형식으로 인코딩합니다. CMYK는 RGB로 변환 후 인코딩합니다.
+    기본 PNG와 JPEG는 PyMuPDF에서 바로 인코딩하고, 나머지는 Pillow를 거칩니다.
+    """
+    if pix.n - pix.alpha > 3:
+        import fitz  # PyMuPDF 라이브러리 (CMYK 변환에만 필요, Pixmap을 받았으면 이미 불러와 있음)
+
+        pix = fitz.Pixmap(fitz.csRGB, pix)
+    if _is_default_png(options) or (options.format == "JPEG" and not pix.alpha):
+        with stage("image.encode", format=options.format) as info:
+            if options.format == "PNG":
+                data = pix.tobytes("png")
+            else:
+                data = pix.tobytes("jpg", jpg_quality=options.quality)
+            info["bytes"] = len(data)
+        return data
+
+    from PIL import Image  # Pillow 라이브러리 (PyMuPDF가 바로 인코딩하지 못하는 형식에만 필요)
+
+    with stage("pil.convert"):
+        mode = {1: "L", 2: "LA", 3: "RGB", 4: "RGBA"}[pix.n]
+        image = Image.frombytes(mode, (pix.width, pix.height), pix.samples)
+    return encode_image(image, options)
@@ -0,0 +1,229 @@
+"""
+오래 걸리는 작업(전체 문서 렌더링, 영역 추출, 병합, 관계도 계산)을 스크립트 실행과 따로 돌리는 작업 대기열
+
+    job = job_scheduler.submit(("pdf2img.zip", digest, zoom), "전체 페이지 변환", build_zip, pdf_bytes)
+    ...
+    job = job_scheduler.get(("pdf2img.zip", digest, zoom))   # 스크립트가 다시 실행된 뒤
+
+- 서버(프로세스) 전체가 작업 슬롯 JOB_SLOTS개를 함께 씁니다. 나머지 작업은 JOB_QUEUE_SIZE개까지
+  차례를 기다리고, 대기열이 가득 차면 JobQueueFull로 거절합니다. (사용자가 몰려도 CPU를 무한정 나눠 쓰지 않음)
+- 작업 하나가 쓰는 프로세스 수(job.workers)는 CPU 코어 수를 슬롯 수로 나눈 만큼으로 제한합니다.
+- 작업은 세션이 아니라 이 모듈에 남으므로 위젯을 건드려 스크립트가 다시 실행되어도 계속 돌고,
+  같은 키(입력 파일 해시·설정)로 다시 제출하면 진행 중이거나 끝난 작업을 그대로 돌려줍니다.
+  (같은 파일·설정이면 세션끼리도 작업과 결과를 함께 씀)
+- 작업 함수는 첫 인자로 Job을 받아 job.update(완료 수, 전체 수)로 진행률을 알립니다.
+  취소된 작업은 다음 update에서 JobCancelled가 발생해 멈춥니다.
+- 큰 결과(ZIP 등)는 메모리 대신 임시 파일에 두고 job.own_file(경로)로 등록해 경로를 결과로 돌려줍니다.
+  등록한 파일은 작업이 정리될 때(끝난 작업이 JOB_HISTORY개를 넘거나, 실패·취소되어 다시 제출될 때)나
+  서버가 끝날 때 지웁니다.
+"""
+import os
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from core.metrics import stage
+from core.render import DEFAULT_WORKERS
+
+# 동시에 실행할 작업 수, 차례를 기다릴 수 있는 작업 수, 결과를 보관할 끝난 작업 수
+JOB_SLOTS = int(os.environ.get("JOB_SLOTS", "2"))
+JOB_QUEUE_SIZE = int(os.environ.get("JOB_QUEUE_SIZE", "8"))
+JOB_HISTORY = int(os.environ.get("JOB_HISTORY", "8"))
+
+QUEUED, RUNNING, DONE, FAILED, CANCELLED = "queued", "running", "done", "failed", "cancelled"
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+class JobQueueFull(Exception):
+    """대기열이 가득 차 새 작업을 받을 수 없음"""
+
+
+class JobCancelled(Exception):
+    """작업이 취소됨 (작업 함수 안의 job.update에서 발생)"""
+
+
+class Job:
+    """
+    대기열에 들어간 작업 하나의 상태·진행률·결과입니다.
+    상태는 작업 스레드만 바꾸고, 화면(세션 스레드)은 읽기만 합니다.
+    """
+
+    def __init__(self, key, label, workers):
+        self.key = key
+        self.label = label
+        self.workers = workers
+        self.status = QUEUED
+        self.done = 0
+        self.total = None
+        self.result = None
+        self.error = None
+        self.submitted = time.time()
+        self.started = None
+        self.finished = None
+        self._cancel = threading.Event()
+        self._future = None
+        self._files = []
+
+    @property
+    def active(self):
+        return self.status in (QUEUED, RUNNING)
+
+    @property
+    def progress(self):
+        """0~1 사이의 진행률 (전체 수를 모르면 None)"""
+        if not self.total:
+            return None
+        return min(self.done / self.total, 1.0)
+
+    def update(self, done, total=None):
+        """
+        진행률을 기록합니다. 작업이 취소되었으면 JobCancelled를 일으킵니다.
+        """
+        self.done = done
+        if total is not None:
+            self.total = total
+        if self._cancel.is_set():
+            raise JobCancelled()
+
+    def track(self, items, total=None):
+        """
+        items를 그대로 돌려주면서 하나가 처리될 때마다(다음 항목을 꺼낼 때) 진행률을 올립니다.
+        """
+        self.update(0, total)
+        done = 0
+        for item in items:
+            yield item
+            done += 1
+            self.update(done)
+
+    def own_file(self, path):
+        """
+        결과로 남길 임시 파일을 등록하고 경로를 그대로 돌려줍니다. (작업이 정리될 때 지움)
+        """
+        self._files.append(weakref.finalize(self, _remove, path))
+        return path
+
+    def discard(self):
+        # 등록한 임시 파일을 지움 (이미 지워졌으면 무시)
+        files, self._files = self._files, []
+        for remove in files:
+            remove()
+
+    def cancel(self):
+        """
+        작업을 취소합니다. 아직 차례를 기다리는 작업은 바로 취소되고,
+        실행 중인 작업은 다음 진행률 기록에서 멈춥니다.
+        """
+        self._cancel.set()
+        if self._future is not None and self._future.cancel():
+            self.status = CANCELLED
+            self.finished = time.time()
+
+
+class JobScheduler:
+    """
+    작업을 정해진 수의 슬롯에서 차례로 실행하는 대기열입니다. (Streamlit 세션 스레드들이 함께 씀)
+    """
+
+    def __init__(self, slots=JOB_SLOTS, queue_size=JOB_QUEUE_SIZE, history=JOB_HISTORY):
+        self.slots = max(1, slots)
+        self.queue_size = queue_size
+        self.history = history
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+        self._pool = None
+
+    def worker_share(self, workers=None):
+        """작업 하나가 쓸 프로세스 수: 요청한 수와 (CPU 코어 수 / 슬롯 수) 중 작은 값"""
+        return max(1, min(workers or DEFAULT_WORKERS, DEFAULT_WORKERS // self.slots))
+
+    def submit(self, key, label, fn, *args, workers=None):
+        """
+        fn(job, *args)를 대기열에 넣고 Job을 돌려줍니다.
+        같은 키의 작업이 대기·실행 중이거나 이미 끝났으면 그 작업을 돌려주고,
+        실패·취소된 작업이면 새로 시작합니다. 대기열이 가득 차면 JobQueueFull을 일으킵니다.
+        """
+        with self._lock:
+            job = self._jobs.get(key)
+            if job is not None and job.status not in (FAILED, CANCELLED):
+                self._jobs.move_to_end(key)
+                return job
+            if job is not None:
+                job.discard()
+
+            queued = sum(1 for other in self._jobs.values() if other.status == QUEUED)
+            if queued >= self.queue_size:
+                raise JobQueueFull(f"지금은 기다리는 작업이 많습니다 ({queued}개). 잠시 후 다시 시도해주세요.")
+
+            job = Job(key, label, self.worker_share(workers))
+            self._jobs[key] = job
+            self._jobs.move_to_end(key)
+            self._prune()
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(self.slots, thread_name_prefix="job")
+            job._future = self._pool.submit(self._run, job, fn, args)
+        return job
+
+    def get(self, key):
+        """키에 해당하는 작업 (없거나 오래되어 정리되었으면 None)"""
+        with self._lock:
+            return self._jobs.get(key)
+
+    def queue_position(self, job):
+        """job보다 먼저 차례를 기다리는 작업 수"""
+        with self._lock:
+            return sum(1 for other in self._jobs.values()
+                       if other.status == QUEUED and other.submitted < job.submitted)
+
+    def stats(self):
+        with self._lock:
+            statuses = [job.status for job in self._jobs.values()]
+        return {
+            "slots": self.slots,
+            "running": statuses.count(RUNNING),
+            "queued": statuses.count(QUEUED),
+            "queue_size": self.queue_size,
+            "finished": len(statuses) - statuses.count(RUNNING) - statuses.count(QUEUED),
+        }
+
+    def _prune(self):
+        # 끝난 작업은 최근 history개만 남기고, 정리하는 작업의 결과 임시 파일은 지움
+        finished = [key for key, job in self._jobs.items() if not job.active]
+        for key in finished[:max(0, len(finished) - self.history)]:
+            self._jobs.pop(key).discard()
+
+    def _run(self, job, fn, args):
+        if job._cancel.is_set():
+            job.status = CANCELLED
+            job.finished = time.time()
+            return
+        job.started = time.time()
+        job.status = RUNNING
+        try:
+            with stage("job.run", job=job.label, workers=job.workers,
+                       waited_s=round(job.started - job.submitted, 3)) as info:
+                job.result = fn(job, *args)
+                info["done"] = job.done
+        except JobCancelled:
+            job.discard()
+            job.status = CANCELLED
+        except Exception as e:
+            job.discard()
+            job.error = e
+            job.status = FAILED
+        else:
+            job.status = DONE
+        finally:
+            job.finished = time.time()
+
+
+# 프로세스 전체에서 함께 쓰는 작업 대기열
+job_scheduler = JobScheduler()
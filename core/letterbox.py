@@ -0,0 +1,172 @@
+import io
+import zipfile
+
+from PIL import Image, ImageOps
+
+from core.cache import LRUCache
+from core.export import DEFAULT_EXPORT, encode_image, export_extension
+from core.metrics import stage
+from core.render import DEFAULT_WORKERS, ordered_results, process_pool
+
+# 결과 캔버스의 긴 변 길이 (px)
+CANVAS_SIZE = 1000
+
+# 비율별 (가로, 세로) 캔버스 크기, "원본 비율"은 레터박스 없이 긴 변만 맞춤
+RATIOS = {
+    "1:1": (CANVAS_SIZE, CANVAS_SIZE),
+    "4:3": (CANVAS_SIZE, int(CANVAS_SIZE * (3/4))),
+    "3:4": (int(CANVAS_SIZE * (3/4)), CANVAS_SIZE),
+    "4:5": (int(CANVAS_SIZE * (4/5)), CANVAS_SIZE),
+    "16:9": (CANVAS_SIZE, int(CANVAS_SIZE * (9/16))),
+    "9:16": (int(CANVAS_SIZE * (9/16)), CANVAS_SIZE),
+    "원본 비율": None,
+}
+
+# 업로드를 받는 이미지 확장자 (ZIP 안의 파일도 이 확장자만 처리)
+IMAGE_TYPES = ["jpg", "jpeg", "png"]
+
+# 큰 사진을 줄일 때 먼저 정수배로 빠르게 줄인 뒤 LANCZOS를 적용하는 기준 (Pillow reducing_gap)
+REDUCING_GAP = 3.0
+
+# 업로드별로 줄여 둔 원본 이미지 (최근 8개까지 보관)
+_sources = LRUCache(max_entries=8)
+
+
+def hex_to_rgb(color):
+    # Streamlit color_picker는 HEX 코드를 반환하므로 RGB 튜플로 변환
+    return tuple(int(color.lstrip('#')[i:i+2], 16) for i in (0, 2, 4))
+
+
+def add_letterbox(image, target_ratio, letterbox_color):
+    """
+    이미지에 레터박스를 추가하여 지정된 비율의 캔버스에 맞춥니다.
+    """
+    original_width, original_height = image.size
+
+    # 1. 목표 비율에 따른 최종 캔버스 크기 계산 (최대 길이 CANVAS_SIZE 기준)
+    canvas = RATIOS[target_ratio]
+    if canvas is None:
+        # 원본 비율 선택 시에는 레터박스 없이 이미지 자체를 최대 CANVAS_SIZE로 리사이즈
+        if original_width > original_height:
+            resized_width = CANVAS_SIZE
+            resized_height = int(original_height * (CANVAS_SIZE / original_width))
+        else:
+            resized_height = CANVAS_SIZE
+            resized_width = int(original_width * (CANVAS_SIZE / original_height))
+
+        with stage("image.resize", ratio=target_ratio):
+            return image.resize((resized_width, resized_height), Image.Resampling.LANCZOS, reducing_gap=REDUCING_GAP)
+    target_canvas_width, target_canvas_height = canvas
+
+    # 2. 원본 이미지를 목표 캔버스에 맞게 스케일링 (비율 유지)
+    # 캔버스 안에 이미지가 다 들어가도록 더 작은 스케일 팩터 사용
+    scale_factor_width = target_canvas_width / original_width
+    scale_factor_height = target_canvas_height / original_height
+    if scale_factor_width < scale_factor_height:
+        # 가로에 맞추면 세로에 여백이 생김 (위/아래 레터박스)
+        new_width = target_canvas_width
+        new_height = int(original_height * scale_factor_width)
+    else:
+        # 세로에 맞추면 가로에 여백이 생김 (양옆 레터박스)
+        new_height = target_canvas_height
+        new_width = int(original_width * scale_factor_height)
+
+    with stage("image.resize", ratio=target_ratio):
+        resized_image = image.resize((new_width, new_height), Image.Resampling.LANCZOS, reducing_gap=REDUCING_GAP)
+
+    # 3. 새로운 캔버스 생성 후 조절된 이미지를 중앙에 붙여넣기
+    new_image = Image.new("RGB", (target_canvas_width, target_canvas_height), hex_to_rgb(letterbox_color))
+    paste_x = (target_canvas_width - new_width) // 2
+    paste_y = (target_canvas_height - new_height) // 2
+    new_image.paste(resized_image, (paste_x, paste_y))
+    return new_image
+
+
+def load_source(data, max_size=CANVAS_SIZE):
+    """
+    이미지 바이트를 긴 변이 max_size 이하가 되도록 줄여서 디코딩합니다.
+    어떤 비율의 캔버스도 가로·세로가 max_size를 넘지 않으므로 결과 화질은 원본에서 바로 줄인 것과 같습니다.
+    - JPEG는 draft 모드로 DCT 단계에서 1/2~1/8 크기로 디코딩해 모든 픽셀을 풀지 않습니다.
+    - 사진의 EXIF 방향(세로로 찍은 사진 등)을 반영합니다.
+    """
+    with stage("image.decode", size=len(data)):
+        image = Image.open(io.BytesIO(data))
+        if image.format == "JPEG":
+            image.draft("RGB", (max_size, max_size))
+        image = ImageOps.exif_transpose(image)
+        if image.mode == "CMYK":
+            image = image.convert("RGB")
+        image.thumbnail((max_size, max_size), Image.Resampling.LANCZOS, reducing_gap=REDUCING_GAP)
+    return image
+
+
+def source_image(digest, data):
+    """
+    load_source 결과를 업로드 내용 해시(digest)별로 캐시해 돌려줍니다.
+    비율이나 레터박스 색상만 바꿀 때는 다시 디코딩하지 않고 캔버스만 새로 합성합니다.
+    """
+    return _sources.get_or_create(digest, lambda: load_source(data))
+
+
+def ratio_label(target_ratio):
+    # 파일명·폴더명에 쓸 비율 이름: "1:1" → "1x1"
+    return target_ratio.replace(':', 'x').replace(' ', '')
+
+
+def iter_upload_images(uploads):
+    """
+    업로드된 (파일명, 바이트) 중 이미지는 그대로, ZIP은 안의 이미지 파일을 꺼내
+    (파일명, 바이트)로 차례로 돌려줍니다. 같은 이름이 또 나오면 뒤에 순번을 붙입니다.
+    """
+    seen = {}
+
+    def unique(name):
+        base, _, ext = name.rpartition('.')
+        seen[name] = seen.get(name, 0) + 1
+        return name if seen[name] == 1 else f"{base}_{seen[name]}.{ext}"
+
+    for file_name, data in uploads:
+        if not file_name.lower().endswith(".zip"):
+            yield unique(file_name), data
+            continue
+        with zipfile.ZipFile(io.BytesIO(data)) as archive:
+            for info in archive.infolist():
+                member = info.filename.rsplit('/', 1)[-1]
+                if info.is_dir() or member.startswith('.') or member.rsplit('.', 1)[-1].lower() not in IMAGE_TYPES:
+                    continue
+                yield unique(member), archive.read(info)
+
+
+def letterbox_entries(file_name, data, ratios, letterbox_color, export=DEFAULT_EXPORT):
+    """
+    이미지 하나를 한 번만 (줄인 크기로) 디코딩해 여러 비율로 변환하고 [(ZIP 경로, 이미지 바이트)]를 돌려줍니다.
+    ZIP 안의 경로: 비율/파일명.png (확장자는 export 형식을 따름)
+    """
+    base_name = file_name.rsplit('.', 1)[0]
+    ext = export_extension(export)
+    image = load_source(data)
+    return [
+        (f"{ratio_label(target_ratio)}/{base_name}.{ext}",
+         encode_image(add_letterbox(image, target_ratio, letterbox_color), export))
+        for target_ratio in ratios
+    ]
+
+
+def iter_letterbox_batch(images, ratios, letterbox_color, workers=None, export=DEFAULT_EXPORT, pool=None):
+    """
+    여러 이미지(파일명, 바이트)를 모든 비율로 변환하여 (ZIP 경로, 이미지 바이트)를 입력 순서대로 돌려줍니다.
+    workers가 2 이상이면 이미지 단위로 프로세스 풀에서 나눠 처리하고,
+    결과가 쌓이지 않도록 앞서 제출한 작업이 작업자 수의 두 배를 넘으면 먼저 꺼냅니다.
+    pool(공유 프로세스 풀)을 주면 새로 만들지 않고 그 풀에서 처리합니다.
+    """
+    workers = workers or DEFAULT_WORKERS
+    if workers <= 1:
+        for file_name, data in images:
+            yield from letterbox_entries(file_name, data, ratios, letterbox_color, export)
+        return
+
+    with process_pool(workers, pool) as pool:
+        for entries in ordered_results(pool, letterbox_entries, (
+            (file_name, data, ratios, letterbox_color, export) for file_name, data in images
+        ), workers):
+            yield from entries
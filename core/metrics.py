@@ -0,0 +1,131 @@
+"""
+처리 단계별 성능 기록
+
+    with stage("page.pixmap", page=3):
+        pix = page.get_pixmap(...)
+
+각 단계의 벽시계 시간, CPU 시간(이 프로세스 + 끝난 자식 프로세스), 최대 RSS를 잽니다.
+- METRICS_LOG 환경변수(또는 enable_log)로 파일을 지정하면 단계마다 JSON 한 줄을 남깁니다.
+- start_recording을 부른 스레드(Streamlit 세션의 스크립트 실행)는 기록을 목록으로 모아 디버그 패널에 보여줍니다.
+기록이 꺼져 있으면 stage는 아무것도 재지 않습니다.
+프로세스 풀 작업자 안의 단계는 로그 파일에만 남고 (pid로 구분), 화면 패널에는 풀 전체를 감싼 단계만 나타납니다.
+"""
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import resource  # Windows에는 없음 (최대 RSS는 0으로 기록)
+except ImportError:
+    resource = None
+
+# 단계 기록을 JSON Lines로 남길 파일 (지정했을 때만)
+METRICS_LOG = os.environ.get("METRICS_LOG") or None
+
+logger = logging.getLogger("core.metrics")
+logger.propagate = False
+
+_local = threading.local()
+_log_enabled = False
+
+
+def enable_log(path):
+    """단계 기록을 path 파일에 JSON 한 줄씩 덧붙여 남깁니다. (fork로 만든 작업자 프로세스도 함께 기록)"""
+    global _log_enabled
+    handler = logging.FileHandler(path, encoding="utf-8")
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    _log_enabled = True
+
+
+def _peak_rss_mb(who):
+    if resource is None:
+        return 0.0
+    peak = resource.getrusage(who).ru_maxrss
+    # Linux는 KB, macOS는 바이트 단위
+    return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+def _cpu_time():
+    # 자식 프로세스 시간은 종료된(프로세스 풀이 닫힌) 작업자만 포함됨
+    t = os.times()
+    return t.user + t.system + t.children_user + t.children_system
+
+
+def start_recording(listener=None):
+    """
+    현재 스레드에서 끝나는 단계를 목록에 모으기 시작하고 그 목록을 돌려줍니다.
+    listener를 주면 가장 바깥 단계가 끝날 때마다 목록을 넘겨 부릅니다. (화면 갱신용)
+    """
+    _local.records = []
+    _local.listener = listener
+    _local.depth = 0
+    return _local.records
+
+
+def stop_recording():
+    _local.records = None
+    _local.listener = None
+
+
+@contextmanager
+def stage(name, /, **fields):
+    """
+    with 블록 하나를 한 단계로 잽니다. fields는 기록에 함께 남기며,
+    블록 안에서 as로 받은 딕셔너리에 값을 더 넣을 수 있습니다. (예: 결과 크기)
+    """
+    records = getattr(_local, "records", None)
+    if records is None and not _log_enabled:
+        yield fields
+        return
+
+    depth = getattr(_local, "depth", 0)
+    _local.depth = depth + 1
+    start_wall, start_cpu = time.perf_counter(), _cpu_time()
+    try:
+        yield fields
+    finally:
+        _local.depth = depth
+        record = {
+            "stage": name,
+            "wall_s": round(time.perf_counter() - start_wall, 6),
+            "cpu_s": round(_cpu_time() - start_cpu, 6),
+            "peak_rss_mb": round(_peak_rss_mb(resource.RUSAGE_SELF if resource else None), 1),
+            "child_peak_rss_mb": round(_peak_rss_mb(resource.RUSAGE_CHILDREN if resource else None), 1),
+            "pid": os.getpid(),
+            "depth": depth,
+            **fields,
+        }
+        if _log_enabled:
+            logger.info(json.dumps({"time": time.time(), **record}, ensure_ascii=False, default=str))
+        if records is not None:
+            records.append(record)
+            if depth == 0 and _local.listener is not None:
+                _local.listener(records)
+
+
+def summarize(records):
+    """
+    단계 이름별로 횟수, 벽시계·CPU 시간 합계, 최대 RSS를 모아 처음 나온 순서대로 돌려줍니다.
+    """
+    summary = {}
+    for record in records:
+        row = summary.setdefault(record["stage"], {
+            "stage": record["stage"], "count": 0, "wall_s": 0.0, "cpu_s": 0.0,
+            "peak_rss_mb": 0.0, "child_peak_rss_mb": 0.0,
+        })
+        row["count"] += 1
+        row["wall_s"] += record["wall_s"]
+        row["cpu_s"] += record["cpu_s"]
+        row["peak_rss_mb"] = max(row["peak_rss_mb"], record["peak_rss_mb"])
+        row["child_peak_rss_mb"] = max(row["child_peak_rss_mb"], record["child_peak_rss_mb"])
+    return list(summary.values())
+
+
+if METRICS_LOG:
+    enable_log(METRICS_LOG)
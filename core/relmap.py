@@ -0,0 +1,351 @@
+import hashlib
+import json
+import re
+from collections import namedtuple
+
+from core.cache import LRUCache
+from core.metrics import stage
+
+# 각 관계 유형에 고유한 색상을 할당합니다.
+RELATION_COLORS = ['#FF6347', '#4682B4', '#32CD32'] # Tomato, SteelBlue, LimeGreen (예시 색상)
+
+# 노드가 이보다 많으면 "auto" 레이아웃은 빠른 근사 알고리즘을 사용
+LARGE_GRAPH_NODES = 500
+# 그래프 구조별로 계산한 레이아웃 (최근 16개까지 보관)
+_layouts = LRUCache(max_entries=16)
+# 그래프·배치 방식별로 만든 관계도 HTML 본문 (최근 8개까지 보관, 표시 설정은 따로 적용)
+_graph_bases = LRUCache(max_entries=8)
+# 업로드·열 선택별로 만든 관계 그래프 (최근 8개까지 보관)
+_graphs = LRUCache(max_entries=8)
+# 한 번 해석한 pyvis HTML 템플릿 (프로세스에 하나)
+_templates = LRUCache(max_entries=1)
+
+# pandas·networkx·NumPy·pyvis는 쓰는 함수 안에서 불러옴
+# (페이지는 설정값만 쓰므로 업로드 전 첫 화면에서는 불러오지 않음)
+
+# pyvis 템플릿이 항상 CDN에서 불러오는 bootstrap (관계도 표시에는 필요 없음)
+_BOOTSTRAP_TAGS = re.compile(r"<(link|script)\b[^>]*bootstrap[^>]*>(\s*</script>)?", re.S)
+
+# 표시 설정: 배경색, 글자색, 노드 크기, 이름 폰트 크기, 엣지 기본 굵기
+GraphStyle = namedtuple("GraphStyle", "bg_color font_color node_size font_size edge_width")
+DEFAULT_STYLE = GraphStyle("#222222", "white", 15, 12, 1.0)
+
+# 물리 시뮬레이션 설정 (서버에서 배치를 계산했으면 끔)
+GRAPH_OPTIONS = {
+    "physics": {
+        "enabled": True,
+        "forceAtlas2Based": {
+            "gravitationalConstant": -50,
+            "centralGravity": 0.01,
+            "springLength": 100,
+            "springConstant": 0.08,
+            "avoidOverlap": 0.9,
+        },
+        "minVelocity": 0.75,
+        "solver": "forceAtlas2Based",
+    },
+    "interaction": {
+        "zoomView": True,
+        "hover": True,
+        "tooltipDelay": 300,
+    },
+}
+
+# 이미 그려진 네트워크에 표시 설정만 적용 (데이터는 그대로, 옵션과 엣지 굵기만 바꿈)
+_STYLE_SCRIPT = """
+        <script type="text/javascript">
+              function applyGraphStyle(style) {
+                  document.getElementById('mynetwork').style.backgroundColor = style.bg_color;
+                  network.setOptions({
+                      nodes: {size: style.node_size, font: {size: style.font_size, color: style.font_color}}
+                  });
+                  if (style.edge_width !== 1) {
+                      edges.update(edges.get().map(function (edge) {
+                          return {id: edge.id, width: edge.count * style.edge_width};
+                      }));
+                  }
+              }
+              applyGraphStyle(%s);
+        </script>
+    </body>
+</html>
+"""
+
+
+def build_edge_table(df, name_column, relation_columns, directed=False):
+    """
+    설문 DataFrame에서 관계(엣지) 표와 학생(노드) 이름 집합을 벡터 연산으로 만듭니다.
+
+    관계 열의 "이름1, 이름2" 문자열을 나눠(explode) 한 행에 지목 하나씩 펼친 뒤,
+    (지목한 학생, 지목받은 학생) 쌍별로 지목 횟수, 관계 열 이름들(등장 순서), 처음 나온 관계 열을 모읍니다.
+    방향성이 없으면 (A, B)와 (B, A)를 같은 쌍으로 합칩니다.
+    """
+    import pandas as pd
+
+    names = df[name_column]
+    sources = names.astype(str).str.strip()
+
+    picks = []
+    for idx, rel_col in enumerate(relation_columns):
+        values = df[rel_col]
+        mask = values.notna()
+        picks.append(pd.DataFrame({
+            "source": sources[mask],
+            "target": values[mask].astype(str).str.split(","),
+            "relation": idx,
+        }).explode("target"))
+    picks = pd.concat(picks, ignore_index=True)
+    picks["target"] = picks["target"].str.strip()
+    picks = picks[picks["target"] != ""]
+
+    # 모든 학생 이름 (이름 열 + 관계 열에 등장한 이름)
+    students = set(sources[names.notna()].tolist()) | set(picks["target"].tolist())
+
+    picks = picks[
+        (picks["source"] != picks["target"])
+        & picks["source"].isin(students)
+        & picks["target"].isin(students)
+    ]
+
+    if directed:
+        picks = picks.rename(columns={"source": "u", "target": "v"})
+    else:
+        swap = picks["source"] > picks["target"]
+        picks = picks.assign(
+            u=picks["source"].where(~swap, picks["target"]),
+            v=picks["target"].where(~swap, picks["source"]),
+        )
+
+    # (u, v) 쌍에 처음 등장한 순서대로 번호를 매겨 숫자 그룹 연산으로 집계
+    codes, pairs = pd.factorize(pd.MultiIndex.from_arrays([picks["u"], picks["v"]]))
+    grouped = picks["relation"].groupby(codes, sort=False)
+    edges = pd.DataFrame({
+        "u": pairs.get_level_values(0),
+        "v": pairs.get_level_values(1),
+        "count": grouped.size().to_numpy(),
+        "first_relation": grouped.first().to_numpy(),
+    })
+
+    # 툴팁: 한 번만 지목된 쌍은 관계 열 이름 그대로, 여러 번이면 등장 순서대로 이어 붙임
+    relation_names = pd.Series(relation_columns, dtype=object)
+    edges["title"] = relation_names.reindex(edges["first_relation"]).to_numpy()
+    repeated = edges["count"].to_numpy()[codes] > 1
+    if repeated.any():
+        names_by_pick = relation_names.reindex(picks["relation"][repeated]).to_numpy()
+        joined = pd.Series(names_by_pick).groupby(codes[repeated], sort=False).agg(list)
+        edges.loc[joined.index, "title"] = [", ".join(titles) for titles in joined]
+    return edges, students
+
+
+def build_graph(df, name_column, relation_columns, directed=False):
+    """
+    설문 DataFrame으로 친구 관계 그래프(구조)를 만듭니다.
+    엣지에는 지목 횟수(count), 툴팁(title, 관계 열 이름들), 색상(처음 나온 관계 열의 색)이 들어갑니다.
+    노드 크기·폰트·엣지 굵기 같은 표시 설정은 graph_html에서 따로 적용합니다.
+    """
+    import networkx as nx
+
+    with stage("graph.build", rows=len(df), directed=directed):
+        edges, students = build_edge_table(df, name_column, relation_columns, directed)
+
+        G = nx.DiGraph() if directed else nx.Graph()
+        G.add_nodes_from((student, {"title": student}) for student in sorted(students))
+        colors = [RELATION_COLORS[idx % len(RELATION_COLORS)] for idx in edges["first_relation"].tolist()]
+        G.add_edges_from(
+            (u, v, {"title": title, "color": color, "count": count})
+            for u, v, title, color, count in zip(
+                edges["u"].tolist(), edges["v"].tolist(), edges["title"].tolist(), colors, edges["count"].tolist()
+            )
+        )
+    return G
+
+
+def survey_graph(digest, df, name_column, relation_columns, directed=False):
+    """
+    build_graph 결과를 업로드 내용 해시(digest)와 열 선택·방향성별로 캐시해 돌려줍니다.
+    표시 설정만 바꿀 때는 그래프를 다시 만들지 않습니다.
+    """
+    key = (digest, name_column, tuple(relation_columns), directed)
+    return _graphs.get_or_create(key, lambda: build_graph(df, name_column, relation_columns, directed))
+
+
+def graph_hash(G, data=False):
+    """
+    노드와 엣지 구조(방향성 포함)로 만든 그래프 해시 (레이아웃·분석 캐시 키)
+    data=True이면 노드·엣지 속성(툴팁, 색, 지목 횟수)까지 포함합니다.
+    만든 뒤 바꾸지 않는 그래프로 보고, 계산한 해시는 G.graph에 보관해 다시 쓰입니다.
+    """
+    memo_key = ("_hash", data, G.is_directed()) # 방향을 바꾼 뷰는 G.graph를 함께 쓰므로 방향도 구분
+    if memo_key in G.graph:
+        return G.graph[memo_key]
+
+    h = hashlib.blake2b(digest_size=16)
+    h.update(b"D" if G.is_directed() else b"U")
+    for node, attrs in sorted(G.nodes(data=True)):
+        h.update(node.encode() + b"\0")
+        if data:
+            h.update(repr(sorted(attrs.items())).encode())
+    h.update(b"\1")
+    for u, v, attrs in sorted(G.edges(data=True), key=lambda edge: edge[:2]):
+        h.update(u.encode() + b"\0" + v.encode() + b"\0")
+        if data:
+            h.update(repr(sorted(attrs.items())).encode())
+    G.graph[memo_key] = h.hexdigest()
+    return G.graph[memo_key]
+
+
+def _fast_layout(G, iterations=60, samples=32, seed=0):
+    """
+    Fruchterman-Reingold 방식 근사 레이아웃 (NumPy)
+    스펙트럴 배치에서 출발하고, 밀어내는 힘은 모든 노드 쌍 대신 노드마다 무작위로 고른
+    samples개 노드에 대해서만 계산해 반복 한 번이 O(노드 수 x samples + 엣지 수)입니다.
+    """
+    import networkx as nx
+    import numpy as np
+
+    nodes = list(G)
+    n = len(nodes)
+    rng = np.random.default_rng(seed)
+    if n <= 2:
+        return {node: rng.random(2) for node in nodes}
+
+    index = {node: i for i, node in enumerate(nodes)}
+    edges = np.array([(index[u], index[v]) for u, v in G.edges() if u != v], dtype=np.intp).reshape(-1, 2)
+    if len(edges):
+        initial = nx.spectral_layout(G.to_undirected(as_view=True))
+        pos = np.array([initial[node] for node in nodes], dtype=float)
+    else:
+        pos = rng.random((n, 2))
+    pos += rng.normal(scale=1e-3, size=pos.shape) # 같은 자리에 겹친 노드를 떼어 놓음
+
+    k = 1 / np.sqrt(n) # 노드 사이 이상적인 거리
+    temperature = 0.1
+    cooling = temperature / (iterations + 1)
+    samples = min(samples, n - 1)
+    for _ in range(iterations):
+        others = rng.integers(0, n, size=(n, samples))
+        delta = pos[:, None, :] - pos[others]
+        dist2 = (delta ** 2).sum(axis=-1) + 1e-9
+        disp = (delta * (k * k / dist2)[..., None]).sum(axis=1) * ((n - 1) / samples)
+
+        if len(edges):
+            delta = pos[edges[:, 0]] - pos[edges[:, 1]]
+            dist = np.sqrt((delta ** 2).sum(axis=1)) + 1e-9
+            force = delta * (dist / k)[:, None]
+            np.add.at(disp, edges[:, 0], -force)
+            np.add.at(disp, edges[:, 1], force)
+
+        length = np.sqrt((disp ** 2).sum(axis=1)) + 1e-9
+        pos += disp * (np.minimum(length, temperature) / length)[:, None]
+        temperature -= cooling
+    return dict(zip(nodes, pos))
+
+
+def compute_layout(G, method="auto"):
+    """
+    노드 좌표를 서버(Python)에서 미리 계산해 {노드: (x, y)} 픽셀 좌표로 돌려줍니다.
+    method: "spring"(networkx 정밀 계산), "fast"(근사 계산), "auto"(노드 수에 따라 선택)
+    같은 구조의 그래프는 캐시된 결과를 돌려줍니다.
+    """
+    if method == "auto":
+        method = "fast" if G.number_of_nodes() > LARGE_GRAPH_NODES else "spring"
+    return _layouts.get_or_create((graph_hash(G), method), lambda: _compute_layout(G, method))
+
+
+def _compute_layout(G, method):
+    import networkx as nx
+    import numpy as np
+
+    if G.number_of_nodes() == 0:
+        return {}
+    with stage("graph.layout", method=method, nodes=G.number_of_nodes()):
+        if method == "fast":
+            positions = _fast_layout(G)
+        else:
+            positions = nx.spring_layout(G, seed=0)
+
+    # 노드 수에 맞춰 캔버스 크기(픽셀)로 늘리고 가운데를 원점으로 맞춤
+    coords = np.array(list(positions.values()), dtype=float)
+    coords -= coords.mean(axis=0)
+    extent = np.abs(coords).max() or 1.0
+    coords *= max(400.0, 40.0 * np.sqrt(len(coords))) / extent
+    return {node: (float(x), float(y)) for node, (x, y) in zip(positions, coords)}
+
+
+def graph_html(G, layout_method=None, style=DEFAULT_STYLE):
+    """
+    pyvis 관계도 HTML을 파일을 거치지 않고 메모리에서 만들어 돌려줍니다.
+    vis.js는 pyvis에 포함된 파일을 HTML 안에 직접 넣으므로(in_line) 인터넷 없이도 열립니다.
+    layout_method("spring"/"fast"/"auto")를 주면 서버에서 배치를 계산하고 물리 시뮬레이션을 끕니다.
+
+    노드·엣지 데이터가 든 본문은 그래프·배치 방식별로 캐시하고, 표시 설정(style, GraphStyle)은
+    브라우저에서 네트워크 옵션으로 적용하는 짧은 스크립트만 붙이므로 설정만 바꾸면 바로 돌아옵니다.
+    """
+    base = _graph_bases.get_or_create(
+        (graph_hash(G, data=True), layout_method), lambda: _graph_base(G, layout_method)
+    )
+    return base + _STYLE_SCRIPT % json.dumps(GraphStyle(*style)._asdict())
+
+
+def _graph_base(G, layout_method):
+    positions = compute_layout(G, layout_method) if layout_method else {}
+    directed = G.is_directed()
+
+    with stage("graph.html", nodes=G.number_of_nodes(), edges=G.number_of_edges()) as info:
+        html = _network_html(G, positions, directed)
+        info["bytes"] = len(html)
+    return html
+
+
+def network_templates():
+    """
+    pyvis HTML 템플릿 환경(jinja2)을 돌려줍니다. (프로세스에 하나)
+    pyvis는 Network마다 템플릿 환경을 새로 만들어 vis.js를 통째로 넣은 템플릿을 매번 다시 해석하므로
+    (관계도마다 0.1초 이상) 한 번 해석한 템플릿을 모든 관계도에서 함께 씁니다.
+    """
+    def create():
+        from pyvis.network import Network
+
+        net = Network(cdn_resources='in_line')
+        with stage("graph.template"):
+            net.templateEnv.get_template(net.path)
+        return net.templateEnv
+
+    return _templates.get_or_create("pyvis", create)
+
+
+def _network_html(G, positions, directed):
+    from pyvis.network import Network
+
+    net = Network(height="750px", width="100%", directed=directed, # 방향성 옵션 적용
+                  cdn_resources='in_line')
+    net.templateEnv = network_templates()
+
+    # pyvis의 add_node/add_edge는 중복 확인을 목록 전체 탐색으로 하므로(엣지 수의 제곱)
+    # 같은 형식의 노드·엣지 목록을 직접 채움 (크기·폰트는 표시 설정에서 전체 옵션으로 적용)
+    for node, attrs in G.nodes(data=True):
+        options = {
+            "id": node,
+            "label": node,
+            "title": attrs.get("title", node),
+            "shape": "dot",
+            "color": "#97c2fc",
+        }
+        if positions:
+            options["x"], options["y"] = positions[node]
+        net.nodes.append(options)
+        net.node_ids.append(node)
+        net.node_map[node] = options
+
+    for u, v, attrs in G.edges(data=True):
+        count = attrs.get("count", 1)
+        edge = {"from": u, "to": v, "title": attrs.get("title", ""), "color": attrs.get("color", "gray"),
+                "count": count, "width": count}
+        if directed:
+            edge["arrows"] = "to"
+        net.edges.append(edge)
+
+    net.options = dict(GRAPH_OPTIONS, physics=dict(GRAPH_OPTIONS["physics"], enabled=not positions))
+    html = _BOOTSTRAP_TAGS.sub("", net.generate_html())
+    # 표시 설정 스크립트를 붙일 수 있도록 </body> 앞까지만 보관
+    return html[:html.rindex("</body>")]
@@ -0,0 +1,235 @@
+import os
+import tempfile
+import zipfile
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+
+from core.cache import content_hash, render_key
+from core.export import DEFAULT_EXPORT, encode_pixmap, export_key
+from core.metrics import stage
+from core.uploads import open_pdf
+
+# ZIP 결과물이 이 크기를 넘으면 메모리 대신 임시 파일에 기록
+SPOOL_MAX_SIZE = 32 * 1024 * 1024
+# ZIP에 압축 없이 그대로 저장할 (이미 충분히 압축된) 형식
+STORED_EXTENSIONS = {"jpg", "jpeg", "webp", "gif", "zip"}
+# 다시 압축할 가치가 있는지 시험 압축해 볼 앞부분 크기
+COMPRESS_SAMPLE_SIZE = 64 * 1024
+
+# 병렬 렌더링 기본 작업자 수 (CPU 코어 수)
+DEFAULT_WORKERS = os.cpu_count() or 1
+
+# 작업자 프로세스마다 한 번만 여는 문서
+_worker_doc = None
+
+# fitz(PyMuPDF)는 렌더링하는 함수 안에서 불러옴
+# (이 모듈은 작업 대기열·ZIP 기록 때문에 모든 페이지가 불러오지만, PDF를 다루는 페이지는 일부뿐)
+
+
+def iter_rendered_pages(doc, zoom=2.0, clip=None, page_numbers=None, export=DEFAULT_EXPORT):
+    """
+    페이지를 한 장씩 렌더링하여 (페이지 번호, 이미지 바이트)를 차례로 돌려줍니다.
+    이미지 형식은 export(ExportOptions)를 따르며 기본은 PNG입니다.
+    원본 픽셀 버퍼는 인코딩 직후 버려지므로 문서 길이와 무관하게 메모리가 일정합니다.
+    """
+    import fitz  # PyMuPDF 라이브러리
+
+    matrix = fitz.Matrix(zoom, zoom)
+    if page_numbers is None:
+        page_numbers = range(len(doc))
+
+    for page_num in page_numbers:
+        with stage("page.pixmap", page=page_num, zoom=zoom):
+            page = doc.load_page(page_num)
+            pix = page.get_pixmap(matrix=matrix, clip=clip)
+        data = encode_pixmap(pix, export)
+        del pix, page
+        yield page_num, data
+
+
+def _init_worker(pdf_bytes):
+    global _worker_doc
+    with stage("pdf.open", size=len(pdf_bytes)):
+        _worker_doc = open_pdf(pdf_bytes)
+
+
+def _render_chunk(page_numbers, zoom, clip, export):
+    import fitz  # PyMuPDF 라이브러리
+
+    if clip is not None:
+        clip = fitz.Rect(clip)
+    return list(iter_rendered_pages(_worker_doc, zoom, clip, page_numbers, export))
+
+
+def _chunks(page_numbers, workers):
+    # 작업자당 4덩어리 정도로 나눠 페이지마다 다른 렌더링 시간을 고르게 분산
+    size = max(1, -(-len(page_numbers) // (workers * 4)))
+    for start in range(0, len(page_numbers), size):
+        yield page_numbers[start:start + size]
+
+
+def render_pages(pdf_bytes, zoom=2.0, clip=None, page_numbers=None, workers=None, cache=None,
+                 export=DEFAULT_EXPORT):
+    """
+    PDF 바이트를 받아 페이지들을 렌더링하고 (페이지 번호, 이미지 바이트)를 순서대로 돌려줍니다.
+    workers가 2 이상이면 페이지 범위를 덩어리로 나눠 프로세스 풀에서 나눠 렌더링합니다.
+    각 작업자는 업로드된 바이트로 자신만의 문서를 엽니다. (임시 파일로 옮긴 업로드는 같은 파일을 경로로 엶)
+    cache(RenderCache)를 넘기면 이미 렌더링한 페이지는 캐시에서 꺼내고 나머지만 렌더링합니다.
+    """
+    workers = workers or DEFAULT_WORKERS
+    if clip is not None:
+        clip = tuple(clip)
+
+    if page_numbers is None:
+        with open_pdf(pdf_bytes) as doc:
+            page_numbers = range(len(doc))
+    page_numbers = list(page_numbers)
+
+    if cache is None:
+        yield from _render_uncached(pdf_bytes, zoom, clip, page_numbers, workers, export)
+        return
+
+    digest = content_hash(pdf_bytes)
+    fmt = export_key(export)
+    keys = {page_num: render_key(digest, page_num, zoom, clip, fmt) for page_num in page_numbers}
+    missing = [page_num for page_num in page_numbers if keys[page_num] not in cache]
+    rendered = _render_uncached(pdf_bytes, zoom, clip, missing, workers, export)
+    missing = set(missing)
+
+    for page_num in page_numbers:
+        if page_num in missing:
+            _, data = next(rendered)
+            cache.put(keys[page_num], data)
+        else:
+            data = cache.get(keys[page_num])
+            if data is None:
+                # 확인한 뒤 다른 세션 때문에 밀려난 경우: 이 페이지만 다시 렌더링
+                _, data = next(_render_uncached(pdf_bytes, zoom, clip, [page_num], 1, export))
+                cache.put(keys[page_num], data)
+        yield page_num, data
+
+
+def _render_uncached(pdf_bytes, zoom, clip, page_numbers, workers, export):
+    import fitz  # PyMuPDF 라이브러리
+
+    if not page_numbers:
+        return
+
+    if workers <= 1 or len(page_numbers) <= 1:
+        with stage("pdf.open", size=len(pdf_bytes)):
+            doc = open_pdf(pdf_bytes)
+        with doc:
+            yield from iter_rendered_pages(
+                doc, zoom, fitz.Rect(clip) if clip is not None else None, page_numbers, export
+            )
+        return
+
+    workers = min(workers, len(page_numbers))
+    with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(pdf_bytes,)) as pool:
+        # 결과는 순서대로 꺼내되, 앞서 제출한 덩어리가 너무 많이 쌓이지 않도록 제한
+        pending = []
+        try:
+            for chunk in _chunks(page_numbers, workers):
+                pending.append(pool.submit(_render_chunk, chunk, zoom, clip, export))
+                if len(pending) >= workers * 2:
+                    yield from pending.pop(0).result()
+            while pending:
+                yield from pending.pop(0).result()
+        finally:
+            # 받는 쪽이 중간에 멈추면(작업 취소 등) 아직 시작하지 않은 덩어리는 렌더링하지 않음
+            for future in pending:
+                future.cancel()
+
+
+@contextmanager
+def process_pool(workers, pool=None):
+    """
+    pool(여러 작업이 함께 쓰는 프로세스 풀)을 주면 그대로 빌려 쓰고(닫지 않음),
+    없으면 workers개짜리 풀을 새로 만들어 끝나면 닫습니다.
+    """
+    if pool is not None:
+        yield pool
+        return
+    with ProcessPoolExecutor(workers) as pool:
+        yield pool
+
+
+def ordered_results(pool, fn, arg_tuples, workers):
+    """
+    인자 묶음마다 fn을 pool에 제출하고 결과를 입력 순서대로 돌려줍니다.
+    앞서 제출한 작업이 workers의 두 배를 넘으면 먼저 꺼내므로 결과가 쌓이지 않고 공유 풀을 독차지하지도 않으며,
+    받는 쪽이 중간에 멈추면(작업 취소 등) 아직 시작하지 않은 작업은 취소합니다.
+    """
+    pending = []
+    try:
+        for args in arg_tuples:
+            pending.append(pool.submit(fn, *args))
+            if len(pending) >= workers * 2:
+                yield pending.pop(0).result()
+        while pending:
+            yield pending.pop(0).result()
+    finally:
+        for future in pending:
+            future.cancel()
+
+
+def zip_compression(name, data):
+    """
+    ZIP 항목의 압축 방식을 고릅니다. 이미 압축된 데이터를 DEFLATE로 다시 압축하면 거의 줄지 않고
+    CPU만 쓰므로 그대로 저장(STORED)합니다.
+    - JPEG·WebP 등은 항상 STORED
+    - 그 밖의 항목(PNG, PDF 등)은 앞부분을 시험 압축해 10% 이상 줄어들 때만 DEFLATE
+      (PyMuPDF가 만든 PNG는 압축이 약해 DEFLATE로 30~70% 더 줄어드는 경우가 많음)
+    """
+    if name.rsplit('.', 1)[-1].lower() in STORED_EXTENSIONS:
+        return zipfile.ZIP_STORED
+    if isinstance(data, (str, os.PathLike)):
+        with open(data, "rb") as f:
+            sample = f.read(COMPRESS_SAMPLE_SIZE)
+    else:
+        sample = data[:COMPRESS_SAMPLE_SIZE]
+    if len(zlib.compress(sample, 1)) < len(sample) * 0.9:
+        return zipfile.ZIP_DEFLATED
+    return zipfile.ZIP_STORED
+
+
+def write_zip(entries):
+    """
+    (파일명, 바이트 또는 파일 경로) 묶음을 받는 대로 ZIP에 기록합니다.
+    파일 경로는 조금씩 읽어 복사하므로 항목 전체를 메모리에 올리지 않습니다.
+    크기가 커지면 임시 파일로 넘어가는 버퍼와 기록된 파일명 목록을 돌려줍니다.
+    """
+    spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+    names = _write_zip_entries(spool, entries)
+    spool.seek(0)
+    return spool, names
+
+
+def write_zip_file(entries, prefix="result_"):
+    """
+    write_zip과 같지만 ZIP을 임시 파일에 기록하고 (파일 경로, 기록된 파일명 목록)을 돌려줍니다.
+    작업 대기열의 결과처럼 오래 남겨 둘 ZIP에 쓰며, 파일은 부르는 쪽(Job.own_file 등)이 지웁니다.
+    기록 중에 오류가 나거나 작업이 취소되면 임시 파일을 바로 지웁니다.
+    """
+    fd, path = tempfile.mkstemp(prefix=prefix, suffix=".zip")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            names = _write_zip_entries(f, entries)
+    except BaseException:
+        os.remove(path)
+        raise
+    return path, names
+
+
+def _write_zip_entries(file, entries):
+    names = []
+    with zipfile.ZipFile(file, "w", zipfile.ZIP_DEFLATED, False) as zip_file:
+        for name, data in entries:
+            with stage("zip.write", name=name):
+                if isinstance(data, (str, os.PathLike)):
+                    zip_file.write(data, arcname=name, compress_type=zip_compression(name, data))
+                else:
+                    zip_file.writestr(name, data, compress_type=zip_compression(name, data))
+            names.append(name)
+    return names
@@ -0,0 +1,125 @@
+# 프로세스마다 한 번만 만들어 모든 세션·다시 실행이 함께 쓰는 자원 (Streamlit 자원 캐시)
+import importlib
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import streamlit as st
+
+from core.metrics import stage
+from core.render import DEFAULT_WORKERS
+
+# 첫 페이지를 연 뒤 다른 페이지·업로드 후 처리에 쓸 라이브러리를 백그라운드에서 미리 불러올지 (0이면 끔)
+WARM_UP = os.environ.get("RESOURCE_WARM_UP", "1") != "0"
+# 미리 불러오기 전에 기다릴 시간 (초): 미리 불러오기를 시작한 페이지가 먼저 그려지도록
+WARM_UP_DELAY = float(os.environ.get("RESOURCE_WARM_UP_DELAY", "2"))
+# 미리 불러올 모듈 (페이지들은 업로드 후에 쓰는 함수 안에서 불러옴)
+WARM_UP_MODULES = ("fitz", "pypdf", "pandas", "pyarrow.parquet", "networkx", "numpy", "scipy.sparse",
+                   "core.analytics")
+
+# 좌표 그리드: 간격(픽셀), 숫자 색, 가는 선, 굵은 선 (두 칸마다)
+GRID_SPACING = 50
+GRID_TEXT_COLOR = (0, 0, 255, 255)
+GRID_LINE_COLOR = (150, 150, 150, 255)
+GRID_BOLD_LINE_COLOR = (0, 0, 0, 255)
+
+
+@st.cache_resource(show_spinner=False)
+def label_font():
+    """미리보기의 좌표 숫자·영역 이름에 쓰는 Pillow 기본 폰트"""
+    from PIL import ImageFont
+
+    return ImageFont.load_default()
+
+
+@st.cache_resource(show_spinner=False, max_entries=16)
+def grid_overlay(width, height, zoom):
+    """
+    미리보기 크기·확대율별 PDF 원본 좌표 그리드를 투명 배경 RGBA 이미지로 돌려줍니다.
+    그리드는 페이지 내용과 무관하므로 한 번만 그리고, 렌더링한 페이지 위에 붙이기만 합니다. (읽기 전용)
+    """
+    from PIL import Image, ImageDraw
+
+    overlay = Image.new("RGBA", (width, height), (0, 0, 0, 0))
+    draw = ImageDraw.Draw(overlay)
+    font = label_font()
+
+    # 가로선: 짝수 간격마다 더 굵게, 왼쪽에 실제 PDF 좌표 표시
+    for y in range(0, height, GRID_SPACING):
+        bold = (y // GRID_SPACING) % 2 == 0
+        draw.line([(0, y), (width, y)], fill=GRID_BOLD_LINE_COLOR if bold else GRID_LINE_COLOR, width=2 if bold else 1)
+        draw.text((5, y + 2), str(int(y / zoom)), fill=GRID_TEXT_COLOR, font=font)
+
+    # 세로선: 숫자는 겹치지 않게 약간 아래로 (0은 표시 안 함)
+    for x in range(0, width, GRID_SPACING):
+        bold = (x // GRID_SPACING) % 2 == 0
+        draw.line([(x, 0), (x, height)], fill=GRID_BOLD_LINE_COLOR if bold else GRID_LINE_COLOR, width=2 if bold else 1)
+        if x > 0:
+            draw.text((x + 2, 5), str(int(x / zoom)), fill=GRID_TEXT_COLOR, font=font)
+    return overlay
+
+
+@st.cache_resource(show_spinner=False)
+def _worker_pool():
+    return ProcessPoolExecutor(DEFAULT_WORKERS)
+
+
+_rebuild_lock = threading.Lock()
+
+
+class _SharedPool:
+    # 공유 프로세스 풀에 일을 맡기는 창구 (ordered_results 등은 submit만 씀)
+    def submit(self, fn, *args, **kwargs):
+        pool = _worker_pool()
+        try:
+            return pool.submit(fn, *args, **kwargs)
+        except BrokenProcessPool:
+            # 작업자 프로세스가 죽으면(메모리 부족 등) 풀을 쓸 수 없으므로 새로 만들어 다시 맡김
+            # (여러 세션이 동시에 겪어도 한 번만 새로 만듦)
+            with _rebuild_lock:
+                if _worker_pool() is pool:
+                    pool.shutdown(wait=False, cancel_futures=True)
+                    _worker_pool.clear()
+            return _worker_pool().submit(fn, *args, **kwargs)
+
+
+_shared_pool = _SharedPool()
+
+
+def worker_pool():
+    """
+    일괄 처리(여러 PDF 영역 추출, 여러 쌍 병합, 여러 이미지 변환)가 함께 쓰는 프로세스 풀 (CPU 코어 수만큼)
+    작업마다 작업자 프로세스를 새로 띄우지 않고 프로세스가 끝날 때까지 재사용합니다.
+    작업 하나가 동시에 맡기는 일은 그 작업의 작업자 수로 제한됩니다. (ordered_results 참고)
+    풀이 깨졌으면 일을 맡길 때 새 풀을 만들어 다시 맡깁니다. (이미 맡겨 둔 일은 BrokenProcessPool로 실패)
+    """
+    return _shared_pool
+
+
+def _warm_up():
+    from core.relmap import network_templates
+
+    time.sleep(WARM_UP_DELAY)
+    with stage("resources.warm_up", modules=len(WARM_UP_MODULES)):
+        for name in WARM_UP_MODULES:
+            importlib.import_module(name)
+        network_templates()
+
+
+@st.cache_resource(show_spinner=False)
+def _warm_up_thread():
+    thread = threading.Thread(target=_warm_up, name="resources.warm_up", daemon=True)
+    thread.start()
+    return thread
+
+
+def warm_up():
+    """
+    (페이지 맨 앞에서 호출) 프로세스에서 처음 한 번만 백그라운드 스레드를 띄워, 잠시 뒤
+    무거운 라이브러리를 미리 불러오고 pyvis 템플릿을 해석해 둡니다.
+    페이지 첫 화면은 필요한 것만 불러와 빨리 그리고, 다른 페이지로 옮기거나 파일을 올릴 때는 이미 준비되어 있습니다.
+    """
+    if WARM_UP:
+        _warm_up_thread()
@@ -0,0 +1,158 @@
+from collections import namedtuple
+
+from core.cache import LRUCache, content_hash
+from core.export import DEFAULT_EXPORT, FORMATS, export_extension
+from core.metrics import stage
+from core.render import render_pages
+from core.uploads import open_pdf
+
+# 이미지가 페이지 가장자리에서 이 비율(긴 변 기준)까지 벗어나도 페이지 전체를 덮은 것으로 봄
+COVER_TOLERANCE = 0.01
+
+# 스캔 페이지의 이미지 한 장: xref, 꺼낼 확장자(jpg/png), 페이지 위 위치(PDF 좌표), 원본 픽셀 크기
+ScanImage = namedtuple("ScanImage", "xref ext rect width height")
+
+# (내용 해시, 페이지 번호)별 ScanImage 또는 None (최근 4096쪽까지 보관)
+_scans = LRUCache(max_entries=4096)
+
+_MIME_BY_EXTENSION = {ext: mime for ext, mime in FORMATS.values()}
+
+# fitz(PyMuPDF)는 쓰는 함수 안에서 불러옴 (main.py가 불러오는 모듈이라 PDF를 올리기 전에는 필요 없음)
+
+
+def scan_image(page):
+    """
+    페이지가 '스캔 이미지 한 장'이면 ScanImage를, 아니면 None을 돌려줍니다.
+    - 이미지 한 장이 페이지 전체를 똑바로(회전·뒤집힘 없이) 덮고, 그 밖에 그려지는 것이 없어야 합니다.
+      (OCR로 넣은 보이지 않는 글자층은 괜찮음, 주석·양식 필드가 있으면 렌더링)
+    - JPEG(DCT, 회색조·RGB)는 그대로, 흑백 1비트(팩스·JBIG2 스캔 등)는 PNG로 꺼냅니다.
+      그 밖의 형식(CMYK JPEG, 8비트 무손실 이미지, 투명도 마스크가 있는 이미지 등)은 렌더링합니다.
+    모두 이미지를 디코딩하지 않는 가벼운 검사입니다.
+    """
+    import fitz  # PyMuPDF 라이브러리
+
+    if page.rotation or page.first_annot or page.first_widget:
+        return None
+    images = page.get_images(full=True)
+    if len(images) != 1:
+        return None
+    kinds = [kind for kind, _ in page.get_bboxlog()]
+    if kinds.count("fill-image") != 1 or any(kind not in ("fill-image", "ignore-text") for kind in kinds):
+        return None
+
+    info = page.get_image_info()
+    if len(info) != 1 or info[0]["has-mask"]:
+        return None
+    a, b, c, d, _, _ = info[0]["transform"]
+    if b or c or a <= 0 or d <= 0:
+        return None
+    rect = fitz.Rect(info[0]["bbox"])
+    tolerance = max(page.rect.width, page.rect.height) * COVER_TOLERANCE
+    if any(abs(u - v) > tolerance for u, v in zip(rect, page.rect)):
+        return None
+
+    xref, _, width, height, bpc, _, _, _, image_filter, _ = images[0]
+    doc = page.parent
+    if doc.xref_get_key(xref, "Decode")[0] != "null" or doc.xref_get_key(xref, "ImageMask")[0] != "null":
+        return None
+    if image_filter == "DCTDecode" and info[0]["colorspace"] in (1, 3):
+        ext = "jpg"
+    elif bpc == 1:
+        ext = "png"
+    else:
+        return None
+    return ScanImage(xref, ext, tuple(rect), width, height)
+
+
+def page_scan(digest, doc, page_num):
+    """
+    열린 문서(doc, 내용 해시 digest)의 한 페이지를 검사해 ScanImage 또는 None을 돌려줍니다.
+    같은 업로드의 같은 페이지는 캐시된 결과를 돌려줍니다.
+    """
+    return _scans.get_or_create((digest, page_num), lambda: scan_image(doc[page_num]))
+
+
+def scan_pages(digest, doc, page_numbers):
+    """
+    page_numbers 중 그대로 꺼낼 수 있는 스캔 페이지를 {페이지 번호: ScanImage}로 돌려줍니다.
+    문서 전체가 아니라 필요한 페이지(화면에 보이는 페이지, 내려받을 페이지 등)만 검사합니다.
+    """
+    scans = {}
+    with stage("scan.detect", pages=len(page_numbers)) as info:
+        for page_num in page_numbers:
+            scan = page_scan(digest, doc, page_num)
+            if scan is not None:
+                scans[page_num] = scan
+        info["scans"] = len(scans)
+    return scans
+
+
+def scan_mime(scan):
+    return _MIME_BY_EXTENSION[scan.ext]
+
+
+def extract_scan_image(doc, scan):
+    """
+    스캔 이미지를 다시 인코딩하지 않고 꺼냅니다. (JPEG는 PDF에 든 바이트 그대로)
+    """
+    import fitz  # PyMuPDF 라이브러리
+
+    with stage("scan.extract", ext=scan.ext) as info:
+        image = doc.extract_image(scan.xref)
+        if {"jpeg": "jpg"}.get(image["ext"], image["ext"]) == scan.ext:
+            data = image["image"]
+        else:
+            # PyMuPDF가 원본 형식(JBIG2 등) 그대로 돌려준 경우: 원본 해상도로 디코딩해 PNG로 저장
+            data = fitz.Pixmap(doc, scan.xref).tobytes("png")
+        info["bytes"] = len(data)
+    return data
+
+
+def scan_region(scan, rect):
+    """
+    PDF 좌표의 영역을 스캔 이미지 원본 픽셀 그대로 잘라내는 (확대 행렬, 잘라낼 영역)으로 바꿉니다.
+    스캔 해상도와 같은 배율에 픽셀 경계로 맞춘 영역이라 렌더링 결과가 디코딩한 이미지를 자른 것과 픽셀 단위로 같고,
+    MuPDF는 이미지에서 그 영역만 디코딩하므로 페이지 전체를 풀어서 자르는 것보다 빠릅니다.
+    이미지와 겹치지 않으면 None을 돌려줍니다.
+    """
+    import fitz  # PyMuPDF 라이브러리
+
+    x0, y0, x1, y1 = scan.rect
+    sx, sy = scan.width / (x1 - x0), scan.height / (y1 - y0)
+    left = min(max(round((rect[0] - x0) * sx), 0), scan.width)
+    top = min(max(round((rect[1] - y0) * sy), 0), scan.height)
+    right = min(max(round((rect[2] - x0) * sx), 0), scan.width)
+    bottom = min(max(round((rect[3] - y0) * sy), 0), scan.height)
+    if right <= left or bottom <= top:
+        return None
+    clip = fitz.Rect(x0 + left / sx, y0 + top / sy, x0 + right / sx, y0 + bottom / sy)
+    return fitz.Matrix(sx, sy), clip
+
+
+def iter_page_images(pdf_bytes, zoom=2.0, page_numbers=None, workers=None, cache=None, export=DEFAULT_EXPORT,
+                     passthrough=True):
+    """
+    페이지별 (페이지 번호, 확장자, 이미지 바이트)를 순서대로 돌려줍니다.
+    passthrough이면 스캔 페이지는 PDF에 든 이미지를 원본 해상도·형식 그대로 꺼내고(확대율·출력 형식 무시),
+    나머지 페이지만 render_pages로 렌더링합니다. (렌더링할 페이지는 작업자 수만큼 병렬 처리)
+    """
+    ext = export_extension(export)
+    if not passthrough:
+        for page_num, data in render_pages(pdf_bytes, zoom=zoom, page_numbers=page_numbers, workers=workers,
+                                           cache=cache, export=export):
+            yield page_num, ext, data
+        return
+
+    with open_pdf(pdf_bytes) as doc:
+        if page_numbers is None:
+            page_numbers = range(len(doc))
+        page_numbers = list(page_numbers)
+        scans = scan_pages(content_hash(pdf_bytes), doc, page_numbers)
+        rendered = render_pages(pdf_bytes, zoom=zoom, page_numbers=[n for n in page_numbers if n not in scans],
+                                workers=workers, cache=cache, export=export)
+        for page_num in page_numbers:
+            if page_num in scans:
+                yield page_num, scans[page_num].ext, extract_scan_image(doc, scans[page_num])
+            else:
+                _, data = next(rendered)
+                yield page_num, ext, data
@@ -0,0 +1,106 @@
+from collections import namedtuple
+
+from core.cache import LRUCache
+from core.metrics import stage
+from core.uploads import open_stream
+
+# 업로드를 받는 설문 파일 형식 (확장자, Excel은 openpyxl로 읽는 xlsx만)
+SURVEY_TYPES = ["csv", "parquet", "xlsx"]
+# CSV는 이 행 수씩 나눠 읽음 (파서 버퍼가 파일 전체 크기로 커지지 않도록)
+CSV_CHUNK_ROWS = 50000
+# 미리보기·열 목록 확인에 읽는 행 수
+PREVIEW_ROWS = 5
+# CSV 인코딩 후보 (엑셀에서 저장한 한글 CSV는 cp949인 경우가 많음)
+CSV_ENCODINGS = ("utf-8-sig", "cp949")
+
+# 파일 형식, CSV 인코딩, 열 이름 목록, 미리보기 DataFrame
+SurveyHeader = namedtuple("SurveyHeader", "format encoding columns preview")
+
+_headers = LRUCache(max_entries=16)
+# (업로드, 읽은 열)별 설문 DataFrame (최근 4개까지 보관)
+_surveys = LRUCache(max_entries=4)
+
+# pandas·pyarrow는 파일을 읽을 때 불러옴 (업로드 전 첫 화면은 형식 목록만 씀)
+
+
+def survey_format(file_name):
+    """파일 확장자로 "csv", "parquet", "excel" 중 하나를 돌려줍니다."""
+    ext = file_name.rsplit('.', 1)[-1].lower()
+    if ext == "xlsx":
+        return "excel"
+    if ext == "parquet":
+        return "parquet"
+    return "csv"
+
+
+def _sniff(data, file_name):
+    import pandas as pd
+
+    file_format = survey_format(file_name)
+    if file_format == "parquet":
+        import pyarrow.parquet as pq
+
+        parquet = pq.ParquetFile(open_stream(data))
+        batch = next(parquet.iter_batches(batch_size=PREVIEW_ROWS), None)
+        preview = batch.to_pandas() if batch is not None else parquet.schema_arrow.empty_table().to_pandas()
+        return SurveyHeader(file_format, None, parquet.schema_arrow.names, preview)
+    if file_format == "excel":
+        preview = pd.read_excel(open_stream(data), nrows=PREVIEW_ROWS)
+        return SurveyHeader(file_format, None, [str(c) for c in preview.columns], preview)
+
+    for encoding in CSV_ENCODINGS:
+        try:
+            preview = pd.read_csv(open_stream(data), nrows=PREVIEW_ROWS, encoding=encoding)
+        except UnicodeDecodeError:
+            continue
+        return SurveyHeader(file_format, encoding, preview.columns.tolist(), preview)
+    raise ValueError(f"CSV 인코딩을 알 수 없습니다. ({', '.join(CSV_ENCODINGS)} 중 하나로 저장해주세요)")
+
+
+def survey_header(digest, data, file_name):
+    """
+    파일 앞부분만 읽어 형식, 열 이름, 미리보기를 SurveyHeader로 돌려줍니다. (전체를 파싱하지 않음)
+    같은 업로드(내용 해시 digest)는 캐시된 결과를 돌려줍니다.
+    """
+    def create():
+        with stage("survey.sniff", size=len(data)):
+            return _sniff(data, file_name)
+
+    return _headers.get_or_create((digest, file_name), create)
+
+
+def _read(data, header, columns, name_column):
+    import pandas as pd
+
+    source = open_stream(data)
+    if header.format == "parquet":
+        import pyarrow.parquet as pq
+
+        df = pq.read_table(source, columns=columns).to_pandas()
+    elif header.format == "excel":
+        df = pd.read_excel(source, usecols=columns, dtype=str)
+    else:
+        # 필요한 열만 문자열로 파싱해 청크 단위로 모음
+        chunks = list(pd.read_csv(source, usecols=columns, dtype="string", encoding=header.encoding,
+                                  chunksize=CSV_CHUNK_ROWS))
+        df = pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame(columns=columns)
+
+    # 관계 열은 "이름1, 이름2" 문자열, 이름 열은 같은 값이 반복되므로 범주형
+    df = df[columns].astype("string")
+    df[name_column] = df[name_column].astype("category")
+    return df
+
+
+def load_survey(digest, data, header, name_column, relation_columns):
+    """
+    이름 열과 선택한 관계 열만 읽어 DataFrame으로 돌려줍니다.
+    CSV는 CSV_CHUNK_ROWS 행씩 나눠 읽으므로 메모리와 시간이 파일의 열 수가 아니라 쓰는 열 수에 비례합니다.
+    같은 업로드·열 선택이면 캐시된 결과를 돌려줍니다.
+    """
+    columns = list(dict.fromkeys([name_column, *relation_columns]))
+
+    def create():
+        with stage("survey.read", format=header.format, size=len(data), columns=len(columns)):
+            return _read(data, header, columns, name_column)
+
+    return _surveys.get_or_create((digest, tuple(columns)), create)
@@ -0,0 +1,175 @@
+# 여러 페이지(Streamlit 스크립트)에서 함께 쓰는 사이드바 위젯·세션 도우미
+import os
+import weakref
+from pathlib import Path
+
+import streamlit as st
+
+from core.export import DEFAULT_EXPORT, FORMATS, ExportOptions
+from core.jobs import CANCELLED, QUEUED, JobQueueFull, job_scheduler
+from core.metrics import stage, start_recording, stop_recording, summarize
+from core.uploads import upload_store
+
+# 성능 기록 패널을 항상 표시 (아니면 주소에 ?debug=1을 붙였을 때만)
+METRICS_PANEL = bool(os.environ.get("METRICS_PANEL"))
+# 진행 중인 작업의 진행률을 다시 그리는 간격 (초)
+JOB_POLL_SECONDS = 1.0
+
+
+def export_settings(default_dpi=None, key="export"):
+    """
+    사이드바에 출력 이미지 형식·품질(과 default_dpi를 주면 해상도) 설정을 표시하고
+    (ExportOptions, DPI)를 돌려줍니다. default_dpi가 없으면 DPI는 None입니다.
+    """
+    quality, compress_level, lossless = DEFAULT_EXPORT.quality, DEFAULT_EXPORT.compress_level, False
+    dpi = None
+    with st.sidebar.expander("출력 이미지 설정"):
+        fmt = st.selectbox("이미지 형식", list(FORMATS), key=f"{key}_format",
+                           help="PNG는 무손실, WebP·JPEG는 파일이 훨씬 작고 인코딩도 빠릅니다.")
+        if fmt == "PNG":
+            compress_level = st.slider("PNG 압축 단계 (높을수록 작고 느림)", 0, 9, DEFAULT_EXPORT.compress_level,
+                                       key=f"{key}_compress_level")
+        elif fmt == "WebP":
+            lossless = st.checkbox("무손실 WebP", value=False, key=f"{key}_lossless")
+        if fmt == "JPEG" or (fmt == "WebP" and not lossless):
+            quality = st.slider("품질", 1, 100, DEFAULT_EXPORT.quality, key=f"{key}_quality")
+        if default_dpi:
+            dpi = st.number_input("출력 해상도 (DPI)", min_value=36, max_value=600, value=default_dpi, step=12,
+                                  key=f"{key}_dpi", help="PDF 원본 72 DPI 기준. 144 DPI는 2배, 288 DPI는 4배 확대입니다.")
+    return ExportOptions(fmt, quality, compress_level, lossless), dpi
+
+
+def metrics_panel():
+    """
+    디버그용 성능 기록 패널. 스크립트 맨 앞에서 부르면 이번 실행에서 끝난 단계들의
+    횟수·시간·최대 메모리를 사이드바 표로 보여주고, 큰 단계가 끝날 때마다 갱신합니다.
+    (다운로드 버튼을 누를 때 만드는 결과와 작업 대기열에서 도는 작업은 다른 스레드에서 실행되므로
+    METRICS_LOG 로그에만 남습니다)
+    """
+    if not (METRICS_PANEL or st.query_params.get("debug") == "1"):
+        stop_recording()
+        return
+
+    placeholder = st.sidebar.expander("성능 기록 (디버그)", expanded=True).empty()
+
+    def draw(records):
+        import pandas as pd  # 디버그 패널을 켰을 때만 필요
+
+        table = pd.DataFrame(summarize(records))
+        placeholder.dataframe(table.rename(columns={
+            "stage": "단계", "count": "횟수", "wall_s": "시간(초)", "cpu_s": "CPU(초)",
+            "peak_rss_mb": "최대 메모리(MB)", "child_peak_rss_mb": "작업자 최대 메모리(MB)",
+        }), hide_index=True)
+
+    placeholder.caption("아직 기록된 단계가 없습니다.")
+    start_recording(draw)
+
+
+class _SessionUpload:
+    # 세션이 잡고 있는 업로드 저장소 참조: 파일이 바뀌면 release()로, 세션이 끝나 세션 상태가 사라지면 저절로 돌려줌
+    def __init__(self, upload):
+        self.upload = upload
+        self.release = weakref.finalize(self, upload_store.release, upload)
+
+
+def session_uploads(slot, uploaded_files):
+    """
+    업로더(slot은 페이지 안에서 겹치지 않는 이름)에 올라온 파일들을 업로드 저장소에 넣고 StoredUpload 목록을 돌려줍니다.
+    파일 바이트는 복사하지 않고(getvalue), 내용 해시는 파일마다 처음 한 번만 계산합니다.
+    올린 파일이 빠지거나 바뀌면 이전 파일의 참조를 돌려줍니다.
+    """
+    held = st.session_state.setdefault("_uploads", {})
+    previous = held.get(slot, {})
+    current = {}
+    for uploaded_file in uploaded_files:
+        ref = previous.pop(uploaded_file.file_id, None) or current.get(uploaded_file.file_id)
+        if ref is None:
+            with stage("file.read", file=uploaded_file.name, size=uploaded_file.size):
+                ref = _SessionUpload(upload_store.acquire(uploaded_file.getvalue()))
+        current[uploaded_file.file_id] = ref
+    for ref in previous.values():
+        ref.release()
+    held[slot] = current
+    return [current[uploaded_file.file_id].upload for uploaded_file in uploaded_files]
+
+
+def session_upload(slot, uploaded_file):
+    """파일 하나를 받는 업로더용 session_uploads (올린 파일이 없으면 None)"""
+    uploads = session_uploads(slot, [uploaded_file] if uploaded_file is not None else [])
+    return uploads[0] if uploads else None
+
+
+def _remove_file(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+class _SessionFile:
+    # 세션이 잡고 있는 임시 파일: 같은 자리에 새 파일이 오면 remove()로, 세션이 끝나 세션 상태가 사라지면 저절로 지움
+    def __init__(self, path):
+        self.path = path
+        self.remove = weakref.finalize(self, _remove_file, path)
+
+
+def session_file(slot, path):
+    """
+    작업 대기열을 거치지 않고 만든 임시 파일(결과 ZIP 등)을 세션에 맡기고 경로를 돌려줍니다.
+    같은 slot에 맡겨 두었던 이전 파일은 지웁니다.
+    """
+    held = st.session_state.setdefault("_files", {})
+    previous = held.get(slot)
+    if previous is not None:
+        previous.remove()
+    held[slot] = _SessionFile(path)
+    return path
+
+
+def download_file(label, path, file_name, mime, key=None):
+    """
+    임시 파일(작업 결과 ZIP 등)을 내려받는 버튼을 표시합니다. 파일은 사용자가 버튼을 누를 때만 읽으므로
+    다시 실행할 때마다 큰 파일을 읽어 미디어 저장소에 올리고 해시하지 않습니다.
+    """
+    st.download_button(label=label, data=lambda: Path(path).read_bytes(), file_name=file_name, mime=mime, key=key)
+
+
+def submit_job(key, label, fn, *args, workers=None):
+    """
+    작업을 대기열에 넣고 Job을 돌려줍니다. (같은 키의 작업이 있으면 그 작업)
+    대기열이 가득 차 거절되면 경고를 표시하고 None을 돌려줍니다.
+    """
+    try:
+        return job_scheduler.submit(key, label, fn, *args, workers=workers)
+    except JobQueueFull as e:
+        st.warning(f"⏳ {e}")
+        return None
+
+
+@st.fragment(run_every=JOB_POLL_SECONDS)
+def _job_progress(job, key):
+    # 작업이 끝나면 스크립트 전체를 다시 실행해 결과를 표시
+    if not job.active:
+        st.rerun()
+    if job.status == QUEUED:
+        st.info(f"⏳ {job.label}: 차례를 기다리는 중입니다. (앞에 {job_scheduler.queue_position(job)}개)")
+    else:
+        text = f"{job.label}: {job.done}/{job.total}" if job.total else f"{job.label}: 처리 중..."
+        st.progress(job.progress or 0.0, text=text)
+    if st.button("작업 취소", key=f"{key}_cancel"):
+        job.cancel()
+        st.rerun()
+
+
+def job_panel(job, key):
+    """
+    작업 상태를 표시하고 상태를 돌려줍니다.
+    진행 중이면 진행률과 취소 버튼을 보여주며 JOB_POLL_SECONDS마다 이 부분만 다시 그리고,
+    끝나면 스크립트 전체를 다시 실행합니다. 취소된 작업은 안내만 표시하고,
+    완료·실패 시의 표시는 부르는 쪽에서 합니다. (key는 취소 버튼 위젯 키)
+    """
+    if job.active:
+        _job_progress(job, key)
+    elif job.status == CANCELLED:
+        st.warning(f"{job.label} 작업이 취소되었습니다. 다시 시작하려면 버튼을 눌러주세요.")
+    return job.status
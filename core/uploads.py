@@ -0,0 +1,192 @@
+"""
+업로드 저장소: 세션들이 올린 파일을 내용 해시로 한 벌만 보관합니다.
+
+    upload = upload_store.acquire(uploaded_file.getvalue())   # 보통은 core.ui.session_upload로 부름
+    with upload.document() as doc:                             # 여러 세션이 함께 쓰는 열린 문서
+        page_count = len(doc)
+    render_pages(upload.data, ...)                              # 작업·렌더링에는 내용(bytes처럼 쓰는 객체)을 넘김
+    upload_store.release(upload)
+
+- 같은 파일을 여러 세션(예: 같은 학습지를 올린 교사 30명)이 올리면 처음 들어온 내용과 열어 둔 문서를 함께 쓰고,
+  쓰는 세션 수(참조 수)가 0이 되면 문서를 닫고 보관을 끝냅니다.
+- UPLOAD_SPILL_MB를 넘는 업로드는 임시 파일에 한 번 기록하고 읽기 전용 메모리 매핑(MappedUpload)으로 씁니다.
+  PDF는 파일 경로로 열고(open_pdf), 프로세스 풀에는 내용 대신 경로만 보내므로 바이트를 복사하지 않습니다.
+  임시 파일은 마지막 사용처(보관이 끝난 뒤에도 진행 중인 작업 등)가 매핑을 놓을 때 지웁니다.
+"""
+import io
+import mmap
+import os
+import tempfile
+import threading
+import weakref
+from contextlib import contextmanager
+
+from core.cache import content_hash
+
+# 이 크기(MB)를 넘는 업로드는 임시 파일로 옮겨 메모리 매핑으로 씀
+UPLOAD_SPILL_MB = float(os.environ.get("UPLOAD_SPILL_MB", "16"))
+# 임시 파일을 둘 폴더 (기본: 시스템 임시 폴더)
+UPLOAD_DIR = os.environ.get("UPLOAD_DIR") or None
+
+
+class MappedUpload(mmap.mmap):
+    """
+    임시 파일로 옮긴 업로드의 읽기 전용 메모리 매핑입니다. bytes처럼 len·슬라이스·해시 계산에 쓸 수 있고,
+    이미 계산한 내용 해시(digest)와 파일 경로(path)를 함께 가집니다.
+    프로세스 풀로 보낼 때는 경로만 보내고, 받은 작업자는 같은 파일을 다시 매핑합니다.
+    """
+
+    def __reduce__(self):
+        return map_upload, (self.path, self.digest)
+
+
+def map_upload(path, digest):
+    """임시 파일을 읽기 전용으로 매핑합니다. (파일을 지우는 일은 매핑을 만든 저장소가 맡음)"""
+    with open(path, "rb") as f:
+        mapped = MappedUpload(f.fileno(), 0, access=mmap.ACCESS_READ)
+    mapped.path = path
+    mapped.digest = digest
+    return mapped
+
+
+def _remove(path, pid):
+    # 포크한 작업자 프로세스가 끝날 때는 지우지 않음
+    if os.getpid() != pid:
+        return
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def open_pdf(data):
+    """
+    PDF 바이트로 문서를 엽니다. 임시 파일로 옮긴 업로드(MappedUpload)는 파일 경로로 열어
+    MuPDF가 필요한 부분만 읽게 합니다.
+    """
+    import fitz  # PyMuPDF 라이브러리
+
+    if isinstance(data, MappedUpload):
+        return fitz.open(data.path, filetype="pdf")
+    return fitz.open(stream=data, filetype="pdf")
+
+
+def open_stream(data):
+    """
+    pypdf처럼 파일 객체를 받는 라이브러리에 넘길, 읽기 위치를 따로 가진 파일 객체를 돌려줍니다.
+    (MappedUpload는 같은 파일을 새로 매핑하므로 세션·스레드끼리 위치가 섞이지 않고 복사하지도 않음)
+    """
+    if isinstance(data, MappedUpload):
+        return map_upload(data.path, data.digest)
+    return io.BytesIO(data)
+
+
+class StoredUpload:
+    """
+    저장소에 든 업로드 하나: 내용(bytes 또는 MappedUpload), 내용 해시, 쓰는 세션 수, 한 번만 여는 문서
+    """
+
+    def __init__(self, digest, data):
+        self.digest = digest
+        self.data = data
+        self.refs = 0
+        self._doc = None
+        self._lock = threading.Lock()
+
+    @property
+    def size(self):
+        return len(self.data)
+
+    @property
+    def spilled(self):
+        return isinstance(self.data, MappedUpload)
+
+    @contextmanager
+    def document(self):
+        """
+        같은 파일을 올린 세션들이 함께 쓰는 PyMuPDF 문서 (처음 쓸 때 한 번만 열고, 한 번에 한 스레드만 씀)
+        페이지 수·미리보기처럼 짧은 일에 쓰고, 오래 걸리는 작업은 내용(data)으로 따로 엽니다.
+        """
+        with self._lock:
+            if self._doc is None:
+                self._doc = open_pdf(self.data)
+            yield self._doc
+
+    def close(self):
+        with self._lock:
+            if self._doc is not None:
+                self._doc.close()
+                self._doc = None
+
+
+class UploadStore:
+    """
+    업로드를 내용 해시로 한 벌만 보관하는 참조 수 저장소입니다. (Streamlit 세션 스레드들이 함께 씀)
+    """
+
+    def __init__(self, spill_mb=UPLOAD_SPILL_MB, directory=UPLOAD_DIR):
+        self.spill_size = spill_mb * 1024 * 1024
+        self.directory = directory
+        self.hits = 0
+        self.misses = 0
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, data):
+        """
+        업로드 바이트를 저장소에 넣고(같은 내용이 이미 있으면 그것을) 참조 수를 올려 StoredUpload를 돌려줍니다.
+        다 쓰면 release로 돌려줘야 합니다.
+        """
+        digest = content_hash(data)
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is not None:
+                entry.refs += 1
+                self.hits += 1
+                return entry
+
+        stored = self._spill(digest, data) if len(data) > self.spill_size else data
+
+        with self._lock:
+            # 그사이 다른 세션이 같은 파일을 넣었으면 그쪽을 씀 (방금 만든 임시 파일은 매핑과 함께 정리됨)
+            entry = self._entries.get(digest)
+            if entry is None:
+                entry = self._entries[digest] = StoredUpload(digest, stored)
+                self.misses += 1
+            else:
+                self.hits += 1
+            entry.refs += 1
+            return entry
+
+    def release(self, entry):
+        """참조 수를 내리고, 0이 되면 열어 둔 문서를 닫고 보관을 끝냅니다."""
+        with self._lock:
+            entry.refs -= 1
+            if entry.refs > 0 or self._entries.get(entry.digest) is not entry:
+                return
+            del self._entries[entry.digest]
+        entry.close()
+
+    def _spill(self, digest, data):
+        fd, path = tempfile.mkstemp(prefix="upload_", suffix=".bin", dir=self.directory)
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        mapped = map_upload(path, digest)
+        weakref.finalize(mapped, _remove, path, os.getpid())
+        return mapped
+
+    def stats(self):
+        with self._lock:
+            entries = list(self._entries.values())
+        return {
+            "uploads": len(entries),
+            "refs": sum(entry.refs for entry in entries),
+            "memory_mb": round(sum(entry.size for entry in entries if not entry.spilled) / 1024 / 1024, 1),
+            "spilled_mb": round(sum(entry.size for entry in entries if entry.spilled) / 1024 / 1024, 1),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+# 프로세스 전체에서 함께 쓰는 업로드 저장소
+upload_store = UploadStore()
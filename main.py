@@ -1,87 +1,184 @@
 import streamlit as st
-import fitz  # PyMuPDF 라이브러리
-import io
-from PIL import Image # 이미지 처리를 위해 Pillow 라이브러리 필요
-import zipfile # ZIP 파일 생성을 위한 라이브러리
+
+from core.cache import render_cache
+from core.export import dpi_to_zoom, export_extension, export_mime
+from core.jobs import DONE, FAILED, job_scheduler
+from core.metrics import stage
+from core.render import DEFAULT_WORKERS, render_pages, write_zip_file
+from core.resources import warm_up
+from core.scan import extract_scan_image, iter_page_images, scan_mime, scan_pages
+from core.ui import download_file, export_settings, job_panel, metrics_panel, session_upload, submit_job
+from core.uploads import open_pdf
+
+FULL_DPI = 144 # 원본 이미지(다운로드용) 기본 해상도 (확대율 2.0)
+THUMB_ZOOM = 0.4 # 갤러리 썸네일 확대율 (약 29 DPI)
+GALLERY_COLUMNS = 4 # 갤러리 한 줄에 표시할 썸네일 수
+
+
+def page_image_name(base_name, page_num, ext="png"):
+    # 파일명 설정 (예: original_pdf_name_page_1.png)
+    return f"{base_name}_page_{page_num+1}.{ext}"
+
+
+def render_page_image(pdf_bytes, page_num, zoom, export, scan=None):
+    """
+    한 페이지만 렌더링하여 이미지 바이트로 돌려줍니다. (캐시에 있으면 바로 반환)
+    scan(ScanImage)을 주면 렌더링하지 않고 PDF에 든 스캔 이미지를 그대로 꺼냅니다.
+    """
+    if scan is not None:
+        with open_pdf(pdf_bytes) as doc:
+            return extract_scan_image(doc, scan)
+    _, data = next(render_pages(pdf_bytes, zoom=zoom, page_numbers=[page_num], workers=1, cache=render_cache,
+                                export=export))
+    return data
+
+
+def build_images_zip(job, pdf_bytes, base_name, page_count, zoom, export, passthrough):
+    """
+    (작업 대기열에서 실행) 모든 페이지를 한 장씩 렌더링 → 이미지 인코딩 → ZIP 기록 (전체 페이지를 메모리에 쌓지 않음)
+    작업자가 여러 명이면 페이지를 나눠 병렬로 렌더링하고 순서대로 받음, 페이지마다 진행률을 알림
+    passthrough이면 스캔 페이지는 렌더링 없이 PDF에 든 이미지를 그대로 기록 (확장자는 페이지마다 다를 수 있음)
+    ZIP은 임시 파일에 기록하고 그 경로를 돌려줌 (작업이 정리될 때 지움)
+    """
+    with stage("pdf2img.zip", workers=job.workers, zoom=zoom, format=export.format, passthrough=passthrough):
+        pages = iter_page_images(pdf_bytes, zoom=zoom, workers=job.workers, cache=render_cache, export=export,
+                                 passthrough=passthrough)
+        zip_path, _ = write_zip_file(
+            (page_image_name(base_name, page_num, ext), data) for page_num, ext, data in job.track(pages, page_count)
+        )
+        return job.own_file(zip_path)
+
 
 def main():
+    metrics_panel()
+    warm_up()
     st.title("PDF를 이미지로 변환 ✨")
     st.markdown("---")
     st.write("PDF 파일을 업로드하시면 각 페이지를 고품질 이미지로 변환하여 보여드려요.")
 
     uploaded_file = st.file_uploader("여기에 PDF 파일을 드래그하거나 클릭해서 업로드해주세요", type="pdf")
+    # 같은 파일을 올린 세션들과 내용·열어 둔 문서를 함께 씀 (바이트를 복사하지 않음)
+    upload = session_upload("pdf2img", uploaded_file)
+
+    workers = st.sidebar.number_input(
+        "렌더링 작업자(프로세스) 수", min_value=1, max_value=max(DEFAULT_WORKERS, 1) * 2,
+        value=DEFAULT_WORKERS, step=1
+    )
+    per_window = st.sidebar.selectbox("갤러리 한 화면에 표시할 페이지 수", (8, 12, 24, 48), index=1)
+    export, dpi = export_settings(default_dpi=FULL_DPI)
+    passthrough = st.sidebar.checkbox(
+        "스캔 페이지는 원본 이미지 그대로 저장", value=True,
+        help="페이지 전체가 스캔 이미지 한 장(JPEG·흑백 팩스 등)이면 다시 렌더링·인코딩하지 않고 PDF에 든 이미지를 "
+             "원본 해상도 그대로 꺼냅니다. 훨씬 빠르고 파일도 작지만, 이 페이지에는 출력 형식·해상도 설정이 적용되지 않습니다."
+    )
+    full_zoom = dpi_to_zoom(dpi)
+    ext, mime = export_extension(export), export_mime(export)
+    cache_stats_panel = st.sidebar.expander("렌더링 캐시 상태")
 
     if uploaded_file is not None:
         st.success("PDF 파일이 성공적으로 업로드되었습니다!")
-        st.spinner("PDF를 이미지로 변환 중...")
 
         try:
-            doc = fitz.open(stream=uploaded_file.read(), filetype="pdf")
-            images = []
-            image_names = [] # 이미지 파일명을 저장할 리스트
-
-            for page_num in range(len(doc)):
-                page = doc.load_page(page_num)
-                zoom = 2.0
-                mat = fitz.Matrix(zoom, zoom)
-                pix = page.get_pixmap(matrix=mat)
+            with st.spinner("PDF를 불러오는 중..."):
+                pdf_bytes = upload.data
+                base_name = uploaded_file.name.replace('.pdf', '')
 
-                if pix.n - pix.alpha > 3:
-                    img = Image.frombytes("CMYK", [pix.width, pix.height], pix.samples)
-                else:
-                    img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
+                # 페이지 수만 확인 (렌더링은 화면에 보이는 페이지만 필요할 때 수행)
+                with stage("pdf.open", size=upload.size), upload.document() as doc:
+                    page_count = len(doc)
 
-                images.append(img)
-                # 파일명 설정 (예: original_pdf_name_page_1.png)
-                image_names.append(f"{uploaded_file.name.replace('.pdf', '')}_page_{page_num+1}.png")
-
-            doc.close()
-
-            st.success(f"총 **{len(images)} 페이지**를 이미지로 변환 완료했습니다!")
+            st.success(f"총 **{page_count} 페이지**의 PDF입니다. 필요한 페이지만 바로 변환해 드려요!")
             st.markdown("---")
 
-            # --- 전체 페이지 ZIP 다운로드 버튼 추가 ---
-            if images: # 이미지가 하나라도 있을 때만 버튼 표시
-                zip_buffer = io.BytesIO()
-                with zipfile.ZipFile(zip_buffer, "a", zipfile.ZIP_DEFLATED, False) as zip_file:
-                    for i, image in enumerate(images):
-                        img_byte_arr = io.BytesIO()
-                        image.save(img_byte_arr, format="PNG")
-                        # ZIP 파일에 이미지 추가 (파일명 지정)
-                        zip_file.writestr(image_names[i], img_byte_arr.getvalue())
-
-                # ZIP 파일 다운로드 버튼
-                st.download_button(
-                    label="⬇️ 모든 이미지 ZIP 파일로 다운로드",
-                    data=zip_buffer.getvalue(),
-                    file_name=f"{uploaded_file.name.replace('.pdf', '')}_images.zip",
-                    mime="application/zip"
-                )
+            # --- 전체 페이지 ZIP 다운로드 ---
+            if page_count > 0: # 페이지가 하나라도 있을 때만 버튼 표시
+                # 전체 변환은 작업 대기열에서 돌리므로 진행 중에 다른 위젯을 건드려도 처음부터 다시 하지 않음
+                # (같은 파일·설정이면 이미 만든 ZIP을 그대로 받음)
+                job_key = ("pdf2img.zip", upload.digest, base_name, full_zoom, export, passthrough)
+                if st.button("📦 모든 페이지를 이미지로 변환 (ZIP)"):
+                    submit_job(job_key, "전체 페이지 변환", build_images_zip,
+                               pdf_bytes, base_name, page_count, full_zoom, export, passthrough, workers=workers)
+                job = job_scheduler.get(job_key)
+                status = job_panel(job, "pdf2img_zip") if job is not None else None
+                if status == DONE:
+                    download_file(
+                        label="⬇️ 모든 이미지 ZIP 파일로 다운로드",
+                        path=job.result,
+                        file_name=f"{base_name}_images.zip",
+                        mime="application/zip"
+                    )
+                elif status == FAILED:
+                    st.error(f"PDF를 이미지로 변환하는 중 오류가 발생했습니다. 잠시 후 다시 시도해주세요: {job.error}")
                 st.markdown("---")
-            # --- ZIP 다운로드 버튼 추가 끝 ---
+            # --- ZIP 다운로드 끝 ---
 
 
-            # 각 이미지를 Streamlit에 표시하고 개별 다운로드 버튼 제공
+            # 현재 화면에 해당하는 페이지만 저해상도 썸네일로 표시
             st.subheader("개별 페이지 이미지 보기 및 다운로드")
-            for i, image in enumerate(images):
-                st.write(f"**페이지 {i+1}**")
-                st.image(image, caption=f"변환된 페이지 {i+1}", use_column_width=True)
-
-                buf = io.BytesIO()
-                image.save(buf, format="PNG")
-                byte_im = buf.getvalue()
-
+            window_count = max(1, -(-page_count // per_window))
+            window = st.number_input(
+                f"갤러리 페이지 (전체 {window_count}쪽)", min_value=1, max_value=window_count, value=1, step=1
+            )
+            first = (window - 1) * per_window
+            visible_pages = range(first, min(first + per_window, page_count))
+
+            # 스캔 페이지인지는 화면에 보이는 페이지와 크게 볼 페이지만 검사 (ZIP 작업은 작업 안에서 검사)
+            open_page = st.session_state.get("open_page")
+            if open_page is not None and open_page >= page_count:
+                open_page = None
+            scans = {}
+            if passthrough:
+                checked_pages = list(visible_pages) if open_page is None else [open_page, *visible_pages]
+                with upload.document() as doc:
+                    scans = scan_pages(upload.digest, doc, checked_pages)
+
+            # 크게 볼 페이지를 고르면 그 페이지만 원본 해상도로 렌더링
+            if open_page is not None:
+                scan = scans.get(open_page)
+                byte_im = render_page_image(pdf_bytes, open_page, full_zoom, export, scan)
+                st.write(f"**페이지 {open_page+1}**")
+                st.image(byte_im, caption=f"변환된 페이지 {open_page+1}", use_column_width=True)
                 st.download_button(
-                    label=f"⬇️ 페이지 {i+1} 이미지 다운로드 (PNG)",
+                    label=f"⬇️ 페이지 {open_page+1} 이미지 다운로드 "
+                          + (f"(원본 스캔 {scan.ext.upper()})" if scan else f"({export.format}, {dpi} DPI)"),
                     data=byte_im,
-                    file_name=image_names[i], # 위에 설정한 파일명 사용
-                    mime="image/png"
+                    file_name=page_image_name(base_name, open_page, scan.ext if scan else ext),
+                    mime=scan_mime(scan) if scan else mime,
+                    key="open_page_download"
                 )
+                if st.button("닫기"):
+                    st.session_state.open_page = None
+                    st.rerun()
                 st.markdown("---")
 
+            with st.spinner("PDF를 이미지로 변환 중..."), stage("pdf2img.thumbnails", pages=len(visible_pages)):
+                thumbs = list(render_pages(pdf_bytes, zoom=THUMB_ZOOM, page_numbers=visible_pages, workers=1,
+                                           cache=render_cache))
+            columns = st.columns(GALLERY_COLUMNS)
+            for i, (page_num, thumb) in enumerate(thumbs):
+                with columns[i % GALLERY_COLUMNS]:
+                    st.image(thumb, caption=f"페이지 {page_num+1}", use_column_width=True)
+                    if st.button("🔍 크게 보기", key=f"open_{page_num}"):
+                        st.session_state.open_page = page_num
+                        st.rerun()
+                    # 원본 이미지는 다운로드를 누를 때 렌더링 (스캔 페이지는 원본 이미지를 꺼냄)
+                    scan = scans.get(page_num)
+                    st.download_button(
+                        label=f"⬇️ 원본 {scan.ext.upper()}" if scan else f"⬇️ {export.format}",
+                        data=lambda page_num=page_num, scan=scan: render_page_image(
+                            pdf_bytes, page_num, full_zoom, export, scan
+                        ),
+                        file_name=page_image_name(base_name, page_num, scan.ext if scan else ext),
+                        mime=scan_mime(scan) if scan else mime,
+                        key=f"download_{page_num}"
+                    )
+
         except Exception as e:
             st.error(f"PDF를 이미지로 변환하는 중 오류가 발생했습니다. 잠시 후 다시 시도해주세요: {e}")
             st.warning("혹시 PDF 파일이 손상되었거나 암호화되어 있을 수 있습니다.")
 
+    # 렌더링이 끝난 뒤의 캐시 적중/누락/퇴출 횟수 표시
+    cache_stats_panel.json(render_cache.stats())
+
 if __name__ == "__main__":
     main()
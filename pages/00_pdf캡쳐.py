@@ -1,81 +1,348 @@
 import streamlit as st
-import fitz  # PyMuPDF 라이브러리
 import io
-from PIL import Image, ImageDraw, ImageFont # Pillow 라이브러리 (ImageDraw, ImageFont 추가)
+import time
 import zipfile
 
-# Pillow에서 사용할 기본 폰트 설정
-# 시스템 폰트 경로를 지정하지 않아도 되므로 SyntaxError 발생 가능성이 줄어듭니다.
-# 단, 숫자의 가독성이 다소 떨어질 수 있습니다.
-font = ImageFont.load_default()
+from core.cache import content_hash, render_cache, render_key
+from core.crop import Region, iter_batch_crops, iter_page_crops, parse_page_spec, regions_for_page
+from core.detect import detect_document_regions
+from core.export import dpi_to_zoom, export_extension
+from core.jobs import DONE, FAILED, job_scheduler
+from core.metrics import stage
+from core.render import DEFAULT_WORKERS, render_pages, write_zip_file
+from core.resources import grid_overlay, label_font, warm_up, worker_pool
+from core.scan import scan_pages
+from core.ui import (download_file, export_settings, job_panel, metrics_panel, session_upload, session_uploads,
+                     submit_job)
+from core.uploads import open_pdf
+
+CROP_DPI = 288 # 잘라낸 영역 이미지의 기본 해상도 (확대율 4.0)
+
+# fitz(PyMuPDF)·Pillow는 미리보기를 그리는 함수 안에서 불러옴 (PDF를 올리기 전 첫 화면에는 필요 없음)
+
+def draw_grid_preview(upload, preview_zoom):
+    """
+    업로드(StoredUpload)의 첫 페이지를 렌더링하고 PDF 원본 좌표 그리드를 그려 PNG 바이트로 돌려줍니다.
+    (그리드는 크기·확대율별로 한 번만 그려 둔 것을 붙임)
+    """
+    import fitz  # PyMuPDF 라이브러리
+    from PIL import Image  # Pillow 라이브러리
+
+    with upload.document() as doc_preview:
+        first_page = doc_preview.load_page(0)
+        preview_matrix = fitz.Matrix(preview_zoom, preview_zoom)
+        pix_preview = first_page.get_pixmap(matrix=preview_matrix)
+    img_preview = Image.frombytes("RGB", [pix_preview.width, pix_preview.height], pix_preview.samples)
+
+    # --- 이미지에 좌표 그리드 그리기 ---
+    overlay = grid_overlay(img_preview.width, img_preview.height, preview_zoom)
+    img_preview.paste(overlay, (0, 0), overlay)
+
+    buf = io.BytesIO()
+    img_preview.save(buf, format="PNG")
+    return buf.getvalue()
+
+def draw_detected_preview(upload, page_num, page_regions, preview_zoom):
+    """
+    업로드(StoredUpload)의 페이지를 렌더링하고 자동 감지된 영역을 빨간 상자와 이름으로 표시해 PNG 바이트로 돌려줍니다.
+    """
+    import fitz  # PyMuPDF 라이브러리
+    from PIL import Image, ImageDraw  # Pillow 라이브러리
+
+    with upload.document() as doc_preview:
+        pix_preview = doc_preview.load_page(page_num).get_pixmap(matrix=fitz.Matrix(preview_zoom, preview_zoom))
+    img_preview = Image.frombytes("RGB", [pix_preview.width, pix_preview.height], pix_preview.samples)
+
+    draw = ImageDraw.Draw(img_preview)
+    for name, (x0, y0, x1, y1) in page_regions:
+        box = [x0 * preview_zoom, y0 * preview_zoom, x1 * preview_zoom, y1 * preview_zoom]
+        draw.rectangle(box, outline=(255, 0, 0), width=2)
+        draw.text((box[0] + 3, box[1] + 3), name, fill=(255, 0, 0), font=label_font())
+
+    buf = io.BytesIO()
+    img_preview.save(buf, format="PNG")
+    return buf.getvalue()
+
+def zip_result(job, entries):
+    # 작업 결과: (ZIP 임시 파일 경로, ZIP 안의 이미지 이름 목록), 파일은 작업이 정리될 때 지움
+    zip_path, image_names = write_zip_file(entries, prefix="crop_")
+    return job.own_file(zip_path), image_names
+
+def has_scan_pages(pdf_bytes, page_count):
+    # (작업 안에서) 스캔 페이지가 하나라도 있는지 페이지마다 검사 (결과는 페이지별로 캐시)
+    with open_pdf(pdf_bytes) as doc:
+        return bool(scan_pages(content_hash(pdf_bytes), doc, range(page_count)))
+
+def region_crop_job(job, pdf_bytes, base_name, page_count, clip, zoom, export, passthrough):
+    """
+    (작업 대기열에서 실행) 모든 페이지에서 같은 영역을 잘라 ZIP으로 묶습니다. 페이지마다 진행률을 알립니다.
+    """
+    def scan_crops():
+        # 스캔 페이지는 원본 픽셀을 그대로 잘라내고, 나머지 페이지는 지정한 해상도로 렌더링
+        page_regions = {page_num: [("Q", clip)] for page_num in range(page_count)}
+        with open_pdf(pdf_bytes) as doc:
+            for page_num, _, data in iter_page_crops(doc, page_regions, zoom, export, passthrough=True):
+                yield page_num, data
+
+    with stage("crop.region", pages=page_count, workers=job.workers):
+        if passthrough and has_scan_pages(pdf_bytes, page_count):
+            pages = scan_crops()
+        else:
+            # 지정된 영역만 고해상도로 렌더링 (작업자 수만큼 병렬 처리)
+            pages = render_pages(pdf_bytes, zoom=zoom, clip=clip, workers=job.workers, cache=render_cache,
+                                 export=export)
+        ext = export_extension(export)
+        return zip_result(job, (
+            (f"{base_name}_Q_page_{page_num+1}.{ext}", data) for page_num, data in job.track(pages, page_count)
+        ))
+
+def batch_crop_job(job, files, regions, zoom, export, passthrough):
+    """
+    (작업 대기열에서 실행) 여러 PDF에 여러 영역을 적용해 ZIP으로 묶습니다. 이미지 한 장마다 진행률을 알립니다.
+    """
+    with stage("crop.batch", files=len(files), regions=len(regions), workers=job.workers):
+        total = 0
+        for _, pdf_bytes in files:
+            with open_pdf(pdf_bytes) as doc:
+                total += sum(len(regions_for_page(regions, page_num)) for page_num in range(len(doc)))
+        crops = iter_batch_crops(files, regions, zoom=zoom, workers=job.workers, export=export,
+                                 passthrough=passthrough, pool=worker_pool())
+        return zip_result(job, job.track(crops, total))
+
+def auto_crop_job(job, pdf_bytes, base_name, page_regions, zoom, export, passthrough):
+    """
+    (작업 대기열에서 실행) 자동 감지된 영역을 잘라 ZIP으로 묶습니다. 이미지 한 장마다 진행률을 알립니다.
+    """
+    total = sum(len(regions) for regions in page_regions.values())
+    ext = export_extension(export)
+    with stage("crop.auto", regions=total), open_pdf(pdf_bytes) as doc:
+        crops = iter_page_crops(doc, page_regions, zoom, export, passthrough)
+        return zip_result(job, (
+            (f"{base_name}_{name}_page_{page_num+1}.{ext}", data)
+            for page_num, name, data in job.track(crops, total)
+        ))
+
+def batch_main(workers, export, dpi, passthrough):
+    st.title("📦 PDF 질문 영역 일괄 추출기")
+    st.markdown("---")
+    st.write("여러 PDF 파일에 이름을 붙인 여러 영역을 한 번에 적용하여, 결과를 하나의 ZIP(파일/영역별 폴더)으로 내려받습니다.")
+    st.info("영역의 **페이지** 칸을 비우면 모든 페이지에 적용됩니다. `1-3, 5`처럼 지정하면 그 페이지에서는 같은 이름의 공통 영역 대신 이 좌표를 사용합니다.")
+
+    uploaded_files = st.file_uploader(
+        "여기에 PDF 파일들을 드래그하거나 클릭해서 업로드해주세요", type="pdf",
+        accept_multiple_files=True, key="pdf_batch_uploader"
+    )
+    uploads = session_uploads("crop.batch", uploaded_files or [])
+    if not uploaded_files:
+        st.info("PDF 파일을 하나 이상 업로드해주세요. 첫 번째 파일의 미리보기로 좌표를 확인할 수 있습니다.")
+        return
+
+    files = [(f.name, upload.data) for f, upload in zip(uploaded_files, uploads)]
+
+    # 첫 번째 파일의 첫 페이지를 좌표축과 함께 미리보기
+    preview_zoom = 1.5
+    with st.expander(f"좌표 확인용 미리보기: {files[0][0]}", expanded=False):
+        preview_key = render_key(uploads[0].digest, 0, preview_zoom, fmt="grid-png")
+        preview_png = render_cache.get_or_create(
+            preview_key, lambda: draw_grid_preview(uploads[0], preview_zoom)
+        )
+        st.image(preview_png, caption="PDF 첫 페이지 미리보기 (좌표축 표시)", use_column_width=True)
+
+    st.subheader("💡 잘라낼 영역 목록")
+    region_rows = st.data_editor(
+        [{"이름": "Q1", "X0": 50, "Y0": 50, "X1": 750, "Y1": 200, "페이지": ""}],
+        num_rows="dynamic", key="region_table"
+    )
+
+    # 추출은 작업 대기열에서 돌리고, 이 세션에서 마지막으로 시작한 작업(같은 파일들일 때)의 진행률·결과를 보여줌
+    # (영역 표를 고치거나 다른 위젯을 건드려 다시 실행되어도 작업은 계속됨)
+    digests = tuple(upload.digest for upload in uploads)
+    job_key = st.session_state.get("crop_batch_job")
+    if job_key is not None and job_key[1] != digests:
+        job_key = None
+
+    if st.button("🚀 모든 파일에서 영역 추출 및 ZIP으로 다운로드 시작"):
+        regions = []
+        for row in region_rows:
+            name = str(row.get("이름") or "").strip()
+            if not name:
+                continue
+            x0, y0, x1, y1 = (row.get(k) or 0 for k in ("X0", "Y0", "X1", "Y1"))
+            if x1 <= x0 or y1 <= y0:
+                st.error(f"❌ 오류: 영역 '{name}'의 X1은 X0보다, Y1은 Y0보다 커야 합니다.")
+                return
+            try:
+                pages = parse_page_spec(row.get("페이지"))
+            except ValueError as e:
+                st.error(f"❌ 오류: 영역 '{name}'의 페이지 지정이 올바르지 않습니다. ({e})")
+                return
+            regions.append(Region(name, (x0, y0, x1, y1), pages))
+
+        if not regions:
+            st.error("❌ 오류: 이름이 있는 영역을 최소 하나 이상 입력해주세요.")
+            return
+
+        job_key = ("crop.batch", digests, tuple(name for name, _ in files), tuple(regions), dpi_to_zoom(dpi), export,
+                   passthrough)
+        if submit_job(job_key, "영역 일괄 추출", batch_crop_job, files, regions, dpi_to_zoom(dpi), export, passthrough,
+                      workers=workers):
+            st.session_state.crop_batch_job = job_key
+
+    job = job_scheduler.get(job_key) if job_key is not None else None
+    status = job_panel(job, "crop_batch") if job is not None else None
+    if status == DONE:
+        zip_path, image_names = job.result
+        st.success(f"✔️ PDF {len(files)}개, 영역 {len(job_key[3])}개에서 총 **{len(image_names)}장**을 추출했습니다!")
+        download_file(
+            label="⬇️ 추출된 영역 이미지 ZIP 파일로 다운로드",
+            path=zip_path,
+            file_name="batch_questions.zip",
+            mime="application/zip"
+        )
+    elif status == FAILED:
+        st.error(f"⚠️ 오류가 발생했습니다: {job.error}")
+        st.warning("입력한 좌표가 페이지 크기를 벗어나거나 PDF 파일에 문제가 있을 수 있습니다.")
+
+
+def auto_main(export, dpi, passthrough):
+    st.title("🔎 PDF 질문 영역 자동 감지 추출기")
+    st.markdown("---")
+    st.write("PDF의 텍스트·도형 정보(문항 번호, 테두리 상자, 여백)로 페이지마다 질문 영역을 자동으로 찾아 잘라냅니다.")
+    st.info("문항 번호(`1.`, `[2]`, `문 3.`, `4번`)가 있으면 번호 단위로, 없으면 여백을 기준으로 영역을 나눕니다. 스캔 이미지로만 된 PDF는 감지할 수 없습니다.")
+
+    uploaded_file = st.file_uploader("여기에 PDF 파일을 드래그하거나 클릭해서 업로드해주세요", type="pdf", key="pdf_auto_uploader")
+    upload = session_upload("crop.auto", uploaded_file)
+    if uploaded_file is None:
+        st.info("PDF 파일을 업로드하시면 자동으로 질문 영역을 찾아 미리보기로 보여드립니다.")
+        return
+
+    try:
+        pdf_bytes, digest = upload.data, upload.digest
+
+        # 같은 파일이면 감지 결과를 다시 계산하지 않음
+        detected = st.session_state.get("auto_detected")
+        if detected is None or detected[0] != digest:
+            start = time.perf_counter()
+            with upload.document() as doc:
+                page_regions = detect_document_regions(doc)
+            detected = (digest, page_regions, time.perf_counter() - start)
+            st.session_state.auto_detected = detected
+        _, page_regions, elapsed = detected
+
+        page_count = len(page_regions)
+        region_count = sum(len(regions) for regions in page_regions.values())
+        st.success(f"✔️ {page_count} 페이지에서 **{region_count}개** 영역을 찾았습니다. (감지 {elapsed:.2f}초)")
+        if region_count == 0:
+            st.warning("감지된 영역이 없습니다. 텍스트가 없는 스캔 PDF라면 좌표 입력 방식을 사용해주세요.")
+            return
+
+        st.subheader("감지 결과 미리보기")
+        preview_page = st.number_input("미리볼 페이지", min_value=1, max_value=page_count, value=1, step=1) - 1
+        preview_zoom = 1.0
+        preview_png = render_cache.get_or_create(
+            render_key(digest, preview_page, preview_zoom, fmt="detect-png"),
+            lambda: draw_detected_preview(upload, preview_page, page_regions[preview_page], preview_zoom)
+        )
+        st.image(preview_png, caption=f"페이지 {preview_page+1} 감지 영역", use_column_width=True)
+        st.caption(", ".join(name for name, _ in page_regions[preview_page]) or "이 페이지에는 감지된 영역이 없습니다.")
+
+        st.markdown("---")
+
+        # 추출은 작업 대기열에서 돌리므로 진행 중에 미리보기 페이지를 바꿔도 처음부터 다시 하지 않음
+        base_name = uploaded_file.name.replace('.pdf', '')
+        job_key = ("crop.auto", digest, base_name, dpi_to_zoom(dpi), export, passthrough)
+        if st.button("🚀 감지된 영역 추출 및 ZIP으로 다운로드 시작"):
+            submit_job(job_key, "감지 영역 추출", auto_crop_job,
+                       pdf_bytes, base_name, page_regions, dpi_to_zoom(dpi), export, passthrough)
+
+        job = job_scheduler.get(job_key)
+        status = job_panel(job, "crop_auto") if job is not None else None
+        if status == DONE:
+            zip_path, image_names = job.result
+            st.success(f"✔️ 총 **{len(image_names)}장**의 질문 영역 이미지를 만들었습니다!")
+            download_file(
+                label="⬇️ 추출된 질문 영역 이미지 ZIP 파일로 다운로드",
+                path=zip_path,
+                file_name=f"{base_name}_questions.zip",
+                mime="application/zip"
+            )
+        elif status == FAILED:
+            st.error(f"⚠️ 오류가 발생했습니다: {job.error}")
+            st.warning("혹시 PDF 파일이 손상되었거나 암호화되어 있을 수 있습니다.")
+
+    except Exception as e:
+        st.error(f"⚠️ 오류가 발생했습니다: {e}")
+        st.warning("혹시 PDF 파일이 손상되었거나 암호화되어 있을 수 있습니다.")
 
-# 세션 상태 초기화 (업로드 플래그)
-if 'pdf_uploaded_flag' not in st.session_state:
-    st.session_state.pdf_uploaded_flag = False
 
 def main():
+    metrics_panel()
+    warm_up()
+    workers = st.sidebar.number_input(
+        "렌더링 작업자(프로세스) 수", min_value=1, max_value=max(DEFAULT_WORKERS, 1) * 2,
+        value=DEFAULT_WORKERS, step=1
+    )
+    mode = st.sidebar.radio(
+        "작업 방식:", ("PDF 1개 · 영역 1개", "일괄 처리 (여러 PDF · 여러 영역)", "자동 감지 (문항 번호·테두리)")
+    )
+    export, dpi = export_settings(default_dpi=CROP_DPI)
+    passthrough = st.sidebar.checkbox(
+        "스캔 페이지는 원본 픽셀 그대로 자르기", value=True,
+        help="페이지 전체가 스캔 이미지 한 장이면 출력 해상도 대신 스캔 원본 해상도로, 보간 없이 원본 픽셀을 그대로 잘라냅니다."
+    )
+    cache_stats_panel = st.sidebar.expander("렌더링 캐시 상태")
+
+    if mode != "PDF 1개 · 영역 1개":
+        if mode == "자동 감지 (문항 번호·테두리)":
+            auto_main(export, dpi, passthrough)
+        else:
+            batch_main(workers, export, dpi, passthrough)
+        cache_stats_panel.json(render_cache.stats())
+        return
+
     st.title("📄 PDF 질문 영역 추출기 (좌표축 표시 버전)")
     st.markdown("---")
     st.write("PDF 파일을 업로드하고, 미리보기 이미지의 좌표축을 참고하여 질문 영역의 좌표를 입력해주세요.")
     st.warning("⚠️ **중요:** 모든 페이지의 질문 영역이 동일한 위치에 있어야 합니다.")
 
     uploaded_file = st.file_uploader("여기에 PDF 파일을 드래그하거나 클릭해서 업로드해주세요", type="pdf", key="pdf_uploader")
+    upload = session_upload("crop.region", uploaded_file)
 
-    # 파일이 새로 업로드되거나 변경되면 상태 초기화
-    if uploaded_file is not None and st.session_state.pdf_uploaded_flag == False:
-        st.session_state.pdf_uploaded_flag = True
-        st.session_state.x0 = 0 # 좌표 입력값 초기화
-        st.session_state.y0 = 0
-        st.session_state.x1 = 0
-        st.session_state.y1 = 0
-        st.rerun() # 재실행하여 UI 초기화
-    elif uploaded_file is None:
-        st.session_state.pdf_uploaded_flag = False
+    # 다른 파일이 올라오면 좌표 입력을 처음 값으로 되돌림
+    # (좌표 입력 위젯을 그리기 전에 지우므로 다시 실행할 필요 없음)
+    if upload is not None and st.session_state.get("crop_region_file") != upload.digest:
+        st.session_state.crop_region_file = upload.digest
+        for key in ("x0", "y0", "x1", "y1", "x0_input", "y0_input", "x1_input", "y1_input"):
+            st.session_state.pop(key, None)
 
     if uploaded_file is not None:
         st.success("PDF 파일이 성공적으로 업로드되었습니다!")
-        st.spinner("PDF 로딩 중...")
 
         try:
-            doc_preview = fitz.open(stream=uploaded_file.read(), filetype="pdf")
-            if len(doc_preview) > 0:
-                first_page = doc_preview.load_page(0)
-                
+            with st.spinner("PDF 로딩 중..."):
+                pdf_bytes = upload.data # 미리보기와 추출에서 함께 사용
+                with stage("pdf.open", size=upload.size), upload.document() as doc_preview:
+                    page_count = len(doc_preview)
+
+            if page_count > 0:
                 # 미리보기를 위한 해상도 설정 (그리드를 그릴 이미지)
                 preview_zoom = 1.5 # 1.0은 72 DPI, 1.5는 108 DPI 정도
-                preview_matrix = fitz.Matrix(preview_zoom, preview_zoom)
-                pix_preview = first_page.get_pixmap(matrix=preview_matrix)
-                img_preview = Image.frombytes("RGB", [pix_preview.width, pix_preview.height], pix_preview.samples)
-                
-                doc_preview.close() # 미리보기용 문서 닫기
-
-                # --- 이미지에 좌표 그리드 그리기 ---
-                draw = ImageDraw.Draw(img_preview)
-                grid_spacing = 50 # 그리드 간격 (픽셀)
-                text_color = (0, 0, 255) # 파란색 텍스트
-                line_color = (150, 150, 150, 128) # 회색 선, 반투명
-                line_color_bold = (0, 0, 0, 200) # 진한 검정색 선
-
-                # 가로선 그리기
-                for y in range(0, img_preview.height, grid_spacing):
-                    line_thick = 1 if (y / grid_spacing) % 2 != 0 else 2 # 짝수 간격마다 더 굵게
-                    draw.line([(0, y), (img_preview.width, y)], fill=line_color if line_thick==1 else line_color_bold, width=line_thick)
-                    draw.text((5, y + 2), str(int(y / preview_zoom)), fill=text_color, font=font) # 실제 PDF 좌표 표시
-
-                # 세로선 그리기
-                for x in range(0, img_preview.width, grid_spacing):
-                    line_thick = 1 if (x / grid_spacing) % 2 != 0 else 2 # 짝수 간격마다 더 굵게
-                    draw.line([(x, 0), (x, img_preview.height)], fill=line_color if line_thick==1 else line_color_bold, width=line_thick)
-                    # 텍스트가 겹치지 않게 약간 아래로
-                    if x > 0: # 0은 표시 안함
-                        draw.text((x + 2, 5), str(int(x / preview_zoom)), fill=text_color, font=font) # 실제 PDF 좌표 표시
+
+                # 같은 파일이면 좌표 입력이 바뀌어도 그리드 미리보기를 다시 그리지 않음
+                preview_key = render_key(upload.digest, 0, preview_zoom, fmt="grid-png")
+                preview_png = render_cache.get_or_create(
+                    preview_key, lambda: draw_grid_preview(upload, preview_zoom)
+                )
+                from PIL import Image  # Pillow 라이브러리
+
+                img_preview = Image.open(io.BytesIO(preview_png))
 
                 st.subheader("💡 크롭할 영역의 좌표를 입력해주세요.")
                 st.info("아래 첫 페이지 미리보기의 좌표축을 참고하여 질문이 있는 직사각형 영역의 **좌상단 (X, Y)** 과 **우하단 (X, Y)** 좌표를 입력해주세요.")
                 st.caption(f"미리보기 이미지 크기: 가로 {img_preview.width}px, 세로 {img_preview.height}px (확대율 {preview_zoom:.1f}x)")
                 st.caption("표시된 숫자는 PDF 원본(72 DPI 기준)의 좌표입니다.")
 
-                st.image(img_preview, caption="PDF 첫 페이지 미리보기 (좌표축 표시)", use_column_width=True)
+                st.image(preview_png, caption="PDF 첫 페이지 미리보기 (좌표축 표시)", use_column_width=True)
 
                 st.markdown("---")
 
@@ -99,74 +366,59 @@ def main():
 
                 st.markdown("---")
 
+                # 추출은 작업 대기열에서 돌리므로 진행 중에 다른 위젯을 건드려도 처음부터 다시 하지 않음
+                # 그리드에서 사용자가 본 원본 PDF 좌표(72 DPI 기준) 그대로 사용
+                base_name = uploaded_file.name.replace('.pdf', '')
+                render_zoom = dpi_to_zoom(dpi)
+                clip = (x0, y0, x1, y1)
+                job_key = ("crop.region", upload.digest, base_name, clip, render_zoom, export, passthrough)
+
                 if st.button("🚀 질문 영역 추출 및 ZIP으로 다운로드 시작"):
                     if x1 <= x0 or y1 <= y0:
                         st.error("❌ 오류: X1은 X0보다 커야 하고, Y1은 Y0보다 커야 합니다. 유효한 좌표를 입력해주세요.")
                         return
+                    submit_job(job_key, "질문 영역 추출", region_crop_job,
+                               pdf_bytes, base_name, page_count, clip, render_zoom, export, passthrough, workers=workers)
 
-                    st.spinner("질문 영역을 추출 중입니다. 잠시만 기다려 주세요...")
-
-                    try:
-                        doc = fitz.open(stream=uploaded_file.read(), filetype="pdf")
-                        cropped_images = []
-                        image_names = []
-                        
-                        render_zoom = 4.0 
-                        render_matrix = fitz.Matrix(render_zoom, render_zoom)
-
-                        # 그리드에서 사용자가 본 원본 PDF 좌표(72 DPI 기준) 그대로 사용
-                        clip_rect = fitz.Rect(x0, y0, x1, y1)
+                job = job_scheduler.get(job_key)
+                status = job_panel(job, "crop_region") if job is not None else None
+                if status == DONE:
+                    zip_path, image_names = job.result
+                    st.success(f"✔️ 총 **{len(image_names)} 페이지**에서 질문 영역을 추출 완료했습니다!")
+                    st.markdown("---")
 
-                        for page_num in range(len(doc)):
-                            page = doc.load_page(page_num)
-                            # 지정된 영역만 고해상도로 렌더링
-                            cropped_pix = page.get_pixmap(matrix=render_matrix, clip=clip_rect)
-
-                            if cropped_pix.n - cropped_pix.alpha > 3:
-                                img = Image.frombytes("CMYK", [cropped_pix.width, cropped_pix.height], cropped_pix.samples)
-                            else:
-                                img = Image.frombytes("RGB", [cropped_pix.width, cropped_pix.height], cropped_pix.samples)
-
-                            cropped_images.append(img)
-                            image_names.append(f"{uploaded_file.name.replace('.pdf', '')}_Q_page_{page_num+1}.png")
-
-                        doc.close()
-
-                        st.success(f"✔️ 총 **{len(cropped_images)} 페이지**에서 질문 영역을 추출 완료했습니다!")
+                    if image_names:
+                        download_file(
+                            label="⬇️ 추출된 질문 영역 이미지 ZIP 파일로 다운로드",
+                            path=zip_path,
+                            file_name=f"{base_name}_questions.zip",
+                            mime="application/zip"
+                        )
                         st.markdown("---")
 
-                        if cropped_images:
-                            zip_buffer = io.BytesIO()
-                            with zipfile.ZipFile(zip_buffer, "a", zipfile.ZIP_DEFLATED, False) as zip_file:
-                                for i, image in enumerate(cropped_images):
-                                    img_byte_arr = io.BytesIO()
-                                    image.save(img_byte_arr, format="PNG")
-                                    zip_file.writestr(image_names[i], img_byte_arr.getvalue())
-
-                            st.download_button(
-                                label="⬇️ 추출된 질문 영역 이미지 ZIP 파일로 다운로드",
-                                data=zip_buffer.getvalue(),
-                                file_name=f"{uploaded_file.name.replace('.pdf', '')}_questions.zip",
-                                mime="application/zip"
-                            )
-                            st.markdown("---")
-
-                            st.subheader("미리보기 (처음 5장)")
-                            for i, image in enumerate(cropped_images[:min(5, len(cropped_images))]):
-                                st.image(image, caption=f"페이지 {i+1} 질문 영역", use_column_width=True)
-                                if i < len(cropped_images) -1:
+                        st.subheader("미리보기 (처음 5장)")
+                        with zipfile.ZipFile(zip_path) as zip_file:
+                            for i, image_name in enumerate(image_names[:min(5, len(image_names))]):
+                                st.image(zip_file.read(image_name), caption=f"페이지 {i+1} 질문 영역", use_column_width=True)
+                                if i < len(image_names) -1:
                                     st.markdown("---")
-                            if len(cropped_images) > 5:
-                                st.write(f"... 외 {len(cropped_images) - 5} 페이지")
-
-                    except Exception as e:
-                        st.error(f"⚠️ 오류가 발생했습니다: {e}")
-                        st.warning("입력한 좌표가 이미지 크기를 벗어나거나 PDF 파일에 문제가 있을 수 있습니다.")
+                        if len(image_names) > 5:
+                            st.write(f"... 외 {len(image_names) - 5} 페이지")
+                elif status == FAILED:
+                    st.error(f"⚠️ 오류가 발생했습니다: {job.error}")
+                    st.warning("입력한 좌표가 이미지 크기를 벗어나거나 PDF 파일에 문제가 있을 수 있습니다.")
             else:
                 st.error("⚠️ 오류: PDF 파일에서 페이지를 찾을 수 없습니다.")
 
+        except Exception as e:
+            st.error(f"⚠️ PDF를 불러오는 중 오류가 발생했습니다: {e}")
+            st.warning("혹시 PDF 파일이 손상되었거나 암호화되어 있을 수 있습니다.")
+
     else:
         st.info("PDF 파일을 업로드하시면 첫 페이지 미리보기가 나타납니다. 좌표축을 참고하여 영역을 입력해주세요.")
 
+    # 렌더링이 끝난 뒤의 캐시 적중/누락/퇴출 횟수 표시
+    cache_stats_panel.json(render_cache.stats())
+
 if __name__ == "__main__":
     main()
@@ -1,14 +1,117 @@
 import streamlit as st
-from pypdf import PdfReader, PdfWriter
-import io
+import os
+
+from core.duplex import FORWARD, REVERSED, UNDETERMINED, merge_duplex, merge_duplex_batch, pair_uploads
+from core.jobs import CANCELLED, DONE, FAILED, job_scheduler
+from core.metrics import stage
+from core.render import DEFAULT_WORKERS, write_zip_file
+from core.resources import warm_up, worker_pool
+from core.ui import download_file, job_panel, metrics_panel, session_upload, session_uploads, submit_job
+from core.uploads import open_stream
+
+
+# 일괄 병합의 뒷면 순서 선택 → merge_duplex_batch의 back_order (None이면 쌍마다 자동 판단)
+BACK_ORDERS = {"자동 판단": None, "모두 역순": REVERSED, "모두 정순": FORWARD}
+
+
+def merge_batch_job(job, pairs, skip_blank, back_order):
+    """
+    (작업 대기열에서 실행) 여러 쌍을 병합해 ZIP 임시 파일로 묶고 (ZIP 파일 경로, 쌍별 처리 내용)을 돌려줍니다.
+    한 쌍이 끝날 때마다 진행률을 알립니다.
+    """
+    reports = []
+
+    def merged_entries():
+        # 병합된 파일은 경로로 넘겨 ZIP에 바로 복사하고, 기록이 끝나면 삭제
+        merged = merge_duplex_batch(pairs, skip_blank=skip_blank, workers=job.workers, pool=worker_pool(),
+                                    back_order=back_order)
+        for name, path, report in job.track(merged, len(pairs)):
+            reports.append({"이름": name, **report})
+            yield f"{name}_merged.pdf", path
+            os.remove(path)
+
+    with stage("duplex.batch", pairs=len(pairs), workers=job.workers):
+        zip_path, _ = write_zip_file(merged_entries(), prefix="duplex_")
+    return job.own_file(zip_path), reports
+
+
+def merge_job(job, front_bytes, back_bytes):
+    """(작업 대기열에서 실행) 한 쌍을 병합하고 결과 파일 경로를 돌려줍니다. (진행률은 단계를 나누지 않음)"""
+    with stage("duplex.merge"):
+        return merge_duplex(front_bytes, back_bytes)
+
 
 st.set_page_config(layout="centered")
+metrics_panel()
+warm_up()
 st.title("스캔 문서 병합 서비스 (앞면/뒷면)")
 st.write("앞면 스캔본(정순)과 뒷면 스캔본(역순)을 업로드하여 올바른 순서로 병합합니다.")
 
+mode = st.radio("병합 방식:", ("한 쌍 병합", "여러 쌍 일괄 병합"), horizontal=True)
+
+if mode == "여러 쌍 일괄 병합":
+    st.info(
+        "파일명으로 앞면/뒷면을 짝짓습니다. (예: `3반_앞면.pdf` ↔ `3반_뒷면.pdf`, `scan-front.pdf` ↔ `scan-back.pdf`) "
+        "뒷면이 역순인지 정순인지는 용지 크기·쪽 번호로 자동 판단하고, 한쪽에만 있는 빈 여분 페이지는 잘라냅니다."
+    )
+    batch_files = st.file_uploader("앞면/뒷면 PDF 파일들을 모두 업로드", type="pdf", accept_multiple_files=True)
+    batch_uploads = session_uploads("duplex.batch", batch_files or [])
+    skip_blank = st.checkbox("빈 페이지 제외", value=True)
+    back_order = BACK_ORDERS[st.radio(
+        "뒷면 순서", list(BACK_ORDERS), horizontal=True,
+        help="자동 판단은 쪽 번호·용지 크기·비침 자국으로 쌍마다 판단하고, 판단할 수 없으면 역순으로 병합한 뒤 알려줍니다."
+    )]
+    workers = st.number_input(
+        "병합 작업자(프로세스) 수", min_value=1, max_value=max(DEFAULT_WORKERS, 1) * 2,
+        value=DEFAULT_WORKERS, step=1
+    )
+
+    if batch_files:
+        files = {f.name: upload for f, upload in zip(batch_files, batch_uploads)}
+        pairs, unmatched = pair_uploads(list(files))
+        if unmatched:
+            st.warning(f"짝을 찾지 못한 파일: {', '.join(unmatched)}")
+        if not pairs:
+            st.error("앞면/뒷면으로 짝지을 수 있는 파일이 없습니다. 파일명을 확인해주세요.")
+            st.stop()
+        st.success(f"{len(pairs)}쌍을 찾았습니다: " + ", ".join(f"{name} ({front} + {back})" for name, front, back in pairs))
+
+        # 병합은 작업 대기열에서 돌리므로 진행 중에 다른 위젯을 건드려도 처음부터 다시 하지 않음
+        merge_pairs = [(name, files[front].data, files[back].data) for name, front, back in pairs]
+        job_key = ("duplex.batch", tuple((name, files[front].digest, files[back].digest)
+                                         for name, front, back in pairs), skip_blank, back_order)
+        if st.button("모든 쌍 병합하기"):
+            submit_job(job_key, "일괄 병합", merge_batch_job, merge_pairs, skip_blank, back_order, workers=workers)
+
+        job = job_scheduler.get(job_key)
+        status = job_panel(job, "duplex_batch") if job is not None else None
+        if status == DONE:
+            zip_path, reports = job.result
+            st.dataframe(reports)
+            undetermined = [report["이름"] for report in reports if report["back_order"] == UNDETERMINED]
+            if undetermined:
+                st.warning(
+                    f"뒷면 순서를 판단하지 못해 역순으로 병합한 쌍이 있습니다: {', '.join(undetermined)}. "
+                    "뒷면을 정순으로 스캔했다면 '뒷면 순서'를 '모두 정순'으로 골라 다시 병합해주세요."
+                )
+            download_file(
+                label="병합된 PDF 모두 ZIP으로 다운로드",
+                path=zip_path,
+                file_name="merged_documents.zip",
+                mime="application/zip"
+            )
+        elif status == FAILED:
+            st.error(f"파일 처리 중 오류가 발생했습니다: {job.error}")
+            st.warning("업로드된 파일이 유효한 PDF 파일인지, 그리고 파일이 손상되지 않았는지 확인해주세요.")
+    else:
+        st.info("앞면/뒷면 PDF 파일들을 업로드해주세요.")
+    st.stop()
+
 # --- 1. 파일 업로드 ---
 front_file = st.file_uploader("앞면 PDF 파일 업로드 (예: Page1-33)", type="pdf")
 back_file = st.file_uploader("뒷면 PDF 파일 업로드 (예: Page33-1)", type="pdf")
+front_upload = session_upload("duplex.front", front_file)
+back_upload = session_upload("duplex.back", back_file)
 
 # --- 2. 파일명 입력 필드 추가 ---
 # 기본 파일명 제안
@@ -33,11 +136,16 @@ elif not output_filename: # 파일명이 비어있으면 기본값으로 대체
 
 if front_file and back_file:
     try:
-        front_reader = PdfReader(front_file)
-        back_reader = PdfReader(back_file)
+        front_bytes, back_bytes = front_upload.data, back_upload.data
 
-        front_num_pages = len(front_reader.pages)
-        back_num_pages = len(back_reader.pages)
+        # 페이지 수만 확인 (페이지 내용은 읽지 않음, pypdf는 파일이 올라왔을 때 불러옴)
+        from pypdf import PdfReader
+
+        with stage("pdf.open", library="pypdf", size=len(front_bytes) + len(back_bytes)):
+            front_num_pages = len(PdfReader(open_stream(front_bytes)).pages)
+            back_num_pages = len(PdfReader(open_stream(back_bytes)).pages)
+
+        job_key = ("duplex.merge", front_upload.digest, back_upload.digest)
 
         # --- 3. 페이지 수 확인 및 경고 ---
         if front_num_pages != back_num_pages:
@@ -45,44 +153,41 @@ if front_file and back_file:
                 f"경고: 앞면 PDF({front_num_pages} 페이지)와 뒷면 PDF({back_num_pages} 페이지)의 페이지 수가 다릅니다. "
                 "병합 결과가 예상과 다를 수 있습니다."
             )
-            proceed = st.button("계속 진행")
-            if not proceed:
+            # 이미 시작한 병합이 있으면 다시 묻지 않고 진행률·결과를 보여줌
+            if job_scheduler.get(job_key) is None and not st.button("계속 진행"):
                 st.stop()
+            if front_num_pages < back_num_pages:
+                st.info(f"앞면 PDF에 더 이상 추가할 페이지가 없습니다. 뒷면만 계속 추가합니다.")
+            else:
+                st.info(f"뒷면 PDF에 더 이상 추가할 페이지가 없습니다. 앞면만 계속 추가합니다.")
         
         st.success(f"앞면 PDF: {front_num_pages} 페이지, 뒷면 PDF: {back_num_pages} 페이지")
 
-        pdf_writer = PdfWriter()
-
         # --- 4. 페이지 짝 맞추어 병합 ---
-        max_pages = max(front_num_pages, back_num_pages)
-
-        for i in range(max_pages):
-            # 앞면 페이지 추가 (순방향)
-            if i < front_num_pages:
-                pdf_writer.add_page(front_reader.pages[i])
-            else:
-                st.info(f"앞면 PDF에 더 이상 추가할 페이지가 없습니다. 뒷면만 계속 추가합니다.")
-
-            # 뒷면 페이지 추가 (역방향)
-            if i < back_num_pages:
-                pdf_writer.add_page(back_reader.pages[back_num_pages - 1 - i])
-            else:
-                if i < front_num_pages:
-                    st.info(f"뒷면 PDF에 더 이상 추가할 페이지가 없습니다. 앞면만 계속 추가합니다.")
-
+        # 병합은 작업 대기열에서 돌리고, 같은 파일 쌍이면 진행 중이거나 끝난 작업을 그대로 사용하므로
+        # 파일명을 바꾸거나 다시 내려받을 때는 병합하지 않음
+        # (취소한 작업은 버튼을 눌러야 다시 시작)
+        job = job_scheduler.get(job_key) or submit_job(job_key, "PDF 병합", merge_job, front_bytes, back_bytes)
+        status = job_panel(job, "duplex_merge") if job is not None else None
+        if status == CANCELLED and st.button("다시 병합"):
+            submit_job(job_key, "PDF 병합", merge_job, front_bytes, back_bytes)
+            st.rerun()
 
         # --- 5. 결과 PDF 다운로드 ---
-        output_pdf_bytes = io.BytesIO()
-        pdf_writer.write(output_pdf_bytes)
-        output_pdf_bytes.seek(0)
-
-        st.download_button(
-            label="병합된 PDF 다운로드",
-            data=output_pdf_bytes,
-            file_name=output_filename, # 사용자 입력 파일명 사용
-            mime="application/pdf"
-        )
-        st.success(f"PDF 병합이 완료되었습니다. '{output_filename}' 이름으로 다운로드하세요.")
+        if status == DONE:
+            # 결과 파일이 병합 캐시에서 밀려 지워졌으면 merge_duplex가 다시 만듦
+            merged_path = job.result if os.path.exists(job.result) else merge_duplex(front_bytes, back_bytes)
+            with open(merged_path, "rb") as merged_pdf:
+                st.download_button(
+                    label="병합된 PDF 다운로드",
+                    data=merged_pdf,
+                    file_name=output_filename, # 사용자 입력 파일명 사용
+                    mime="application/pdf"
+                )
+            st.success(f"PDF 병합이 완료되었습니다. '{output_filename}' 이름으로 다운로드하세요.")
+        elif status == FAILED:
+            st.error(f"파일 처리 중 오류가 발생했습니다: {job.error}")
+            st.warning("업로드된 파일이 유효한 PDF 파일인지, 그리고 파일이 손상되지 않았는지 확인해주세요.")
 
     except Exception as e:
         st.error(f"파일 처리 중 오류가 발생했습니다: {e}")
@@ -1,24 +1,65 @@
 import streamlit as st
-import pandas as pd
-import networkx as nx
-from pyvis.network import Network
 import streamlit.components.v1 as components
-import os
+
+from core.jobs import DONE, FAILED, job_scheduler
+from core.relmap import LARGE_GRAPH_NODES, GraphStyle, graph_html, survey_graph
+from core.resources import warm_up
+from core.survey import SURVEY_TYPES, load_survey, survey_header
+from core.ui import job_panel, metrics_panel, session_upload, submit_job
+
+
+def relmap_job(job, digest, data, header, name_column, relation_columns, is_directed, layout_mode):
+    """
+    (작업 대기열에서 실행) 설문을 읽어 관계도 그래프·배치·HTML 본문과 관계 분석을 계산하고
+    (그래프, 배치 방식, 지목 방향 그래프, 분석 결과)를 돌려줍니다. 단계마다 진행률을 알립니다.
+    표시 설정(테마·크기·굵기)은 화면에서 캐시된 본문에 붙이기만 하므로 작업에 넣지 않습니다.
+    """
+    job.update(0, 4)
+    # 이름 열과 선택한 관계 열만 나눠 읽음
+    df = load_survey(digest, data, header, name_column, relation_columns)
+    job.update(1)
+    G = survey_graph(digest, df, name_column, relation_columns, directed=is_directed)
+    job.update(2)
+    if G.number_of_nodes() == 0:
+        return G, None, G, None
+
+    # 서버에서 좌표를 미리 계산하면 브라우저는 그리기만 함 (물리 시뮬레이션 끔)
+    if layout_mode == '자동':
+        layout_method = "fast" if G.number_of_nodes() > LARGE_GRAPH_NODES else None
+    else:
+        layout_method = {'서버 (정밀 계산)': "spring", '서버 (빠른 근사)': "fast"}.get(layout_mode)
+    graph_html(G, layout_method)
+    job.update(3)
+
+    # 상호 지목·받은 지목은 방향이 있어야 하므로 항상 지목 방향 그래프로 분석 (결과는 그래프별로 캐시)
+    from core.analytics import analyze_graph  # SciPy 등은 분석할 때 불러옴
+
+    G_picks = G if is_directed else survey_graph(digest, df, name_column, relation_columns, directed=True)
+    analysis = analyze_graph(G_picks)
+    job.update(4)
+    return G, layout_method, G_picks, analysis
+
 
 st.set_page_config(layout="wide")
+metrics_panel()
+warm_up()
 
 st.title("우리 반 친구 관계 맵")
-st.write("설문조사 CSV 파일을 업로드하고, 옵션을 선택하여 친구 관계도를 시각화하세요.")
+st.write("설문조사 파일(CSV, Parquet, Excel)을 업로드하고, 옵션을 선택하여 친구 관계도를 시각화하세요.")
 
 # 1. 데이터 업로드
-uploaded_file = st.file_uploader("설문조사 결과를 담은 CSV 파일을 업로드해주세요.", type="csv")
+uploaded_file = st.file_uploader("설문조사 결과를 담은 파일을 업로드해주세요. (CSV, Parquet, Excel)", type=SURVEY_TYPES)
+# 내용 해시는 파일마다 처음 한 번만 계산하고, 다시 실행할 때는 저장소에 든 업로드를 그대로 씀
+upload = session_upload("relmap", uploaded_file)
 
-df = None
+header = None
 if uploaded_file is not None:
     try:
-        df = pd.read_csv(uploaded_file)
+        # 전체를 파싱하지 않고 앞부분만 읽어 열 목록과 미리보기를 만듦
+        data, digest = upload.data, upload.digest
+        header = survey_header(digest, data, uploaded_file.name)
         st.subheader("업로드된 데이터 미리보기")
-        st.dataframe(df.head())
+        st.dataframe(header.preview)
 
         st.sidebar.header("관계도 시각화 설정")
 
@@ -59,8 +100,16 @@ if uploaded_file is not None:
         
         is_directed = (edge_direction_style == '화살표(지목 방향)')
 
+        # 6. 레이아웃(노드 배치) 계산 위치 선택
+        layout_mode = st.sidebar.radio(
+            "노드 배치 계산 방식:",
+            ('자동', '브라우저 (물리 시뮬레이션)', '서버 (정밀 계산)', '서버 (빠른 근사)'),
+            index=0, # 기본값은 자동: 노드가 많으면 서버에서 빠른 근사 계산
+            help=f"노드가 많으면 브라우저 물리 시뮬레이션이 멈출 수 있습니다. 자동은 노드 {LARGE_GRAPH_NODES}개가 넘으면 서버에서 배치를 미리 계산합니다."
+        )
+
         # 열 선택
-        all_columns = df.columns.tolist()
+        all_columns = header.columns
 
         name_column = st.sidebar.selectbox(
             "학생 이름이 있는 열을 선택하세요:",
@@ -80,114 +129,65 @@ if uploaded_file is not None:
         
         if not relation_columns:
             st.warning("관계도를 그릴 열을 최소 하나 이상 선택해주세요.")
-            df = None
+            header = None
 
     except Exception as e:
         st.error(f"파일을 읽는 중 오류가 발생했습니다: {e}")
-        df = None
+        header = None
 
 # 3. 관계도 생성 및 시각화
-if df is not None and name_column and relation_columns:
+if header is not None and name_column and relation_columns:
+    # 한 번 그린 관계도는 표시 설정(테마·크기·굵기)을 바꿔도 버튼을 다시 누르지 않고 유지
+    graph_key = (digest, name_column, tuple(relation_columns), is_directed)
+    # 그래프·배치·분석 계산은 작업 대기열에서 돌리므로 계산 중에 표시 설정을 바꿔도 처음부터 다시 하지 않음
+    job_key = ("relmap", graph_key, layout_mode)
+    job_args = (relmap_job, digest, data, header, name_column, relation_columns, is_directed, layout_mode)
     if st.button("관계도 그리기"):
+        st.session_state.relmap_drawn = graph_key
+        submit_job(job_key, "관계도 계산", *job_args)
+
+    if st.session_state.get("relmap_drawn") == graph_key:
         st.subheader("친구 관계도")
-        
-        # 방향성에 따라 그래프 타입 선택
-        G = nx.DiGraph() if is_directed else nx.Graph()
-        
-        # 모든 학생 이름을 노드로 추가 (중복 제거)
-        all_students = set()
-        for _, row in df.iterrows():
-            if pd.notna(row[name_column]):
-                all_students.add(str(row[name_column]).strip())
-            for rel_col in relation_columns:
-                if pd.notna(row[rel_col]):
-                    targets = [t.strip() for t in str(row[rel_col]).split(',') if t.strip()]
-                    for target in targets:
-                        all_students.add(target)
-        
-        for student in all_students:
-            G.add_node(student, title=student, size=node_size, 
-                       font={'size': name_font_size, 'color': font_color}) # 노드 이름 폰트 크기 및 색상 적용
 
-        # 관계 데이터 추가
-        # 각 관계 유형에 고유한 색상을 할당합니다.
-        relation_colors = ['#FF6347', '#4682B4', '#32CD32'] # Tomato, SteelBlue, LimeGreen (예시 색상)
-        
-        for idx, rel_col in enumerate(relation_columns):
-            current_color = relation_colors[idx % len(relation_colors)]
-
-            for _, row in df.iterrows():
-                source = str(row[name_column]).strip()
-                if pd.notna(row[rel_col]):
-                    targets = [t.strip() for t in str(row[rel_col]).split(',') if t.strip()]
-                    
-                    for target in targets:
-                        if source != target and source in all_students and target in all_students:
-                            if G.has_edge(source, target):
-                                # 기존 엣지의 굵기 증가 (기본 굵기에 추가)
-                                # 'value'는 pyvis에서 엣지 굵기를 조절하는 속성
-                                G[source][target]['value'] = G[source][target].get('value', 0) + edge_width
-                                # 툴팁에 관계 추가
-                                G[source][target]['title'] += f", {rel_col}"
-                            else:
-                                # 새로운 엣지 추가 (기본 굵기 적용)
-                                G.add_edge(source, target, 
-                                           title=rel_col, 
-                                           color=current_color, 
-                                           value=edge_width) # value는 엣지 굵기
-
-        if G.number_of_nodes() > 0:
-            net = Network(notebook=True, height="750px", width="100%", 
-                          directed=is_directed, # 방향성 옵션 적용
-                          bgcolor=bg_color, font_color=font_color, # 배경색/글자색 옵션 적용
-                          cdn_resources='remote')
-            
-            # 노드 추가
-            for node in G.nodes(data=True):
-                net.add_node(node[0], 
-                             label=node[0], 
-                             title=node[1].get('title', node[0]), 
-                             size=node[1].get('size', node_size),
-                             font=node[1].get('font', {'size': name_font_size, 'color': font_color})) # 폰트 설정 적용
-
-            # 엣지 추가
-            for edge in G.edges(data=True):
-                net.add_edge(edge[0], edge[1], 
-                             title=edge[2].get('title', ''), 
-                             color=edge[2].get('color', 'gray'), 
-                             width=edge[2].get('value', edge_width))
-
-            # 물리 시뮬레이션 설정 (기존과 동일)
-            net.set_options("""
-            var options = {
-              "physics": {
-                "forceAtlas2Based": {
-                  "gravitationalConstant": -50,
-                  "centralGravity": 0.01,
-                  "springLength": 100,
-                  "springConstant": 0.08,
-                  "avoidOverlap": 0.9
-                },
-                "minVelocity": 0.75,
-                "solver": "forceAtlas2Based"
-              },
-              "interaction": {
-                "zoomView": true,
-                "hover": true,
-                "tooltipDelay": 300
-              }
-            }
-            """)
-
-            html_file_path = "temp_graph.html"
-            net.save_graph(html_file_path)
-            
-            with open(html_file_path, "r", encoding="utf-8") as f:
-                html_code = f.read()
+        # 방향성에 따라 그래프 타입 선택, 관계 열을 펼쳐(explode) 한 번에 집계하여 그래프 생성
+        # 같은 쌍의 지목이 반복되면 엣지 굵기가 기본 굵기만큼 늘고 툴팁에 관계가 추가됨
+        # (업로드·열 선택·방향성이 같으면 캐시된 그래프를 그대로 사용, 배치 방식만 바꾸면 새로 계산)
+        job = job_scheduler.get(job_key) or submit_job(job_key, "관계도 계산", *job_args)
+        status = job_panel(job, "relmap") if job is not None else None
+        G = None
+        if status == FAILED:
+            st.error(f"파일을 읽는 중 오류가 발생했습니다: {job.error}")
+        elif status == DONE:
+            G, layout_method, G_picks, analysis = job.result
+
+        if G is None:
+            pass # 계산 중이거나 실패·취소됨
+        elif G.number_of_nodes() > 0:
+            # 관계도 HTML은 메모리에서 만들고, 노드·엣지 데이터는 캐시해 두고 표시 설정만 새로 적용
+            style = GraphStyle(bg_color, font_color, node_size, name_font_size, edge_width)
+            html_code = graph_html(G, layout_method, style)
             components.html(html_code, height=800)
-            
-            if os.path.exists(html_file_path):
-                os.remove(html_file_path)
+
+            # --- 관계 분석 패널 ---
+            st.subheader("관계 분석")
+
+            col1, col2, col3, col4 = st.columns(4)
+            col1.metric("학생 수", G_picks.number_of_nodes())
+            col2.metric("상호 지목 쌍", len(analysis["mutual_pairs"]))
+            col3.metric("그룹(커뮤니티) 수", analysis["communities"])
+            col4.metric("지목받지 못한 학생", len(analysis["no_incoming"]))
+
+            tab_students, tab_mutual, tab_isolated = st.tabs(["학생별 지표", "상호 지목 쌍", "지목받지 못한 학생"])
+            with tab_students:
+                st.caption("받은/한 지목 수, 상호 지목 수, PageRank(영향력), 매개 중심성(연결 다리 역할), 그룹 번호")
+                st.dataframe(analysis["table"])
+            with tab_mutual:
+                st.dataframe(analysis["mutual_pairs"])
+            with tab_isolated:
+                if analysis["no_incoming"]:
+                    st.write(", ".join(analysis["no_incoming"]))
+                else:
+                    st.write("모든 학생이 한 번 이상 지목받았습니다.")
 
         else:
             st.warning("관계도를 그릴 데이터가 없습니다. 선택한 열과 CSV 파일 내용을 확인해주세요.")
@@ -1,89 +1,87 @@
 import streamlit as st
-from PIL import Image, ImageOps
-import io
-
-def add_letterbox(image, target_ratio, letterbox_color):
-    """
-    이미지에 레터박스를 추가하여 지정된 비율의 캔버스에 맞춥니다.
-    """
-    original_width, original_height = image.size
-
-    # 1. 목표 비율에 따른 최종 캔버스 크기 계산 (최대 길이 1000px 기준)
-    if target_ratio == "1:1":
-        target_canvas_width, target_canvas_height = 1000, 1000
-    elif target_ratio == "4:3":
-        target_canvas_width, target_canvas_height = 1000, int(1000 * (3/4))
-    elif target_ratio == "3:4":
-        target_canvas_width, target_canvas_height = int(1000 * (3/4)), 1000
-    elif target_ratio == "16:9":
-        target_canvas_width, target_canvas_height = 1000, int(1000 * (9/16))
-    elif target_ratio == "9:16":
-        target_canvas_width, target_canvas_height = int(1000 * (9/16)), 1000
-    else: # "원본 비율"
-        # 원본 비율 선택 시에는 레터박스 없이 이미지 자체를 최대 1000px로 리사이즈
-        if original_width > original_height:
-            resized_width = 1000
-            resized_height = int(original_height * (1000 / original_width))
-        else:
-            resized_height = 1000
-            resized_width = int(original_width * (1000 / original_height))
-        
-        resized_image = image.resize((resized_width, resized_height), Image.Resampling.LANCZOS)
-        return resized_image # 레터박스 추가 로직 건너뛰고 바로 반환
-
-    # 2. 원본 이미지를 목표 캔버스에 맞게 스케일링 (비율 유지)
-    # 이미지의 어떤 변을 기준으로 스케일링할지 결정하여 여백을 만듦
-    scale_factor_width = target_canvas_width / original_width
-    scale_factor_height = target_canvas_height / original_height
-
-    # 캔버스 안에 이미지가 다 들어가도록 더 작은 스케일 팩터 사용
-    if scale_factor_width < scale_factor_height:
-        # 가로에 맞추면 세로에 여백이 생김 (위/아래 레터박스)
-        new_width = target_canvas_width
-        new_height = int(original_height * scale_factor_width)
-    else:
-        # 세로에 맞추면 가로에 여백이 생김 (양옆 레터박스)
-        new_height = target_canvas_height
-        new_width = int(original_width * scale_factor_height)
-    
-    resized_image = image.resize((new_width, new_height), Image.Resampling.LANCZOS)
-
-    # 3. 새로운 캔버스 생성 및 이미지 붙여넣기
-    # Streamlit color_picker는 HEX 코드를 반환하므로 RGB 튜플로 변환
-    letterbox_color_rgb = tuple(int(letterbox_color.lstrip('#')[i:i+2], 16) for i in (0, 2, 4))
-    new_image = Image.new("RGB", (target_canvas_width, target_canvas_height), letterbox_color_rgb)
-
-    # 조절된 이미지를 새 캔버스의 중앙에 붙여넣기
-    paste_x = (target_canvas_width - new_width) // 2
-    paste_y = (target_canvas_height - new_height) // 2
-    new_image.paste(resized_image, (paste_x, paste_y))
-
-    return new_image
 
+from core.cache import content_hash
+from core.export import encode_image, export_extension, export_mime
+from core.letterbox import (IMAGE_TYPES, RATIOS, add_letterbox, iter_letterbox_batch, iter_upload_images,
+                            ratio_label, source_image)
+from core.metrics import stage
+from core.render import DEFAULT_WORKERS, write_zip_file
+from core.resources import warm_up, worker_pool
+from core.ui import download_file, export_settings, metrics_panel, session_file
 
 st.set_page_config(layout="centered", page_title="커스텀 이미지 변환기")
+metrics_panel()
+warm_up()
 
 st.title("📸 이미지 레터박스 추가 & 비율 변환기")
 st.write("이미지를 업로드하고 원하는 레터박스 색상과 최종 이미지 비율을 선택하여 변환합니다.")
 
 # 사이드바 설정
 st.sidebar.header("설정")
-selected_ratio = st.sidebar.selectbox(
-    "최종 이미지 비율을 선택하세요:",
-    ("1:1", "4:3", "3:4", "16:9", "9:16", "원본 비율"),
-    index=0 # 기본값 1:1
-)
+mode = st.sidebar.radio("변환 방식:", ("이미지 1장", "여러 장 일괄 변환"))
 
 # 레터박스 색상 선택 (기본값 검은색)
 letterbox_color = st.sidebar.color_picker(
     "레터박스 색상을 선택하세요:", "#000000" # 기본값 검은색
 )
+export, _ = export_settings()
 
-uploaded_file = st.file_uploader("이미지 파일을 업로드하세요...", type=["jpg", "jpeg", "png"])
+if mode == "여러 장 일괄 변환":
+    selected_ratios = st.sidebar.multiselect(
+        "만들 이미지 비율을 모두 선택하세요:", list(RATIOS), default=["1:1", "4:5", "9:16"]
+    )
+    workers = st.sidebar.number_input(
+        "변환 작업자(프로세스) 수", min_value=1, max_value=max(DEFAULT_WORKERS, 1) * 2,
+        value=DEFAULT_WORKERS, step=1
+    )
+
+    batch_files = st.file_uploader(
+        "이미지 파일들 또는 이미지가 든 ZIP 파일을 업로드하세요...",
+        type=IMAGE_TYPES + ["zip"], accept_multiple_files=True
+    )
+    if batch_files and not selected_ratios:
+        st.warning("만들 비율을 하나 이상 선택해주세요.")
+    elif batch_files and st.button("모두 변환하기"):
+        try:
+            # 이미지마다 한 번만 디코딩해 선택한 모든 비율로 변환, 결과는 받는 대로 ZIP에 기록
+            with stage("file.read", files=len(batch_files)):
+                uploads = [(f.name, f.getvalue()) for f in batch_files]
+            with st.spinner("이미지를 변환하는 중..."), \
+                    stage("letterbox.batch", files=len(uploads), ratios=len(selected_ratios), workers=workers):
+                zip_path, names = write_zip_file(
+                    iter_letterbox_batch(iter_upload_images(uploads), selected_ratios, letterbox_color, workers, export,
+                                         pool=worker_pool()),
+                    prefix="letterbox_"
+                )
+            # ZIP은 세션이 맡아 두고(다음 변환·세션 종료 때 지움) 다운로드 버튼을 누를 때만 읽음
+            session_file("letterbox.batch", zip_path)
+            st.success(f"{len(names)}개 이미지를 만들었습니다. (비율별 폴더: {', '.join(ratio_label(r) for r in selected_ratios)})")
+            download_file(
+                label="변환된 이미지 모두 ZIP으로 다운로드",
+                path=zip_path,
+                file_name="letterbox_images.zip",
+                mime="application/zip"
+            )
+        except Exception as e:
+            st.error(f"이미지 처리 중 오류가 발생했습니다: {e}")
+    elif not batch_files:
+        st.info("이미지 파일들(또는 ZIP)을 업로드해주세요.")
+    st.stop()
+
+selected_ratio = st.sidebar.selectbox(
+    "최종 이미지 비율을 선택하세요:",
+    list(RATIOS),
+    index=0 # 기본값 1:1
+)
+
+uploaded_file = st.file_uploader("이미지 파일을 업로드하세요...", type=IMAGE_TYPES)
 
 if uploaded_file is not None:
-    # 이미지 로드
-    image = Image.open(uploaded_file)
+    # 이미지 로드: 캔버스 크기에 맞춰 줄여서 디코딩(EXIF 방향 반영)하고 업로드별로 캐시
+    # 비율이나 색상만 바꾸면 디코딩 없이 캔버스만 다시 합성
+    with stage("file.read", file=uploaded_file.name):
+        data = uploaded_file.getvalue()
+    image = source_image(content_hash(data), data)
     st.image(image, caption="원본 이미지", use_column_width=True)
 
     st.subheader("변환된 이미지 미리보기:")
@@ -94,16 +92,12 @@ if uploaded_file is not None:
     # 변환된 이미지 표시
     st.image(processed_image, caption=f"{selected_ratio} 비율 변환 이미지 (레터박스 색상: {letterbox_color})", use_column_width=True)
 
-    # 이미지 다운로드 버튼
-    buf = io.BytesIO()
-    processed_image.save(buf, format="PNG")
-    byte_im = buf.getvalue()
-
+    # 이미지 다운로드 버튼 (인코딩은 내려받을 때만)
     st.download_button(
         label="변환된 이미지 다운로드",
-        data=byte_im,
-        file_name=f"{selected_ratio.replace(':', 'x')}_converted_image.png",
-        mime="image/png"
+        data=lambda: encode_image(processed_image, export),
+        file_name=f"{ratio_label(selected_ratio)}_converted_image.{export_extension(export)}",
+        mime=export_mime(export)
     )
 
 st.markdown("---")